@@ -0,0 +1,274 @@
+"""
+    Import en masse d'articles depuis un fichier CSV ou XLSX.
+
+    Le fichier est lu au fil de l'eau (csv.reader, openpyxl en lecture seule)
+    et traité par paquets de IMPORT_CHUNK_SIZE lignes : validation, puis par
+    paquet une requête pour les codes déjà pris, une pour les slugs, et un
+    bulk_create. Catégories et fournisseurs sont chargés une fois et créés à
+    la demande, par nom (sans tenir compte de la casse).
+
+    Les en-têtes reconnus sont ceux de l'export des articles (« Nom »,
+    « Prix de vente »…) ou les noms de champs (name, price…). Les lignes en
+    erreur sont ignorées et listées dans le rapport ; les autres sont
+    importées, en une transaction.
+"""
+import io
+import os
+import csv
+import uuid
+import zipfile
+import unicodedata
+from itertools import islice
+from contextlib import closing
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from catalog.models import Category, Item
+from catalog.services import DEFAULT_CATEGORY_NAME
+from catalog.serializers import ItemImportRowSerializer
+from inventory.ledger import record_movements
+from inventory.models import StockMovementKind, Vendor
+
+IMPORT_FORMATS = ("csv", "xlsx")
+IMPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_ERRORS = 500
+
+HEADER_ALIASES = {
+    "name": ("nom", "name", "article"),
+    "barcode": ("code-barres", "code barres", "barcode", "ean"),
+    "sku": ("sku", "reference", "ref"),
+    "category": ("categorie", "category"),
+    "vendor": ("fournisseur", "vendor"),
+    "quantity": ("quantite", "quantity", "stock"),
+    "price": ("prix de vente", "price", "prix"),
+    "purchase_price": ("prix d'achat", "purchase_price"),
+    "expiring_date": ("date d'expiration", "expiring_date", "expiration"),
+    "description": ("description",),
+}
+NUMERIC_FIELDS = ("quantity", "price", "purchase_price")
+
+
+def _normalize_header(value):
+    value = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore").decode()
+    return " ".join(value.lower().replace("_", " ").split())
+
+
+_HEADER_LOOKUP = {
+    _normalize_header(alias): field for field, aliases in HEADER_ALIASES.items() for alias in (*aliases, field)
+}
+
+
+def _clean_cell(field, value):
+    if isinstance(value, str):
+        value = value.strip()
+        if field in NUMERIC_FIELDS:
+            # Saisie à la française : « 1 500,50 ».
+            value = value.replace(" ", "").replace("\xa0", "").replace("\u202f", "").replace(",", ".")
+        if value == "":
+            return None
+    return value
+
+
+def iter_csv_rows(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    try:
+        yield from csv.reader(text, dialect)
+    finally:
+        text.detach()
+
+
+def iter_xlsx_rows(file):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_records(rows):
+    """(numéro de ligne, dict) pour chaque ligne non vide, d'après la ligne d'en-tête."""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("Le fichier est vide.")
+    columns = [_HEADER_LOOKUP.get(_normalize_header(cell)) for cell in header]
+    if "name" not in columns or "price" not in columns:
+        raise ValueError("Colonnes obligatoires absentes : « Nom » et « Prix de vente ».")
+
+    for line, row in enumerate(rows, start=2):
+        record = {
+            field: _clean_cell(field, value)
+            for field, value in zip(columns, row) if field is not None
+        }
+        if any(value is not None for value in record.values()):
+            yield line, {field: value for field, value in record.items() if value is not None}
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class _NamedLookup:
+    """Catégories ou fournisseurs du commerçant par nom (sans casse), créés à la première utilisation."""
+
+    def __init__(self, model, merchant, dry_run):
+        self.model = model
+        self.merchant = merchant
+        self.dry_run = dry_run
+        self.by_name = {}
+        for instance in model.objects.filter(merchant=merchant).order_by("created_at"):
+            self.by_name.setdefault(instance.name.casefold(), instance)
+        self.created = 0
+
+    def get(self, name):
+        key = name.casefold()
+        if key not in self.by_name:
+            instance = self.model(merchant=self.merchant, name=name)
+            if not self.dry_run:
+                instance.save()
+            self.by_name[key] = instance
+            self.created += 1
+        return self.by_name[key]
+
+
+def allocate_slugs(names):
+    """
+        Slugs uniques pour une série de noms, en une ou deux requêtes : le slug
+        du nom s'il est libre, sinon ce slug suivi d'un suffixe aléatoire
+        (au lieu des essais -2, -3… d'AutoSlugField, une requête chacun).
+    """
+    max_length = Item._meta.get_field("slug").max_length
+    bases = [slugify(name)[:max_length] or "article" for name in names]
+    taken = set(Item.objects.filter(slug__in=set(bases)).values_list("slug", flat=True))
+
+    slugs = []
+    for base in bases:
+        slug = base
+        if slug in taken:
+            slug = f"{base[:max_length - 7]}-{uuid.uuid4().hex[:6]}"
+        taken.add(slug)
+        slugs.append(slug)
+
+    suffixed = [slug for slug, base in zip(slugs, bases) if slug != base]
+    if suffixed and Item.objects.filter(slug__in=suffixed).exists():
+        return allocate_slugs(names)  # collision de suffixe : improbable, on retire tout
+    return slugs
+
+
+def _codes_in_use(shop, records):
+    barcodes = {record["barcode"] for record in records if record.get("barcode")}
+    skus = {record["sku"] for record in records if record.get("sku")}
+    if not barcodes and not skus:
+        return set(), set()
+    rows = Item.objects.filter(shop=shop).filter(
+        Q(barcode__in=barcodes) | Q(sku__in=skus)
+    ).values_list("barcode", "sku")
+    return {barcode for barcode, _ in rows if barcode}, {sku for _, sku in rows if sku}
+
+
+def import_items(*, shop, rows, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+        Importe les lignes (itérable de listes, en-tête compris). Renvoie le
+        rapport {created, categories_created, vendors_created, errors:
+        [{row, errors}]}. dry_run : validation seule, rien n'est enregistré.
+    """
+    report = {
+        "created": 0, "categories_created": 0, "vendors_created": 0,
+        "error_count": 0, "errors": [], "dry_run": dry_run,
+    }
+
+    def reject(line, errors):
+        report["error_count"] += 1
+        if len(report["errors"]) < MAX_IMPORT_ERRORS:
+            report["errors"].append({"row": line, "errors": errors})
+
+    with transaction.atomic():
+        categories = _NamedLookup(Category, shop.owner, dry_run)
+        vendors = _NamedLookup(Vendor, shop.owner, dry_run)
+        seen_barcodes, seen_skus = set(), set()
+
+        for chunk in _chunks(_iter_records(rows), chunk_size):
+            valid = []
+            for line, record in chunk:
+                serializer = ItemImportRowSerializer(data=record)
+                if not serializer.is_valid():
+                    reject(line, serializer.errors)
+                    continue
+                valid.append((line, serializer.validated_data))
+
+            barcodes_in_use, skus_in_use = _codes_in_use(shop, [data for _, data in valid])
+            accepted = []
+            for line, data in valid:
+                errors = {}
+                if data["barcode"] and (data["barcode"] in barcodes_in_use or data["barcode"] in seen_barcodes):
+                    errors["barcode"] = [f"Le code-barres {data['barcode']} est déjà attribué à un autre article."]
+                if data["sku"] and (data["sku"] in skus_in_use or data["sku"] in seen_skus):
+                    errors["sku"] = [f"Le SKU {data['sku']} est déjà attribué à un autre article."]
+                if errors:
+                    reject(line, errors)
+                    continue
+                seen_barcodes.add(data["barcode"])
+                seen_skus.add(data["sku"])
+                accepted.append(data)
+
+            slugs = allocate_slugs([data["name"] for data in accepted])
+            items = [
+                Item(
+                    shop=shop,
+                    slug=slug,
+                    name=data["name"],
+                    barcode=data["barcode"],
+                    sku=data["sku"],
+                    category=categories.get(data["category"] or DEFAULT_CATEGORY_NAME),
+                    vendor=vendors.get(data["vendor"]) if data["vendor"] else None,
+                    quantity=data["quantity"],
+                    price=data["price"],
+                    purchase_price=data["purchase_price"],
+                    average_cost=data["purchase_price"],
+                    expiring_date=data["expiring_date"],
+                    description=data["description"],
+                )
+                for data, slug in zip(accepted, slugs)
+            ]
+            if not dry_run:
+                Item.objects.bulk_create(items)
+                record_movements(
+                    shop=shop, kind=StockMovementKind.OPENING, quantities={item.id: item.quantity for item in items}
+                )
+            report["created"] += len(items)
+
+        report["categories_created"] = categories.created
+        report["vendors_created"] = vendors.created
+    return report
+
+
+def import_format_for(filename):
+    import_format = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError("Format non pris en charge : fichier .csv ou .xlsx attendu.")
+    return import_format
+
+
+def import_items_file(*, shop, file, filename, dry_run=False):
+    import_format = import_format_for(filename)
+    rows = iter_xlsx_rows(file) if import_format == "xlsx" else iter_csv_rows(file)
+    try:
+        with closing(rows):
+            return import_items(shop=shop, rows=rows, dry_run=dry_run)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"Fichier CSV illisible (UTF-8 attendu) : {e}") from e
+    except (zipfile.BadZipFile, InvalidFileException) as e:
+        raise ValueError("Fichier XLSX illisible.") from e
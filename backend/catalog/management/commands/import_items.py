@@ -0,0 +1,34 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.imports import import_items_file
+from tenants.models import Shop
+
+
+class Command(BaseCommand):
+    help = "Importe des articles dans une boutique depuis un fichier CSV ou XLSX (en-têtes de l'export des articles)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier .csv ou .xlsx")
+        parser.add_argument("--shop", required=True, help="Identifiant de la boutique")
+        parser.add_argument("--dry-run", action="store_true", help="Valider le fichier sans rien enregistrer.")
+
+    def handle(self, *args, **options):
+        try:
+            shop = Shop.objects.select_related("owner").get(pk=options["shop"])
+        except (Shop.DoesNotExist, ValidationError):
+            raise CommandError("Boutique introuvable.")
+        try:
+            with open(options["path"], "rb") as file:
+                report = import_items_file(shop=shop, file=file, filename=options["path"], dry_run=options["dry_run"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in report["errors"]:
+            messages = "; ".join(f"{field} : {' '.join(map(str, errors))}" for field, errors in error["errors"].items())
+            self.stderr.write(f"Ligne {error['row']} — {messages}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} article(s) {'valide(s)' if report['dry_run'] else 'créé(s)'}, "
+            f"{report['categories_created']} catégorie(s) et {report['vendors_created']} fournisseur(s) nouveaux, "
+            f"{report['error_count']} ligne(s) en erreur."
+        ))
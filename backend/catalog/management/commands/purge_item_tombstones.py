@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from catalog.models import ItemTombstone
+
+
+class Command(BaseCommand):
+    help = "Supprime les traces d'articles supprimés plus anciennes que CATALOG_TOMBSTONE_TTL."
+
+    def handle(self, *args, **options):
+        expired_before = timezone.now() - settings.CATALOG_TOMBSTONE_TTL
+        deleted, _ = ItemTombstone.objects.filter(created_at__lt=expired_before).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} trace(s) d'article supprimée(s)."))
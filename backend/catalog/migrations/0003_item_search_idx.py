@@ -0,0 +1,30 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:40
+
+from django.db import migrations
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+
+# Index plein texte des suggestions d'articles (catalog.search.ITEM_SEARCH_VECTOR).
+# PostgreSQL uniquement : hors du Meta du modèle pour que les migrations restent jouables sous SQLite.
+ITEM_SEARCH_INDEX = GinIndex(SearchVector('name', 'slug', config='simple'), name='item_search_idx')
+
+
+def add_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('catalog', 'Item'), ITEM_SEARCH_INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('catalog', 'Item'), ITEM_SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
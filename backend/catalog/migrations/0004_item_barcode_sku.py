@@ -0,0 +1,52 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:09
+
+from django.db import migrations, models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+
+# L'index des suggestions couvre aussi les codes (catalog.search.ITEM_SEARCH_VECTOR).
+OLD_SEARCH_INDEX = GinIndex(SearchVector('name', 'slug', config='simple'), name='item_search_idx')
+NEW_SEARCH_INDEX = GinIndex(SearchVector('name', 'slug', 'barcode', 'sku', config='simple'), name='item_search_idx')
+
+
+def _swap_search_index(old, new):
+    def swap(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            Item = apps.get_model('catalog', 'Item')
+            schema_editor.remove_index(Item, old)
+            schema_editor.add_index(Item, new)
+    return swap
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_item_search_idx'),
+        ('inventory', '0002_purchase_shop_created_idx'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='barcode',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='item',
+            constraint=models.UniqueConstraint(fields=('shop', 'barcode'), name='unique_item_barcode_per_shop'),
+        ),
+        migrations.AddConstraint(
+            model_name='item',
+            constraint=models.UniqueConstraint(fields=('shop', 'sku'), name='unique_item_sku_per_shop'),
+        ),
+        migrations.RunPython(
+            _swap_search_index(OLD_SEARCH_INDEX, NEW_SEARCH_INDEX),
+            _swap_search_index(NEW_SEARCH_INDEX, OLD_SEARCH_INDEX),
+        ),
+    ]
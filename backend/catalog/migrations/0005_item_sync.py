@@ -0,0 +1,39 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:12
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_item_barcode_sku'),
+        ('inventory', '0002_purchase_shop_created_idx'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemTombstone',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item_id', models.UUIDField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['shop', 'updated_at'], name='item_shop_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='itemtombstone',
+            name='shop',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='tenants.shop'),
+        ),
+        migrations.AddIndex(
+            model_name='itemtombstone',
+            index=models.Index(fields=['shop', 'created_at'], name='item_tombstone_shop_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+def seed_average_cost(apps, schema_editor):
+    # Sans historique de coût, le stock existant part du prix d'achat saisi.
+    Item = apps.get_model('catalog', 'Item')
+    Item.objects.update(average_cost=models.F('purchase_price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_item_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='average_cost',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=12),
+        ),
+        migrations.RunPython(seed_average_cost, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.17 on 2026-10-18 13:20
+
+import warnings
+
+from django.db import migrations
+from django.db.models import F
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+
+# Toute recherche est limitée à une boutique : shop_id entre dans l'index (extension
+# btree_gin), qui ne parcourt plus que les articles de la boutique au lieu de ceux de
+# tous les commerçants.
+GLOBAL_SEARCH_INDEX = GinIndex(SearchVector('name', 'slug', 'barcode', 'sku', config='simple'), name='item_search_idx')
+SHOP_SEARCH_INDEX = GinIndex(
+    F('shop'), SearchVector('name', 'slug', 'barcode', 'sku', config='simple'), name='item_search_idx',
+)
+
+
+def add_shop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gin'")
+        available = cursor.fetchone() is not None
+    if not available:
+        # Serveur sans les modules contrib (l'image postgres officielle les fournit) : index global conservé.
+        warnings.warn("Extension btree_gin indisponible : item_search_idx reste un index sur tous les articles.")
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    Item = apps.get_model('catalog', 'Item')
+    schema_editor.remove_index(Item, GLOBAL_SEARCH_INDEX)
+    schema_editor.add_index(Item, SHOP_SEARCH_INDEX)
+
+
+def restore_global_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Item = apps.get_model('catalog', 'Item')
+    schema_editor.remove_index(Item, SHOP_SEARCH_INDEX)
+    schema_editor.add_index(Item, GLOBAL_SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_item_average_cost'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_shop_search_index, restore_global_search_index),
+    ]
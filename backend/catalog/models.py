@@ -39,13 +39,20 @@ class Item(ShopScopedModel):
     """
         Represents an item in the inventory associated to a shop
     """
-    slug = AutoSlugField(unique=True, populate_from='name')
+    # Un slug déjà posé est conservé à la création : l'import l'attribue par lots (catalog/imports.py).
+    slug = AutoSlugField(unique=True, populate_from='name', overwrite_on_add=False)
     name = models.CharField(max_length=50)
+    # Codes scannés en caisse, uniques par boutique (NULL si absent, jamais "").
+    barcode = models.CharField(max_length=64, null=True, blank=True)
+    sku = models.CharField(max_length=64, null=True, blank=True)
     description = models.TextField(max_length=256, blank=True, null=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Coût moyen pondéré du stock, recalculé à chaque réception (inventory.services) ;
+    # purchase_price reste le prix d'achat saisi.
+    average_cost = models.DecimalField(max_digits=12, decimal_places=4, default=0)
     expiring_date = models.DateTimeField(null=True, blank=True)
     vendor = models.ForeignKey('inventory.Vendor', on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -76,3 +83,28 @@ class Item(ShopScopedModel):
     class Meta:
         ordering = ['name']
         verbose_name_plural = 'Items'
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'barcode'], name='unique_item_barcode_per_shop'),
+            models.UniqueConstraint(fields=['shop', 'sku'], name='unique_item_sku_per_shop'),
+        ]
+        indexes = [
+            # Synchronisation du catalogue : articles modifiés depuis le dernier jeton.
+            models.Index(fields=['shop', 'updated_at'], name='item_shop_updated_idx'),
+        ]
+
+
+class ItemTombstone(ShopScopedModel):
+    """
+        Trace d'un article supprimé, pour que la synchronisation du catalogue
+        (catalog.sync) le retire aussi des caisses. Purgée après
+        CATALOG_TOMBSTONE_TTL (`manage.py purge_item_tombstones`).
+    """
+    item_id = models.UUIDField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'created_at'], name='item_tombstone_shop_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} (supprimé le {self.created_at:%Y-%m-%d})"
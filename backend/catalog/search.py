@@ -0,0 +1,135 @@
+"""
+    Suggestions d'articles pour la saisie au comptoir (GET .../items/suggest/?q=).
+
+    Sous PostgreSQL, la recherche passe par l'index plein texte
+    item_search_idx sur (shop_id, vecteur) (config "simple", sans
+    racinisation, extension btree_gin) : chaque mot saisi
+    est un préfixe, « coca 33 » trouve « Coca-Cola 33cl », un début de code-barres
+    trouve l'article. Ailleurs (SQLite en développement), repli sur icontains.
+
+    Un code scanné complet passe par find_items_by_codes : égalité sur les
+    index uniques (shop, barcode) et (shop, sku).
+
+    Classement : nom commençant par la saisie, puis quantités vendues sur
+    SUGGEST_VELOCITY_DAYS jours, puis ordre alphabétique. Pas de COUNT : la
+    caisse n'affiche que les premières suggestions.
+"""
+import re
+import datetime
+
+from django.db import connection
+from django.utils import timezone
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, F, Q, Sum, Value, When
+from django.contrib.postgres.search import SearchQuery, SearchVector
+
+from catalog.models import Item
+from sales.models import SaleDetail
+
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_VELOCITY_DAYS = 30
+SUGGEST_VELOCITY_TTL = 10 * 60
+# Articles les plus vendus pris en compte dans le classement ; au-delà, vitesse nulle.
+SUGGEST_HOT_ITEMS = 500
+SUGGEST_FIELDS = ("id", "name", "slug", "price", "quantity", "category_name")
+SCAN_FIELDS = ("id", "name", "price", "quantity", "barcode", "sku")
+MAX_SCAN_CODES = 100
+
+# Doit rester identique à l'expression de l'index item_search_idx (catalog/migrations).
+ITEM_SEARCH_VECTOR = SearchVector("name", "slug", "barcode", "sku", config="simple")
+
+_WORD = re.compile(r"\w+")
+
+
+def _velocity_key(shop_id):
+    return f"item-velocity:{shop_id}"
+
+
+def get_item_velocity(*, shop):
+    """{item_id: quantité vendue} sur les derniers jours, mis en cache par boutique."""
+    velocity = cache.get(_velocity_key(shop.id))
+    if velocity is None:
+        since = timezone.now() - datetime.timedelta(days=SUGGEST_VELOCITY_DAYS)
+        rows = (
+            SaleDetail.objects.filter(shop=shop, created_at__gte=since, item__isnull=False)
+            .values("item_id")
+            .annotate(sold=Sum("quantity"))
+            .order_by("-sold")[:SUGGEST_HOT_ITEMS]
+        )
+        velocity = {row["item_id"]: row["sold"] for row in rows}
+        cache.set(_velocity_key(shop.id), velocity, SUGGEST_VELOCITY_TTL)
+    return velocity
+
+
+def _search_condition(words):
+    if connection.vendor == "postgresql":
+        # Mots réduits à \w+ : rien à échapper dans la syntaxe tsquery.
+        query = SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config="simple")
+        return Q(search=query)
+    condition = Q()
+    for word in words:
+        condition &= (
+            Q(name__icontains=word) | Q(slug__icontains=word) | Q(barcode__icontains=word) | Q(sku__icontains=word)
+        )
+    return condition
+
+
+def suggest_items(*, shop, query, limit=SUGGEST_DEFAULT_LIMIT):
+    words = _WORD.findall(query.lower())
+    if not words:
+        return []
+
+    matches = Item.objects.filter(shop=shop)
+    if connection.vendor == "postgresql":
+        matches = matches.annotate(search=ITEM_SEARCH_VECTOR)
+    matches = (
+        matches.filter(_search_condition(words))
+        .annotate(
+            category_name=F("category__name"),
+            is_prefix=Case(When(name__istartswith=query.strip(), then=Value(True)),
+                           default=Value(False), output_field=BooleanField()),
+        )
+        .values(*SUGGEST_FIELDS, "is_prefix")
+    )
+
+    velocity = get_item_velocity(shop=shop)
+    # Deux requêtes bornées plutôt qu'un tri sur toutes les correspondances :
+    # les articles vendus récemment, et les premiers par (préfixe, nom).
+    candidates = {row["id"]: row for row in matches.order_by("-is_prefix", "name")[:limit]}
+    if velocity:
+        candidates.update((row["id"], row) for row in matches.filter(id__in=list(velocity)).order_by())
+
+    ranked = sorted(
+        candidates.values(),
+        key=lambda row: (not row["is_prefix"], -velocity.get(row["id"], 0), row["name"].lower()),
+    )
+    return ranked[:limit]
+
+
+def normalize_code(code):
+    code = (code or "").strip()
+    return code or None
+
+
+def find_items_by_codes(*, shop, codes):
+    """
+        Résout des codes scannés (code-barres, sinon SKU) en une requête.
+        Renvoie {code: article}, sans les codes inconnus.
+    """
+    codes = [code for code in map(normalize_code, codes) if code]
+    if not codes:
+        return {}
+    rows = list(
+        Item.objects.filter(shop=shop)
+        .filter(Q(barcode__in=codes) | Q(sku__in=codes))
+        .order_by()
+        .values(*SCAN_FIELDS)
+    )
+    by_barcode = {row["barcode"]: row for row in rows if row["barcode"]}
+    by_sku = {row["sku"]: row for row in rows if row["sku"]}
+    found = {}
+    for code in codes:
+        row = by_barcode.get(code) or by_sku.get(code)
+        if row is not None:
+            found[code] = row
+    return found
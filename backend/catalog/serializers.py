@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Category, Item
-from .services import create_item
+from .services import check_item_codes, create_item, update_item
+from .search import MAX_SCAN_CODES, SUGGEST_DEFAULT_LIMIT, normalize_code
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -17,11 +18,29 @@ class ItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Item
         fields = [
-            "id", "name", "slug", "description", "category", "category_name",
-            "vendor", "vendor_name", "quantity", "price", "purchase_price",
+            "id", "name", "slug", "barcode", "sku", "description", "category", "category_name",
+            "vendor", "vendor_name", "quantity", "price", "purchase_price", "average_cost",
             "expiring_date", "created_at", "updated_at",
         ]
-        read_only_fields = ["id", "slug", "created_at", "updated_at"]
+        read_only_fields = ["id", "slug", "average_cost", "created_at", "updated_at"]
+
+    def validate_barcode(self, value):
+        return normalize_code(value)
+
+    def validate_sku(self, value):
+        return normalize_code(value)
+
+    def validate(self, attrs):
+        # En création, create_item fait la vérification.
+        if self.instance is not None:
+            try:
+                check_item_codes(
+                    shop=self.instance.shop_id, barcode=attrs.get("barcode"), sku=attrs.get("sku"),
+                    exclude_id=self.instance.id,
+                )
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
+        return attrs
 
     def create(self, validated_data):
         shop = self.context["request"].shop
@@ -32,8 +51,113 @@ class ItemSerializer(serializers.ModelSerializer):
         except ValueError as e:
             raise serializers.ValidationError(str(e))
 
+    def update(self, instance, validated_data):
+        return update_item(item=instance, **validated_data)
+
 
 class QuickItemCreateSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=50)
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
     quantity = serializers.IntegerField(min_value=0, default=1)
+    barcode = serializers.CharField(max_length=64, required=False, allow_null=True, allow_blank=True, default=None)
+
+    def validate_barcode(self, value):
+        return normalize_code(value)
+
+
+class ItemSuggestQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=50, trim_whitespace=True)
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=SUGGEST_DEFAULT_LIMIT)
+
+
+class ItemSuggestionSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    name = serializers.CharField()
+    slug = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField()
+    category_name = serializers.CharField()
+
+
+class ItemScanSerializer(serializers.Serializer):
+    """Ce qu'il faut à la caisse pour ajouter l'article au panier."""
+    id = serializers.UUIDField()
+    name = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField()
+    barcode = serializers.CharField(allow_null=True)
+    sku = serializers.CharField(allow_null=True)
+
+
+class ItemCodesQuerySerializer(serializers.Serializer):
+    codes = serializers.CharField(help_text="Codes scannés séparés par des virgules")
+
+    def validate_codes(self, value):
+        codes = list(dict.fromkeys(code for code in map(normalize_code, value.split(",")) if code))
+        if not codes:
+            raise serializers.ValidationError("Aucun code fourni.")
+        if len(codes) > MAX_SCAN_CODES:
+            raise serializers.ValidationError(f"{MAX_SCAN_CODES} codes au maximum par requête.")
+        return codes
+
+
+class ScannedCodeSerializer(serializers.Serializer):
+    code = serializers.CharField()
+    item = ItemScanSerializer()
+
+
+class ItemCodesResultSerializer(serializers.Serializer):
+    items = ScannedCodeSerializer(many=True)
+    missing = serializers.ListField(child=serializers.CharField())
+
+
+class CatalogSyncQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False, help_text="Jeton `version` de la synchronisation précédente")
+
+
+class CatalogSyncSerializer(serializers.Serializer):
+    version = serializers.CharField()
+    full = serializers.BooleanField(help_text="true : remplacer tout le catalogue local")
+    fields = serializers.ListField(child=serializers.CharField())
+    items = serializers.ListField(child=serializers.ListField(), help_text="Une liste par article, dans l'ordre de `fields`")
+    deleted = serializers.ListField(child=serializers.UUIDField())
+    categories = serializers.ListField(child=serializers.ListField(), help_text="[id, nom]")
+
+
+class ItemImportRowSerializer(serializers.Serializer):
+    """Une ligne du fichier d'import, cellules déjà nettoyées (voir catalog/imports.py)."""
+    name = serializers.CharField(max_length=50)
+    barcode = serializers.CharField(max_length=64, required=False, allow_null=True, default=None)
+    sku = serializers.CharField(max_length=64, required=False, allow_null=True, default=None)
+    category = serializers.CharField(max_length=50, required=False, allow_null=True, default=None)
+    vendor = serializers.CharField(max_length=50, required=False, allow_null=True, default=None)
+    quantity = serializers.IntegerField(min_value=0, default=0)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    purchase_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, default=0)
+    expiring_date = serializers.DateTimeField(required=False, allow_null=True, default=None)
+    description = serializers.CharField(max_length=256, required=False, allow_null=True, default=None)
+
+    def validate_barcode(self, value):
+        return normalize_code(value)
+
+    def validate_sku(self, value):
+        return normalize_code(value)
+
+
+class ItemImportSerializer(serializers.Serializer):
+    file = serializers.FileField(help_text="Fichier .csv (UTF-8, séparateur , ou ;) ou .xlsx, en-têtes de l'export des articles")
+    dry_run = serializers.BooleanField(default=False, help_text="Valider le fichier sans rien enregistrer")
+
+
+class ItemImportErrorSerializer(serializers.Serializer):
+    row = serializers.IntegerField(help_text="Numéro de ligne dans le fichier (en-tête = 1)")
+    errors = serializers.DictField()
+
+
+class ItemImportReportSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    categories_created = serializers.IntegerField()
+    vendors_created = serializers.IntegerField()
+    error_count = serializers.IntegerField()
+    errors = ItemImportErrorSerializer(many=True, help_text="Lignes ignorées (500 premières)")
+    dry_run = serializers.BooleanField()
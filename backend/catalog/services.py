@@ -3,6 +3,9 @@ from django.db import transaction
 from catalog.models import Item
 from catalog.models import Category
 
+from inventory.ledger import record_movements
+from inventory.models import StockMovementKind
+
 
 DEFAULT_CATEGORY_NAME = "Divers"
 
@@ -12,23 +15,37 @@ def get_or_create_default_category(*, merchant):
     return category
 
 
+def check_item_codes(*, shop, barcode=None, sku=None, exclude_id=None):
+    """Un code-barres ou un SKU désigne un seul article de la boutique."""
+    others = Item.objects.filter(shop=shop).exclude(id=exclude_id)
+    if barcode and others.filter(barcode=barcode).exists():
+        raise ValueError(f"Le code-barres {barcode} est déjà attribué à un autre article de la boutique.")
+    if sku and others.filter(sku=sku).exists():
+        raise ValueError(f"Le SKU {sku} est déjà attribué à un autre article de la boutique.")
+
+
 @transaction.atomic
-def quick_create_item(*, shop, name, price, quantity=1):
+def quick_create_item(*, shop, name, price, quantity=1, barcode=None):
     """
         Création rapide depuis l'écran de vente — accessible à tout membre de la
         boutique, y compris CASHIER. Pas de choix de catégorie (assignée
         automatiquement) ni de fournisseur, pour rester dans l'esprit
         "vente en 15 secondes".
     """
+    check_item_codes(shop=shop, barcode=barcode)
     category = get_or_create_default_category(merchant=shop.owner)
-    return Item.objects.create(
+    item = Item.objects.create(
         shop=shop,
         category=category,
         name=name,
+        barcode=barcode,
         price=price,
         purchase_price=price,
+        average_cost=price,
         quantity=quantity,
     )
+    record_movements(shop=shop, kind=StockMovementKind.OPENING, quantities={item.id: item.quantity})
+    return item
 
 
 @transaction.atomic
@@ -37,5 +54,33 @@ def create_item(*, shop, category, vendor=None, **fields):
         raise ValueError("Cette catégorie n'appartient pas à votre commerce.")
     if vendor and vendor.merchant_id != shop.owner_id:
         raise ValueError("Ce fournisseur n'appartient pas à votre commerce.")
+    check_item_codes(shop=shop, barcode=fields.get("barcode"), sku=fields.get("sku"))
+
+    fields.setdefault("average_cost", fields.get("purchase_price", 0))
+    item = Item.objects.create(shop=shop, category=category, vendor=vendor, **fields)
+    record_movements(shop=shop, kind=StockMovementKind.OPENING, quantities={item.id: item.quantity})
+    return item
+
+
+@transaction.atomic
+def update_item(*, item, **fields):
+    """
+        Seuls les champs reçus sont écrits. La quantité est relue sous verrou :
+        une vente validée entre-temps n'est pas écrasée, et l'ajustement
+        journalisé est l'écart avec le stock réel, pas avec l'article lu par la vue.
+    """
+    current = Item.objects.select_for_update().only("quantity", "average_cost").get(pk=item.pk)
+    # Valeurs tenues à jour par UPDATE (ventes, achats) : celles de l'instance peuvent être périmées.
+    item.quantity, item.average_cost = current.quantity, current.average_cost
+    if fields.get("quantity") == current.quantity:
+        fields.pop("quantity")
 
-    return Item.objects.create(shop=shop, category=category, vendor=vendor, **fields)
+    for field, value in fields.items():
+        setattr(item, field, value)
+    item.save(update_fields=[*fields, "updated_at"])
+    if "quantity" in fields:
+        record_movements(
+            shop=item.shop, kind=StockMovementKind.ADJUSTMENT,
+            quantities={item.id: item.quantity - current.quantity},
+        )
+    return item
@@ -0,0 +1,14 @@
+from django.dispatch import receiver
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+
+from catalog.models import Category, Item, ItemTombstone
+
+
+@receiver(post_delete, sender=Item)
+def record_item_tombstone(sender, instance, origin=None, **kwargs):
+    # Article supprimé seul ou avec sa catégorie. Pas lors de la suppression d'une
+    # boutique ou d'un commerçant : il n'y a plus de caisse à synchroniser.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model in (Item, Category):
+        ItemTombstone.objects.create(shop_id=instance.shop_id, item_id=instance.id)
@@ -0,0 +1,78 @@
+"""
+    Synchronisation du catalogue des caisses (GET .../items/sync/).
+
+    Sans paramètre : instantané complet de la boutique et un jeton de version.
+    Avec ?since=<jeton> : seulement les articles créés ou modifiés depuis
+    (updated_at) et les id supprimés (ItemTombstone). La caisse garde le
+    catalogue en mémoire, cherche localement et applique les deltas.
+
+    Les lignes d'articles sont des listes dans l'ordre de `fields`, sans
+    répéter les clés. Les catégories, peu nombreuses, sont toujours
+    renvoyées en entier (un renommage ne touche pas aux articles).
+
+    Un jeton illisible, d'une autre boutique ou plus ancien que la rétention
+    des suppressions (CATALOG_TOMBSTONE_TTL) donne un instantané complet
+    (`full`: true) : la caisse remplace alors son catalogue.
+"""
+import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from catalog.models import Category, Item, ItemTombstone
+
+SYNC_TOKEN_SALT = "catalog.sync"
+# Relecture d'une marge avant le jeton : une transaction validée juste après
+# (ou un réplica en retard) n'échappe pas au delta suivant. Les doublons sont
+# sans effet côté caisse.
+SYNC_OVERLAP = datetime.timedelta(minutes=2)
+SYNC_FIELDS = ("id", "name", "barcode", "sku", "price", "quantity", "category_id")
+
+
+def make_sync_token(*, shop, at):
+    return signing.dumps({"shop": str(shop.id), "at": at.isoformat()}, salt=SYNC_TOKEN_SALT)
+
+
+def read_sync_token(*, shop, token):
+    """Date du jeton, ou None s'il est inutilisable pour cette boutique."""
+    try:
+        data = signing.loads(token, salt=SYNC_TOKEN_SALT)
+        if data["shop"] != str(shop.id):
+            return None
+        return datetime.datetime.fromisoformat(data["at"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def _item_row(row):
+    row = list(row)
+    row[SYNC_FIELDS.index("price")] = str(row[SYNC_FIELDS.index("price")])
+    return row
+
+
+def get_catalog_sync(*, shop, since_token=None):
+    now = timezone.now()
+    since = read_sync_token(shop=shop, token=since_token) if since_token else None
+    full = since is None or since < now - settings.CATALOG_TOMBSTONE_TTL
+
+    items = Item.objects.filter(shop=shop)
+    deleted = []
+    if not full:
+        cutoff = since - SYNC_OVERLAP
+        items = items.filter(updated_at__gte=cutoff)
+        deleted = list(
+            ItemTombstone.objects.filter(shop=shop, created_at__gte=cutoff)
+            .order_by().values_list("item_id", flat=True).distinct()
+        )
+
+    return {
+        "version": make_sync_token(shop=shop, at=now),
+        "full": full,
+        "fields": list(SYNC_FIELDS),
+        "items": [_item_row(row) for row in items.order_by().values_list(*SYNC_FIELDS)],
+        "deleted": deleted,
+        "categories": list(
+            Category.objects.filter(merchant_id=shop.owner_id).order_by("name").values_list("id", "name")
+        ),
+    }
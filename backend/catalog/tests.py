@@ -1,3 +1,289 @@
+import io
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.utils import timezone
+
+from openpyxl import Workbook
+
+from rest_framework.test import APIClient
+
+from catalog.models import Category, Item
+from catalog.search import find_items_by_codes, suggest_items
+from catalog.sync import SYNC_FIELDS, get_catalog_sync, make_sync_token
+from catalog.services import quick_create_item, update_item
+
+from inventory.consistency import verify_shop_stock
+from inventory.models import StockMovement, StockMovementKind
+
+from sales.services import create_sale
+
+from tenants.services import register_merchant
+
+
+class UpdateItemTests(TestCase):
+    """L'instance passée à update_item a été lue avant une vente : elle est périmée."""
+
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        self.item = quick_create_item(shop=self.shop, name="Savon", price=Decimal("100"), quantity=10)
+        self.stale = Item.objects.get(pk=self.item.pk)
+        create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": self.item.id, "price": Decimal("100"), "quantity": 3, "total_item": Decimal("300")}],
+            payment_data={"sub_total": Decimal("300"), "grand_total": Decimal("300"),
+                          "amount_paid": Decimal("300"), "cash_payment_amount": Decimal("300")},
+        )
+
+    def _adjustments(self):
+        return list(StockMovement.objects.filter(item=self.item, kind=StockMovementKind.ADJUSTMENT).values_list("quantity", flat=True))
+
+    def test_update_without_quantity_keeps_the_sale(self):
+        update_item(item=self.stale, name="Savon de Marseille")
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.name, self.item.quantity), ("Savon de Marseille", 7))
+        self.assertEqual(self._adjustments(), [])
+
+    def test_quantity_adjustment_is_measured_against_real_stock(self):
+        update_item(item=self.stale, quantity=12)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 12)
+        self.assertEqual(self._adjustments(), [5])
+        self.assertEqual(verify_shop_stock(shop_id=self.shop.id)["drifts"], [])
+
+    def test_unchanged_quantity_records_nothing(self):
+        update_item(item=self.stale, quantity=7, price=Decimal("120"))
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.quantity, self.item.price), (7, Decimal("120")))
+        self.assertEqual(self._adjustments(), [])
+
+
+class ItemSearchTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        _, _, self.other_shop = register_merchant(
+            username="other", password="not-used", company_name="Autre", shop_name="Ailleurs"
+        )
+        self.addCleanup(cache.clear)
+        self.coca = quick_create_item(shop=self.shop, name="Coca-Cola 33cl", price=Decimal("500"), barcode="5449000000996")
+        self.candy = quick_create_item(shop=self.shop, name="Bonbon coca", price=Decimal("50"), quantity=100)
+        self.syrup = quick_create_item(shop=self.shop, name="Sirop coca", price=Decimal("900"), quantity=100)
+        quick_create_item(shop=self.shop, name="Pepsi 33cl", price=Decimal("500"))
+        quick_create_item(shop=self.other_shop, name="Coca-Cola 50cl", price=Decimal("600"), barcode="5449000000439")
+
+    def _names(self, query):
+        return [row["name"] for row in suggest_items(shop=self.shop, query=query)]
+
+    def test_name_prefix_comes_first_then_alphabetical(self):
+        self.assertEqual(self._names("coca"), ["Coca-Cola 33cl", "Bonbon coca", "Sirop coca"])
+
+    def test_recent_sales_rank_ahead_of_alphabetical_order(self):
+        create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": self.syrup.id, "price": Decimal("900"), "quantity": 5, "total_item": Decimal("4500")}],
+            payment_data={"sub_total": Decimal("4500"), "grand_total": Decimal("4500"),
+                          "amount_paid": Decimal("4500"), "cash_payment_amount": Decimal("4500")},
+        )
+        self.assertEqual(self._names("coca"), ["Coca-Cola 33cl", "Sirop coca", "Bonbon coca"])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self._names("coca 33"), ["Coca-Cola 33cl"])
+        self.assertEqual(self._names("544900"), ["Coca-Cola 33cl"])
+        self.assertEqual(self._names("   "), [])
+
+    def test_other_shops_items_are_never_suggested(self):
+        self.assertNotIn("Coca-Cola 50cl", self._names("coca"))
+        self.assertEqual(self._names("50cl"), [])
+
+    def test_scanned_codes_resolve_within_the_shop(self):
+        found = find_items_by_codes(shop=self.shop, codes=[" 5449000000996 ", "5449000000439", "inconnu"])
+        self.assertEqual({code: row["id"] for code, row in found.items()}, {"5449000000996": self.coca.id})
+
+
+class ItemCodeTests(TestCase):
+    def setUp(self):
+        self.user, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        self.soap = quick_create_item(shop=self.shop, name="Savon", price=Decimal("100"), barcode="6001234500011")
+        Item.objects.filter(pk=self.soap.pk).update(sku="SAV-01")
+        self.oil = quick_create_item(shop=self.shop, name="Huile", price=Decimal("900"))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _patch(self, item, data):
+        return self.client.patch(f"/api/shops/{self.shop.id}/items/{item.id}/", data, format="json")
+
+    def test_barcode_is_unique_within_the_shop_only(self):
+        with self.assertRaisesMessage(ValueError, "Le code-barres 6001234500011 est déjà attribué"):
+            quick_create_item(shop=self.shop, name="Savon noir", price=Decimal("150"), barcode="6001234500011")
+
+        _, _, other_shop = register_merchant(
+            username="other", password="not-used", company_name="Autre", shop_name="Ailleurs"
+        )
+        quick_create_item(shop=other_shop, name="Savon", price=Decimal("100"), barcode="6001234500011")
+
+    def test_update_refuses_a_code_of_another_item(self):
+        response = self._patch(self.oil, {"sku": " SAV-01 "})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Le SKU SAV-01 est déjà attribué", str(response.data))
+
+        response = self._patch(self.soap, {"sku": "SAV-01", "barcode": "6001234500011"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_blank_codes_are_stored_as_null(self):
+        for item in (self.oil, self.soap):
+            response = self._patch(item, {"barcode": "  ", "sku": ""})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(Item.objects.filter(shop=self.shop, barcode__isnull=True, sku__isnull=True).count(), 2)
+
+    def test_database_constraint_backs_the_check(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Item.objects.filter(pk=self.oil.pk).update(sku="SAV-01")
+
+
+class CatalogSyncTests(TestCase):
+    def setUp(self):
+        self.user, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        self.soap = quick_create_item(shop=self.shop, name="Savon", price=Decimal("100"), quantity=10)
+        self.oil = quick_create_item(shop=self.shop, name="Huile", price=Decimal("900"), quantity=5)
+        # Catalogue synchronisé il y a une heure, bien avant la marge de relecture.
+        an_hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        Item.objects.filter(shop=self.shop).update(updated_at=an_hour_ago)
+        self.token = make_sync_token(shop=self.shop, at=an_hour_ago + datetime.timedelta(minutes=10))
+
+    @staticmethod
+    def _rows(sync):
+        return {row[SYNC_FIELDS.index("id")]: dict(zip(sync["fields"], row)) for row in sync["items"]}
+
+    def test_without_token_the_whole_catalog_is_sent(self):
+        sync = get_catalog_sync(shop=self.shop)
+
+        self.assertTrue(sync["full"])
+        self.assertEqual(set(self._rows(sync)), {self.soap.id, self.oil.id})
+        self.assertEqual(self._rows(sync)[self.oil.id]["price"], str(Item.objects.get(pk=self.oil.pk).price))
+
+    def test_delta_carries_sold_items_and_tombstones_only(self):
+        create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": self.soap.id, "price": Decimal("100"), "quantity": 3, "total_item": Decimal("300")}],
+            payment_data={"sub_total": Decimal("300"), "grand_total": Decimal("300"),
+                          "amount_paid": Decimal("300"), "cash_payment_amount": Decimal("300")},
+        )
+        oil_id = self.oil.id
+        self.oil.delete()
+
+        sync = get_catalog_sync(shop=self.shop, since_token=self.token)
+
+        self.assertFalse(sync["full"])
+        self.assertEqual({item_id: row["quantity"] for item_id, row in self._rows(sync).items()}, {self.soap.id: 7})
+        self.assertEqual(sync["deleted"], [oil_id])
+
+    def test_unusable_token_falls_back_to_a_full_snapshot(self):
+        _, _, other_shop = register_merchant(
+            username="other", password="not-used", company_name="Autre", shop_name="Ailleurs"
+        )
+        expired = timezone.now() - settings.CATALOG_TOMBSTONE_TTL - datetime.timedelta(days=1)
+        tokens = {
+            "altéré": self.token[:-2] + "xx",
+            "autre boutique": make_sync_token(shop=other_shop, at=timezone.now()),
+            "expiré": make_sync_token(shop=self.shop, at=expired),
+        }
+        for label, token in tokens.items():
+            with self.subTest(token=label):
+                sync = get_catalog_sync(shop=self.shop, since_token=token)
+                self.assertTrue(sync["full"])
+                self.assertEqual(len(sync["items"]), 2)
+
+    def test_sync_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(f"/api/shops/{self.shop.id}/items/sync/", {"since": self.token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["full"], response.data["items"]), (False, []))
+
+
+class ItemImportTests(TestCase):
+    def setUp(self):
+        self.user, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        quick_create_item(shop=self.shop, name="Savon", price=Decimal("100"), barcode="6001234500011")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/shops/{self.shop.id}/items/import/"
+
+    def _upload(self, name, content, **data):
+        return self.client.post(self.url, {"file": SimpleUploadedFile(name, content), **data}, format="multipart")
+
+    def _csv(self, name="articles.csv", **data):
+        content = "\n".join([
+            "Nom;Code-barres;Catégorie;Quantité;Prix de vente",
+            "Huile;;Épicerie;12;1 500,50",
+            "Riz;6001234500011;Épicerie;3;800",
+            ";;;4;100",
+            "Sucre;123;;x;500",
+            "Sel;777;;1;50",
+            "Sel fin;777;;1;60",
+        ]).encode("utf-8")
+        return self._upload(name, content, **data)
+
+    def test_valid_rows_are_imported_and_bad_ones_reported_by_line(self):
+        response = self._csv()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["error_count"]), (2, 4))
+        self.assertEqual(
+            {error["row"]: set(error["errors"]) for error in response.data["errors"]},
+            {3: {"barcode"}, 4: {"name"}, 5: {"quantity"}, 7: {"barcode"}},
+        )
+        oil = Item.objects.get(shop=self.shop, name="Huile")
+        self.assertEqual((oil.price, oil.quantity, oil.category.name), (Decimal("1500.50"), 12, "Épicerie"))
+        self.assertEqual(response.data["categories_created"], 1)
+
+    def test_dry_run_reports_without_saving(self):
+        response = self._csv(dry_run=True)
+
+        self.assertEqual((response.data["created"], response.data["error_count"]), (2, 4))
+        self.assertEqual(Item.objects.filter(shop=self.shop).count(), 1)
+        self.assertFalse(Category.objects.filter(name="Épicerie").exists())
+
+    def test_xlsx_rows_are_numbered_like_the_sheet(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["name", "price", "quantity"])
+        sheet.append(["Huile", 1500, 12])
+        sheet.append(["Riz", -5, 3])
+        output = io.BytesIO()
+        workbook.save(output)
+
+        response = self._upload("articles.xlsx", output.getvalue())
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([(error["row"], set(error["errors"])) for error in response.data["errors"]], [(3, {"price"})])
 
-# Create your tests here.
+    def test_unreadable_files_are_refused(self):
+        cases = {
+            "format": ("articles.txt", b"Nom,Prix\nHuile,1500", "Format non pris en charge"),
+            "en-têtes": ("articles.csv", b"Article;Stock\nHuile;12", "Colonnes obligatoires absentes"),
+            "encodage": ("articles.csv", "Nom;Prix\nCrème;1500".encode("latin-1"), "Fichier CSV illisible"),
+            "xlsx": ("articles.xlsx", b"pas un classeur", "Fichier XLSX illisible"),
+        }
+        for label, (name, content, message) in cases.items():
+            with self.subTest(case=label):
+                response = self._upload(name, content)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, str(response.data))
+        self.assertEqual(Item.objects.filter(shop=self.shop).count(), 1)
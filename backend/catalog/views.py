@@ -1,19 +1,43 @@
-from rest_framework import viewsets
+import datetime
+
+from django.utils import timezone
+
+from rest_framework import viewsets, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import MultiPartParser
 
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+
+from core.exports import ExportMixin
+from core.filters import day_range
+from core.db_routing import ReplicaReadMixin
+from core.idempotency import IdempotencyMixin
+from core.pagination import PageOrKeysetPagination
 from core.permissions import IsShopMember, ManagerOnlyMixin
-from core.schema import shop_scoped_schema
+from core.schema import SHOP_PK_PARAMETER, shop_scoped_schema
+from core.sparse_fields import SparseFieldsMixin
 
 from core.permissions import IsShopManager
 
 from catalog.models import Category, Item
+from catalog.imports import import_items_file
+from catalog.search import find_items_by_codes, normalize_code, suggest_items
+from catalog.sync import get_catalog_sync
 from catalog.services import quick_create_item
 from catalog.serializers import CategorySerializer, ItemSerializer, QuickItemCreateSerializer
+from catalog.serializers import ItemSuggestionSerializer, ItemSuggestQuerySerializer
+from catalog.serializers import ItemCodesQuerySerializer, ItemCodesResultSerializer, ItemScanSerializer
+from catalog.serializers import CatalogSyncQuerySerializer, CatalogSyncSerializer
+from catalog.serializers import ItemImportReportSerializer, ItemImportSerializer
+
+from inventory.ledger import movement_history
+from inventory.serializers import StockHistoryQuerySerializer, StockHistorySerializer
 
 
 @shop_scoped_schema
-class CategoryViewSet(ManagerOnlyMixin, viewsets.ModelViewSet):
+class CategoryViewSet(SparseFieldsMixin, ReplicaReadMixin, IdempotencyMixin, ManagerOnlyMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsShopMember]
     search_fields = ["name"]
@@ -31,27 +55,150 @@ class CategoryViewSet(ManagerOnlyMixin, viewsets.ModelViewSet):
 
 
 @shop_scoped_schema
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(ExportMixin, SparseFieldsMixin, ReplicaReadMixin, IdempotencyMixin, viewsets.ModelViewSet):
     serializer_class = ItemSerializer
+    pagination_class = PageOrKeysetPagination
     filterset_fields = ["category", "vendor"]
     search_fields = ["name"]
+    sparse_select_related = {"category_name": ["category"], "vendor_name": ["vendor"]}
+
+    export_filename = "articles"
+    export_select_related = ["category", "vendor"]
+    export_columns = [
+        ("Nom", "name"),
+        ("Code-barres", "barcode"),
+        ("SKU", "sku"),
+        ("Catégorie", "category.name"),
+        ("Fournisseur", "vendor.name"),
+        ("Quantité", "quantity"),
+        ("Prix de vente", "price"),
+        ("Prix d'achat", "purchase_price"),
+        ("Date d'expiration", "expiring_date"),
+    ]
 
     def get_permissions(self):
-        # Modifier/supprimer un article reste réservé à OWNER/MANAGER.
+        # Modifier/supprimer/importer des articles reste réservé à OWNER/MANAGER.
         # La lecture et la création (y compris quick_create) restent ouvertes
         # à tout membre de la boutique — nécessaire pour la vente au comptoir.
-        if self.action in ["update", "partial_update", "destroy"]:
+        if self.action in ["update", "partial_update", "destroy", "import_items"]:
             return [IsShopMember(), IsShopManager()]
         return [IsShopMember()]
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
             return Item.objects.none()
-        return Item.objects.filter(shop=self.request.shop).select_related("category", "vendor")
+        return Item.objects.filter(shop=self.request.shop)
 
     @action(detail=False, methods=["post"], url_path="quick-create")
     def quick_create(self, request, *args, **kwargs):
         serializer = QuickItemCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        item = quick_create_item(shop=request.shop, **serializer.validated_data)
+        try:
+            item = quick_create_item(shop=request.shop, **serializer.validated_data)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
         return Response(ItemSerializer(item).data, status=201)
+
+    @extend_schema(
+        parameters=[
+            SHOP_PK_PARAMETER,
+            OpenApiParameter(name="q", type=str, required=True, description="Saisie en cours"),
+            OpenApiParameter(name="limit", type=int, description="Nombre de suggestions (1-20)"),
+        ],
+        responses={200: ItemSuggestionSerializer(many=True)},
+        summary="Suggestions d'articles pour la saisie au comptoir",
+    )
+    @action(detail=False, methods=["get"], url_path="suggest")
+    def suggest(self, request, *args, **kwargs):
+        """
+            Recherche indexée, classée par correspondance en début de nom puis
+            par ventes récentes. Liste simple, sans pagination ni comptage.
+        """
+        query = ItemSuggestQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        items = suggest_items(shop=request.shop, query=query.validated_data["q"], limit=query.validated_data["limit"])
+        return Response(ItemSuggestionSerializer(items, many=True).data)
+
+    @extend_schema(
+        parameters=[SHOP_PK_PARAMETER, OpenApiParameter(name="code", type=str, location=OpenApiParameter.PATH)],
+        responses={200: ItemScanSerializer},
+        summary="Article correspondant à un code-barres ou un SKU scanné",
+    )
+    @action(detail=False, methods=["get"], url_path=r"by-code/(?P<code>[^/]+)")
+    def by_code(self, request, code, *args, **kwargs):
+        item = find_items_by_codes(shop=request.shop, codes=[code]).get(normalize_code(code))
+        if item is None:
+            raise NotFound("Aucun article ne porte ce code.")
+        return Response(ItemScanSerializer(item).data)
+
+    @extend_schema(
+        parameters=[SHOP_PK_PARAMETER, OpenApiParameter(name="codes", type=str, required=True,
+                                                        description="Codes séparés par des virgules (100 max)")],
+        responses={200: ItemCodesResultSerializer},
+        operation_id="items_by_code_batch",
+        summary="Résoudre une série de codes scannés",
+    )
+    @action(detail=False, methods=["get"], url_path="by-code")
+    def by_codes(self, request, *args, **kwargs):
+        """Une seule requête pour toute la série ; les codes inconnus sont listés dans `missing`."""
+        query = ItemCodesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        codes = query.validated_data["codes"]
+        found = find_items_by_codes(shop=request.shop, codes=codes)
+        return Response(ItemCodesResultSerializer({
+            "items": [{"code": code, "item": found[code]} for code in codes if code in found],
+            "missing": [code for code in codes if code not in found],
+        }).data)
+
+    @extend_schema(
+        parameters=[SHOP_PK_PARAMETER, CatalogSyncQuerySerializer],
+        responses={200: CatalogSyncSerializer},
+        summary="Synchroniser le catalogue de la caisse (instantané puis deltas)",
+    )
+    @action(detail=False, methods=["get"], url_path="sync")
+    def sync(self, request, *args, **kwargs):
+        query = CatalogSyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(get_catalog_sync(shop=request.shop, since_token=query.validated_data.get("since")))
+
+    @extend_schema(
+        parameters=[SHOP_PK_PARAMETER],
+        request={"multipart/form-data": ItemImportSerializer},
+        responses={200: ItemImportReportSerializer},
+        summary="Importer des articles depuis un fichier CSV ou XLSX",
+    )
+    @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser])
+    def import_items(self, request, *args, **kwargs):
+        """
+            Les lignes valides sont créées, les autres listées dans `errors`
+            avec leur numéro de ligne. Catégories et fournisseurs inconnus sont
+            créés ; sans catégorie, l'article va dans « Divers ».
+        """
+        serializer = ItemImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        try:
+            report = import_items_file(
+                shop=request.shop, file=upload, filename=upload.name,
+                dry_run=serializer.validated_data["dry_run"],
+            )
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return Response(ItemImportReportSerializer(report).data)
+
+    @extend_schema(
+        parameters=[SHOP_PK_PARAMETER, StockHistoryQuerySerializer],
+        responses={200: StockHistorySerializer},
+        summary="Historique du stock d'un article (journal des mouvements)",
+    )
+    @action(detail=True, methods=["get"], url_path="stock-history")
+    def stock_history(self, request, *args, **kwargs):
+        query = StockHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        tzinfo = request.shop.tzinfo
+        date_to = query.validated_data.get("date_to") or timezone.localdate(timezone=tzinfo)
+        date_from = query.validated_data.get("date_from") or date_to - datetime.timedelta(days=29)
+        start, end = day_range(date_from=date_from, date_to=date_to, tzinfo=tzinfo)
+
+        history = movement_history(item=self.get_object(), date_from=start, date_to=end)
+        return Response(StockHistorySerializer({"date_from": date_from, "date_to": date_to, **history}).data)
@@ -0,0 +1,137 @@
+"""
+    Lectures sur réplicas (DATABASE_REPLICA_URLS).
+
+    Seules les vues marquées ReplicaReadMixin envoient leurs lectures (GET,
+    HEAD, OPTIONS) sur un réplica, une fois l'authentification et les
+    permissions vérifiées sur la base principale. Après une écriture réussie,
+    l'utilisateur reste sur la principale pendant DATABASE_REPLICA_STICKY_SECONDS :
+    il relit ce qu'il vient d'écrire malgré le retard de réplication. Le marqueur
+    vit dans un cache partagé (DATABASE_REPLICA_STICKY_CACHE), pas dans la
+    mémoire du worker qui a traité l'écriture.
+
+    DatabaseRoutingMiddleware remet le routage à zéro à chaque requête,
+    marque les écritures et journalise la décision (logger "mouegne.db_routing",
+    en-tête X-Database-Route).
+"""
+import time
+import random
+import logging
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import FileResponse
+from django.db import DEFAULT_DB_ALIAS
+
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger("mouegne.db_routing")
+
+ROUTE_HEADER = "X-Database-Route"
+# Les caches en base (rapports, marqueur de routage) sont lus et écrits sur la principale, jamais sur un réplica.
+PRIMARY_ONLY_APP_LABELS = {"django_cache"}
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def replica_aliases():
+    return settings.DATABASE_REPLICAS
+
+
+def _sticky_key(user_id):
+    return f"db-primary-sticky:{user_id}"
+
+
+def _sticky_cache():
+    return caches[settings.DATABASE_REPLICA_STICKY_CACHE]
+
+
+def pin_to_primary(user):
+    """Les lectures de l'utilisateur restent sur la base principale quelques secondes."""
+    if replica_aliases() and user is not None and user.is_authenticated:
+        _sticky_cache().set(_sticky_key(user.pk), True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def choose_read_alias(request):
+    """Renvoie (alias, raison) pour les lectures de la requête ; alias None = base principale."""
+    if request.method not in SAFE_METHODS:
+        return None, "write"
+    replicas = replica_aliases()
+    if not replicas:
+        return None, "no_replica"
+    if request.user.is_authenticated and _sticky_cache().get(_sticky_key(request.user.pk)):
+        return None, "sticky"
+    return random.choice(replicas), "replica"
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APP_LABELS:
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les réplicas portent les mêmes données que la principale.
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in replica_aliases() else None
+
+
+class ReplicaReadMixin:
+    """
+        Envoie les lectures de la vue sur un réplica (listes, rapports,
+        exports). À réserver aux vues qui tolèrent un léger retard de
+        réplication : l'utilisateur qui vient d'écrire reste sur la principale.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        alias, reason = choose_read_alias(request)
+        _read_alias.set(alias)
+        request._request.db_route = (alias or DEFAULT_DB_ALIAS, reason)
+
+
+def _iter_with_read_alias(content, alias):
+    # Export en flux : les lignes sont lues pendant l'envoi, après le retour de la vue.
+    _read_alias.set(alias)
+    try:
+        yield from content
+    finally:
+        _read_alias.set(None)
+
+
+class DatabaseRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.db_route = (DEFAULT_DB_ALIAS, "not_routed")
+        _read_alias.set(None)
+        started = time.monotonic()
+        try:
+            response = self.get_response(request)
+        finally:
+            alias = _read_alias.get()
+            _read_alias.set(None)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(getattr(request, "user", None))
+        if alias and response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = _iter_with_read_alias(response.streaming_content, alias)
+
+        route_alias, reason = request.db_route
+        response[ROUTE_HEADER] = f"{route_alias}; reason={reason}"
+        logger.info(
+            "%s %s %s db=%s reason=%s duration_ms=%d",
+            request.method, request.path, response.status_code, route_alias, reason,
+            (time.monotonic() - started) * 1000,
+            extra={"db_alias": route_alias, "db_route_reason": reason},
+        )
+        return response
@@ -0,0 +1,162 @@
+"""
+    Exports en flux (CSV, XLSX, NDJSON) des ressources d'une boutique.
+
+    Les lignes sont lues par paquets (QuerySet.iterator) et écrites au fil de
+    l'eau : la mémoire reste stable quel que soit le volume exporté. Le XLSX
+    passe par le mode write-only d'openpyxl, qui écrit chaque feuille dans un
+    fichier temporaire, puis le classeur est servi depuis le disque.
+"""
+import csv
+import json
+import datetime
+import tempfile
+from decimal import Decimal
+
+from django.utils import timezone
+from django.http import FileResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+
+from openpyxl import Workbook
+
+from rest_framework.decorators import action
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+
+from core.permissions import IsShopMember, IsShopManagerStrict
+from core.schema import SHOP_PK_PARAMETER
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def _resolve(instance, accessor):
+    if callable(accessor):
+        return accessor(instance)
+    value = instance
+    for attr in accessor.split("."):
+        value = getattr(value, attr, None)
+        if value is None:
+            return None
+    return value() if callable(value) else value
+
+
+def _cell(value, tzinfo):
+    if isinstance(value, datetime.datetime):
+        # Heure locale de la boutique, sans fuseau : openpyxl refuse les dates « aware ».
+        value = timezone.localtime(value, tzinfo).replace(tzinfo=None) if timezone.is_aware(value) else value
+        return value.replace(microsecond=0)
+    if isinstance(value, (str, int, float, bool, Decimal, datetime.date)) or value is None:
+        return value
+    return str(value)
+
+
+def iter_rows(queryset, columns, tzinfo=None, chunk_size=EXPORT_CHUNK_SIZE):
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield [_cell(_resolve(instance, accessor), tzinfo) for _, accessor in columns]
+
+
+def _stream_csv(rows, headers):
+    writer = csv.writer(_Echo())
+    yield "\ufeff"  # BOM : Excel ouvre le fichier en UTF-8 (accents)
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _stream_ndjson(rows, headers):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def _write_xlsx(rows, headers, title):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def export_response(*, queryset, columns, export_format, filename, tzinfo=None, chunk_size=EXPORT_CHUNK_SIZE):
+    headers = [header for header, _ in columns]
+    rows = iter_rows(queryset, columns, tzinfo=tzinfo, chunk_size=chunk_size)
+    content_type = EXPORT_FORMATS[export_format]
+    filename = f"{filename}.{export_format}"
+
+    if export_format == "xlsx":
+        # FileResponse lit le fichier par blocs et le ferme (donc le supprime) en fin de réponse.
+        output = _write_xlsx(rows, headers, title=filename.rsplit(".", 1)[0])
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=content_type)
+
+    stream = _stream_csv(rows, headers) if export_format == "csv" else _stream_ndjson(rows, headers)
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+class ExportMixin:
+    """
+        Ajoute GET .../export/{csv|xlsx|ndjson}/ à un ViewSet, réservé à
+        OWNER/MANAGER. Le queryset exporté est celui de la liste, filtres et tri
+        compris (filterset_class, search, ordering), sans pagination.
+
+        export_columns : liste de (en-tête, attribut pointé ou callable).
+    """
+    export_columns = []
+    export_filename = "export"
+    export_select_related = []
+
+    def check_permissions(self, request):
+        # En plus des permissions de la vue, quelles qu'elles soient (get_permissions
+        # peut être redéfini par le ViewSet) : l'export reste réservé à OWNER/MANAGER.
+        super().check_permissions(request)
+        if self.action == "export":
+            for permission in (IsShopMember(), IsShopManagerStrict()):
+                if not permission.has_permission(request, self):
+                    self.permission_denied(request, message=getattr(permission, "message", None))
+
+    def get_export_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.export_select_related:
+            queryset = queryset.select_related(*self.export_select_related)
+        return queryset
+
+    def get_export_columns(self):
+        return self.export_columns
+
+    def get_export_filename(self):
+        return f"{self.export_filename}-{timezone.localdate(timezone=self.request.shop.tzinfo):%Y%m%d}"
+
+    @extend_schema(
+        parameters=[
+            SHOP_PK_PARAMETER,
+            OpenApiParameter(name="export_format", type=str, location=OpenApiParameter.PATH, enum=list(EXPORT_FORMATS)),
+        ],
+        responses={(200, content_type.split(";")[0]): OpenApiTypes.BINARY for content_type in EXPORT_FORMATS.values()},
+        summary="Exporter la liste filtrée (CSV, XLSX ou NDJSON)",
+    )
+    @action(detail=False, methods=["get"], url_path=r"export/(?P<export_format>csv|xlsx|ndjson)")
+    def export(self, request, export_format, *args, **kwargs):
+        return export_response(
+            queryset=self.get_export_queryset(),
+            columns=self.get_export_columns(),
+            export_format=export_format,
+            filename=self.get_export_filename(),
+            tzinfo=request.shop.tzinfo,
+        )
@@ -0,0 +1,70 @@
+import datetime
+from collections import defaultdict
+
+from django.db.models import Q
+from django.utils import timezone
+from django.core.validators import EMPTY_VALUES
+
+from django_filters import rest_framework as filters
+
+
+def day_start(day, tzinfo):
+    """Minuit local du jour donné, en datetime « aware »."""
+    return datetime.datetime.combine(day, datetime.time.min, tzinfo=tzinfo)
+
+
+def day_range(*, date_from, date_to, tzinfo):
+    """
+        Jours locaux [date_from, date_to] -> intervalle semi-ouvert [début, fin[
+        sur un champ datetime. Comparer la colonne brute à deux bornes permet
+        un parcours d'index, contrairement à created_at__date (cast par ligne).
+    """
+    return day_start(date_from, tzinfo), day_start(date_to + datetime.timedelta(days=1), tzinfo)
+
+
+def shops_day_range_q(*, shops, date_from, date_to, field="created_at"):
+    """
+        Même fenêtre de jours locaux sur plusieurs boutiques, chacune dans son
+        fuseau : une condition (shop_id IN (...) AND bornes) par fuseau distinct.
+    """
+    shop_ids_by_timezone = defaultdict(list)
+    for shop in shops:
+        shop_ids_by_timezone[shop.tzinfo].append(shop.id)
+
+    condition = Q(pk__in=[])
+    for tzinfo, shop_ids in shop_ids_by_timezone.items():
+        start, end = day_range(date_from=date_from, date_to=date_to, tzinfo=tzinfo)
+        condition |= Q(shop_id__in=shop_ids, **{f"{field}__gte": start, f"{field}__lt": end})
+    return condition
+
+
+def shop_tzinfo(shop):
+    return shop.tzinfo if shop is not None else timezone.get_current_timezone()
+
+
+class ShopDayFilter(filters.DateFilter):
+    """
+        Filtre une date locale de la boutique (request.shop) sur un champ
+        datetime : borne basse incluse (début du jour) ou, avec upper=True,
+        borne haute exclue (début du lendemain).
+    """
+
+    def __init__(self, *args, upper=False, **kwargs):
+        self.upper = upper
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        request = getattr(self.parent, "request", None)
+        tzinfo = shop_tzinfo(getattr(request, "shop", None))
+        if self.upper:
+            bound = day_start(value + datetime.timedelta(days=1), tzinfo)
+            return self.get_method(qs)(**{f"{self.field_name}__lt": bound})
+        return self.get_method(qs)(**{f"{self.field_name}__gte": day_start(value, tzinfo)})
+
+
+class ShopDateRangeFilterSet(filters.FilterSet):
+    """date_after / date_before (jours inclus) sur created_at, dans le fuseau de la boutique."""
+    date_after = ShopDayFilter(field_name="created_at")
+    date_before = ShopDayFilter(field_name="created_at", upper=True)
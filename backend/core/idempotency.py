@@ -0,0 +1,135 @@
+import json
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.exceptions import APIException
+
+from core.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+IDEMPOTENT_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Une requête portant cette clé d'idempotence est déjà en cours de traitement."
+    default_code = "idempotency_conflict"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "Cette clé d'idempotence a déjà été utilisée pour une autre requête."
+    default_code = "idempotency_key_reused"
+
+
+class _IdempotentReplay(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def _request_fingerprint(request):
+    """
+        Empreinte de la requête : méthode, chemin, utilisateur et corps. Le
+        corps est pris après parsing, clés triées : l'ordre des champs ne
+        compte pas, un fichier envoyé compte par son nom.
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{request.method}:{request.path}:{request.user.pk}:{body}".encode()
+    ).hexdigest()
+
+
+class IdempotencyMixin:
+    """
+        Honore l'en-tête Idempotency-Key sur les écritures d'une vue nestée sous
+        /shops/{shop_pk}/. La première réponse 2xx est mémorisée par boutique ;
+        une requête rejouée avec la même clé la reçoit telle quelle, sans
+        réexécuter le service. Une réponse en erreur n'est pas mémorisée, le
+        client peut donc réessayer. La même clé avec un autre corps (ou une
+        autre route) est refusée en 422 au lieu de rejouer une réponse qui ne
+        correspond pas à la requête.
+        Tant que la première requête est en cours, les suivantes reçoivent une
+        409 ; au-delà de IDEMPOTENCY_PENDING_TIMEOUT (updated_at sert de bail),
+        la clé est reprise par la requête suivante.
+
+        Le contrôle se fait après authentification et permissions (request.shop
+        est posé par IsShopMember) : une clé ne permet jamais de lire la réponse
+        d'un autre utilisateur ou d'une autre boutique.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self.idempotency_record = None
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        shop = getattr(request, "shop", None)
+        if not key or shop is None or request.method not in IDEMPOTENT_METHODS:
+            return
+
+        fingerprint = _request_fingerprint(request)
+
+        expired_before = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        IdempotencyKey.objects.filter(shop=shop, key=key, created_at__lt=expired_before).delete()
+
+        record, created = IdempotencyKey.objects.get_or_create(
+            shop=shop, key=key, defaults={"fingerprint": fingerprint}
+        )
+        if created:
+            self.idempotency_record = record
+            return
+
+        if record.fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+        if record.status_code is None:
+            if not self._take_over_stale(record):
+                raise IdempotencyConflict()
+            self.idempotency_record = record
+            return
+
+        raise _IdempotentReplay(Response(
+            record.response_body, status=record.status_code, headers={"Idempotency-Replayed": "true"}
+        ))
+
+    @staticmethod
+    def _take_over_stale(record):
+        """
+            Requête en cours depuis plus de IDEMPOTENCY_PENDING_TIMEOUT : son
+            worker est mort sans répondre. Un seul UPDATE conditionnel renouvelle
+            le bail, donc une seule requête concurrente reprend la clé.
+        """
+        now = timezone.now()
+        return IdempotencyKey.objects.filter(
+            pk=record.pk, status_code__isnull=True, updated_at__lt=now - settings.IDEMPOTENCY_PENDING_TIMEOUT,
+        ).update(updated_at=now) == 1
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _IdempotentReplay):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # Erreur non gérée (500) : libérer la clé pour que le client puisse réessayer.
+            record = getattr(self, "idempotency_record", None)
+            if record is not None:
+                self.idempotency_record = None
+                record.delete()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        record = getattr(self, "idempotency_record", None)
+        if record is not None:
+            self.idempotency_record = None
+            if isinstance(response, Response) and status.is_success(response.status_code):
+                record.status_code = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=["status_code", "response_body", "updated_at"])
+            else:
+                record.delete()
+
+        return response
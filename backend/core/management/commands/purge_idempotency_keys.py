@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Supprime les clés d'idempotence expirées (voir IDEMPOTENCY_KEY_TTL)."
+
+    def handle(self, *args, **options):
+        expired_before = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expired_before).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} clé(s) d'idempotence supprimée(s)."))
@@ -1,6 +1,7 @@
 import uuid
 
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 
 
 class BaseModel(models.Model):
@@ -25,3 +26,23 @@ class MerchantScopedModel(BaseModel):
 
     class Meta:
         abstract = True
+
+
+class IdempotencyKey(ShopScopedModel):
+    """
+        Réponse mémorisée d'une requête d'écriture portant un en-tête Idempotency-Key.
+        status_code reste NULL tant que la première requête est en cours.
+    """
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, blank=True, null=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'key'], name='unique_idempotency_key_per_shop'),
+        ]
+
+    def __str__(self):
+        return f'{self.key} ({self.status_code or "pending"})'
@@ -1,5 +1,13 @@
+import json
+import base64
+
+from django.db.models import Q
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+
 from rest_framework import pagination
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 import logging
 
@@ -20,3 +28,197 @@ class PaginationWithTotalPage(pagination.PageNumberPagination):
             'results': data
         })
         return response
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+        Pagination par clé (« seek ») sur l'ordre actif du queryset, complété par
+        l'id pour départager les ex aequo : la page N coûte une recherche d'index,
+        comme la page 1, sans OFFSET ni COUNT(*).
+
+        Le curseur est opaque (JSON en base64) : valeurs de tri de la dernière
+        ligne servie et sens de parcours. Le total n'est calculé que sur
+        demande (?with_count=true).
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    default_ordering = ('-created_at',)
+    invalid_cursor_message = 'Curseur invalide.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+        self.count = queryset.count() if self.wants_count(request) else None
+
+        values, self.reverse = self.decode_cursor(request)
+        ordering = [(field, not descending) if self.reverse else (field, descending)
+                    for field, descending in self.ordering]
+
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, values))
+        queryset = queryset.order_by(*[f"-{field}" if descending else field for field, descending in ordering])
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        if self.reverse:
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_ordering(self, queryset):
+        """
+            Ordre actif (OrderingFilter, sinon Meta.ordering), complété par la
+            clé primaire. Seules les colonnes locales non nulles sont acceptées :
+            une valeur NULL casserait la comparaison lexicographique.
+        """
+        model = queryset.model
+        raw = list(queryset.query.order_by) or list(model._meta.ordering) or list(self.default_ordering)
+        pk_name = model._meta.pk.name
+
+        ordering = []
+        for term in raw:
+            if not isinstance(term, str):
+                raise ValidationError(f"Tri non supporté en pagination par curseur : {term}.")
+            descending = term.startswith('-')
+            name = term.lstrip('-')
+            name = pk_name if name == 'pk' else name
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ValidationError(f"Tri non supporté en pagination par curseur : {name}.")
+            if field.is_relation or field.null:
+                raise ValidationError(f"Tri non supporté en pagination par curseur : {name}.")
+            ordering.append((field.attname, descending))
+            if field.primary_key:
+                break
+        else:
+            last_descending = ordering[-1][1] if ordering else True
+            ordering.append((pk_name, last_descending))
+
+        return ordering
+
+    def seek_filter(self, ordering, values):
+        """(a, b, id) après (va, vb, vid) : a > va OU (a = va ET b > vb) OU ..."""
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(ordering, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values, reverse = payload['v'], bool(payload['r'])
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            # Curseur modifié à la main : une valeur du mauvais type ne doit pas atteindre la requête.
+            values = [
+                self.model._meta.get_field(field).to_python(value)
+                for (field, _), value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError, AttributeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, instance, reverse):
+        values = [getattr(instance, field) for field, _ in self.ordering]
+        payload = json.dumps({'v': [self.to_cursor_value(value) for value in values], 'r': int(reverse)})
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def to_cursor_value(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (int, float, str, bool)):
+            return value
+        return str(value)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+
+class PageOrKeysetPagination(PaginationWithTotalPage):
+    """
+        Pagination par numéro de page par défaut (compatibilité des écrans
+        existants) ; bascule en pagination par clé dès que la requête porte
+        ?cursor= (vide pour la première page).
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.keyset_class.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Curseur opaque (next/previous) ; vide pour la première page en pagination par clé.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.keyset_class.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Pagination par clé uniquement : inclure le total (COUNT).',
+                'schema': {'type': 'boolean'},
+            },
+        ]
@@ -7,21 +7,42 @@ SHOP_PK_PARAMETER = OpenApiParameter(
     description='Identifiant UUID de la boutique'
 )
 
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description='Champs à renvoyer, séparés par des virgules (tous par défaut)'
+    ),
+    OpenApiParameter(
+        name='omit',
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description='Champs à exclure, séparés par des virgules'
+    ),
+]
+
 
 def shop_scoped_schema(cls):
     """
     Décorateur de classe à appliquer sur tout ViewSet nesté sous /shops/{shop_pk}/...
     Ajoute automatiquement le paramètre de chemin shop_pk à toutes les actions
     CRUD standard, sans avoir à le répéter manuellement sur chaque viewset.
+    Les actions de lecture d'un viewset à champs clairsemés (SparseFieldsMixin)
+    reçoivent en plus les paramètres fields/omit.
 
     Usage:
         @shop_scoped_schema
         class ItemViewSet(viewsets.ModelViewSet):
             ...
     """
+    sparse_actions = getattr(cls, "sparse_actions", ())
     actions = {}
     for action_name in ["list", "retrieve", "create", "update", "partial_update", "destroy"]:
         if hasattr(cls, action_name):
-            actions[action_name] = extend_schema(parameters=[SHOP_PK_PARAMETER])
+            parameters = [SHOP_PK_PARAMETER]
+            if action_name in sparse_actions:
+                parameters += SPARSE_FIELDS_PARAMETERS
+            actions[action_name] = extend_schema(parameters=parameters)
 
     return extend_schema_view(**actions)(cls)
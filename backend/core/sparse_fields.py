@@ -0,0 +1,101 @@
+from django.core.exceptions import FieldDoesNotExist
+
+from rest_framework import serializers
+
+FIELDS_QUERY_PARAM = "fields"
+OMIT_QUERY_PARAM = "omit"
+
+
+class SparseFieldsMixin:
+    """
+        ?fields=a,b (liste blanche) et ?omit=c,d (liste noire) sur les actions
+        de lecture d'un ViewSet. Les champs écartés disparaissent du serializer,
+        et le queryset ne charge que ce qu'il faut pour les champs restants :
+
+        - sparse_select_related / sparse_prefetch_related associent un champ du
+          serializer aux jointures dont il a besoin ; seules celles des champs
+          conservés sont appliquées (toutes, sans paramètre) ;
+        - only() restreint les colonnes du modèle à celles des champs conservés.
+
+        get_queryset() de la vue ne doit donc plus poser lui-même ces jointures.
+    """
+    sparse_select_related = {}
+    sparse_prefetch_related = {}
+    sparse_actions = ("list", "retrieve")
+
+    def get_requested_fields(self):
+        """Champs du serializer à conserver, ou None si la requête ne restreint rien."""
+        if self.action not in self.sparse_actions:
+            return None
+        if hasattr(self, "_requested_fields"):
+            return self._requested_fields
+
+        params = self.request.query_params
+        fields = {name for name in params.get(FIELDS_QUERY_PARAM, "").split(",") if name}
+        omit = {name for name in params.get(OMIT_QUERY_PARAM, "").split(",") if name}
+        if not fields and not omit:
+            self._requested_fields = None
+        else:
+            available = set(self.get_serializer_class()().fields)
+            self._requested_fields = ((fields & available) if fields else available) - omit
+        return self._requested_fields
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_actions:
+            return queryset
+
+        requested = self.get_requested_fields()
+        select = self._relations_for(self.sparse_select_related, requested)
+        prefetch = self._relations_for(self.sparse_prefetch_related, requested)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        if requested is not None:
+            queryset = queryset.only(*self.get_required_columns(queryset, requested, select))
+        return queryset
+
+    @staticmethod
+    def _relations_for(mapping, requested):
+        return [
+            path for name, paths in mapping.items()
+            if requested is None or name in requested
+            for path in paths
+        ]
+
+    def get_required_columns(self, queryset, requested, select):
+        model = queryset.model
+        serializer_fields = self.get_serializer_class()().fields
+        columns = {model._meta.pk.name}
+        # Une relation suivie par select_related ne peut pas être différée.
+        columns.update(path.split("__")[0] for path in select)
+        # La pagination par clé relit les colonnes de tri sur chaque ligne servie.
+        for term in list(queryset.query.order_by) or list(model._meta.ordering):
+            if isinstance(term, str) and "__" not in term:
+                columns.add(model._meta.pk.name if term.lstrip("-") == "pk" else term.lstrip("-"))
+
+        for name in requested:
+            field = serializer_fields[name]
+            if isinstance(field, serializers.SerializerMethodField) or field.source == "*":
+                # Source inconnue : on ne peut pas restreindre les colonnes sans risque.
+                return [f.name for f in model._meta.concrete_fields]
+            source = field.source.split(".")[0]
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete:
+                columns.add(model_field.name)
+        return sorted(columns)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        requested = self.get_requested_fields()
+        if requested is not None:
+            target = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+            for name in list(target.fields):
+                if name not in requested:
+                    target.fields.pop(name)
+        return serializer
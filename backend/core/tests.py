@@ -1,3 +1,290 @@
-from django.test import TestCase
+import io
+import csv
+import json
+import base64
+import datetime
+import unittest
+from decimal import Decimal
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from openpyxl import load_workbook
+
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.db_routing import ROUTE_HEADER
+from core.models import IdempotencyKey
+from core.pagination import KeysetPagination
+
+from catalog.models import Item
+from catalog.services import DEFAULT_CATEGORY_NAME, quick_create_item
+
+from sales.models import Customer
+
+from tenants.models import RoleChoices
+from tenants.services import add_employee, register_merchant
+
+
+@unittest.skipUnless(settings.DATABASE_REPLICAS, "Définir DATABASE_REPLICA_URLS (voir mouegne/settings.py).")
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+        Sous `manage.py test`, chaque réplica est un miroir de la base de test
+        principale : on vérifie la connexion utilisée, pas la réplication.
+    """
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        self.user, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.replica = connections[settings.DATABASE_REPLICAS[0]]
+
+    def test_list_reads_from_replica(self):
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            response = self.client.get(f"/api/shops/{self.shop.id}/customers/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("reason=replica", response[ROUTE_HEADER])
+        self.assertTrue(replica_queries.captured_queries)
+
+    def test_reads_stick_to_primary_after_write(self):
+        response = self.client.post(f"/api/shops/{self.shop.id}/customers/", {"first_name": "Awa"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response[ROUTE_HEADER], "default; reason=write")
+
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            response = self.client.get(f"/api/shops/{self.shop.id}/customers/")
+        self.assertEqual(response[ROUTE_HEADER], "default; reason=sticky")
+        self.assertEqual(replica_queries.captured_queries, [])
+        self.assertEqual(response.json()["count"], 1)
+
+
+# Réplica factice : l'alias pointe sur la base de test, seule la décision de routage est vérifiée.
+@override_settings(DATABASE_REPLICAS=[DEFAULT_DB_ALIAS])
+class StickyRoutingTests(TestCase):
+    def setUp(self):
+        self.user, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/shops/{self.shop.id}/customers/"
+
+    def test_reads_go_to_the_replica_until_a_write(self):
+        self.assertEqual(self.client.get(self.url)[ROUTE_HEADER], "default; reason=replica")
+        self.assertEqual(self.client.post(self.url, {"first_name": "Awa"})[ROUTE_HEADER], "default; reason=write")
+        self.assertEqual(self.client.get(self.url)[ROUTE_HEADER], "default; reason=sticky")
+
+    def test_marker_is_shared_between_workers(self):
+        self.client.post(self.url, {"first_name": "Awa"})
+        # Stocké en base, donc visible d'un autre worker gunicorn.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM db_routing_sticky")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_other_users_keep_reading_from_the_replica(self):
+        self.client.post(self.url, {"first_name": "Awa"})
+        other, _, shop = register_merchant(
+            username="other", password="not-used", company_name="Autre", shop_name="Ailleurs"
+        )
+        self.client.force_authenticate(other)
+        response = self.client.get(f"/api/shops/{shop.id}/customers/")
+        self.assertEqual(response[ROUTE_HEADER], "default; reason=replica")
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/shops/{self.shop.id}/customers/"
+
+    def _post(self, data, key="client-0001"):
+        return self.client.post(self.url, data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_same_body_replays_the_first_response(self):
+        first = self._post({"first_name": "Awa", "last_name": "Ndiaye"})
+        replay = self._post({"last_name": "Ndiaye", "first_name": "Awa"})
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay["Idempotency-Replayed"], "true")
+        self.assertEqual(replay.json()["id"], first.json()["id"])
+
+    def test_other_body_with_same_key_is_rejected(self):
+        self._post({"first_name": "Awa"})
+        response = self._post({"first_name": "Moussa"})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(list(Customer.objects.filter(merchant=self.shop.owner).values_list("first_name", flat=True)), ["Awa"])
+
+    def _pending(self, age):
+        # Première requête dont le worker est mort avant de répondre.
+        self._post({"first_name": "Awa"})
+        IdempotencyKey.objects.filter(shop=self.shop).update(
+            status_code=None, response_body=None, updated_at=timezone.now() - age,
+        )
+
+    def test_pending_request_blocks_retries(self):
+        self._pending(datetime.timedelta(seconds=1))
+        self.assertEqual(self._post({"first_name": "Awa"}).status_code, 409)
+
+    def test_stale_pending_request_is_taken_over(self):
+        self._pending(settings.IDEMPOTENCY_PENDING_TIMEOUT + datetime.timedelta(seconds=1))
+        response = self._post({"first_name": "Awa"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.get(shop=self.shop).status_code, 201)
+        self.assertEqual(self._post({"first_name": "Awa"})["Idempotency-Replayed"], "true")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        for index in range(7):
+            quick_create_item(shop=self.shop, name=f"Article {index}", price=Decimal("100"), quantity=1)
+        # Import en masse : toutes les lignes ont le même created_at, seul l'id les départage.
+        Item.objects.filter(shop=self.shop).update(created_at=timezone.now())
+        self.queryset = Item.objects.filter(shop=self.shop).order_by("-created_at")
+        self.expected = list(Item.objects.filter(shop=self.shop).order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def _page(self, cursor=""):
+        request = Request(APIRequestFactory().get("/items/", {"cursor": cursor, "page_size": 3}))
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(self.queryset, request)
+        return [item.id for item in page], paginator.get_next_link(), paginator.get_previous_link()
+
+    @staticmethod
+    def _cursor(link):
+        return parse_qs(urlparse(link).query)["cursor"][0]
+
+    def test_equal_created_at_pages_forward_without_gaps_or_repeats(self):
+        seen, cursor = [], ""
+        while True:
+            ids, next_link, _ = self._page(cursor)
+            seen += ids
+            if next_link is None:
+                break
+            cursor = self._cursor(next_link)
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_link_returns_the_same_page(self):
+        first, next_link, _ = self._page()
+        second, _, previous_link = self._page(self._cursor(next_link))
+        self.assertEqual(second, self.expected[3:6])
+        self.assertEqual(self._page(self._cursor(previous_link))[0], first)
+
+    def test_tampered_cursor_is_rejected_as_not_found(self):
+        for values in (["x", "y"], [timezone.now().isoformat(), "not-a-uuid"]):
+            cursor = base64.urlsafe_b64encode(json.dumps({"v": values, "r": 0}).encode()).decode()
+            with self.subTest(values=values), self.assertRaises(NotFound):
+                self._page(cursor)
+
+    def test_new_rows_do_not_shift_the_next_page(self):
+        _, next_link, _ = self._page()
+        quick_create_item(shop=self.shop, name="Nouveau", price=Decimal("100"), quantity=1)
+        self.assertEqual(self._page(self._cursor(next_link))[0], self.expected[3:6])
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.user, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        for index in range(3):
+            quick_create_item(shop=self.shop, name=f"Article {index}", price=Decimal("100"), quantity=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/shops/{self.shop.id}/items/"
+
+    def _list(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        item_queries = [q["sql"] for q in queries.captured_queries if 'FROM "catalog_item"' in q["sql"] and "COUNT(" not in q["sql"]]
+        return response.data["results"], item_queries
+
+    def test_fields_keeps_only_the_requested_fields_and_columns(self):
+        results, queries = self._list({"fields": "id,name,unknown"})
+
+        self.assertEqual([set(row) for row in results], [{"id", "name"}] * 3)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"catalog_item"."description"', queries[0])
+        self.assertNotIn("JOIN", queries[0])
+
+    def test_omit_drops_fields(self):
+        results, _ = self._list({"omit": "description,vendor_name"})
+
+        self.assertNotIn("description", results[0])
+        self.assertNotIn("vendor_name", results[0])
+        self.assertIn("category_name", results[0])
+
+    def test_related_field_is_joined_instead_of_queried_per_row(self):
+        results, queries = self._list({"fields": "name,category_name"})
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('JOIN "catalog_category"', queries[0])
+        self.assertNotIn('"catalog_vendor"', queries[0])
+        self.assertTrue(all(row["category_name"] for row in results))
+
+    def test_retrieve_honours_fields(self):
+        item = Item.objects.filter(shop=self.shop).first()
+        response = self.client.get(f"{self.url}{item.id}/", {"fields": "name,price"})
+        self.assertEqual(set(response.data), {"name", "price"})
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=4)
+        quick_create_item(shop=self.shop, name="Crème brûlée", price=Decimal("800"), quantity=2)
+        _, _, other_shop = register_merchant(
+            username="rival", password="not-used", company_name="Concurrent", shop_name="Akwa"
+        )
+        quick_create_item(shop=other_shop, name="Baguette", price=Decimal("100"), quantity=9)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/shops/{self.shop.id}/items/export/"
+
+    def _export(self, export_format, params=None):
+        response = self.client.get(f"{self.url}{export_format}/", params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('filename="articles-', response["Content-Disposition"])
+        return b"".join(response.streaming_content)
+
+    def test_csv_streams_the_shop_items_with_a_bom(self):
+        content = self._export("csv").decode("utf-8")
+
+        self.assertTrue(content.startswith("\ufeff"))
+        rows = list(csv.DictReader(io.StringIO(content.lstrip("\ufeff"))))
+        self.assertEqual(sorted((row["Nom"], row["Quantité"]) for row in rows), [("Crème brûlée", "2"), ("Pain", "4")])
+
+    def test_ndjson_has_one_object_per_line_and_follows_the_list_filters(self):
+        lines = self._export("ndjson", {"search": "pain"}).decode("utf-8").splitlines()
+
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual((row["Nom"], row["Quantité"], row["Catégorie"]), ("Pain", 4, DEFAULT_CATEGORY_NAME))
+
+    def test_xlsx_is_a_readable_workbook(self):
+        workbook = load_workbook(io.BytesIO(self._export("xlsx")), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+
+        self.assertEqual(rows[0][:2], ("Nom", "Code-barres"))
+        self.assertEqual(sorted(row[0] for row in rows[1:]), ["Crème brûlée", "Pain"])
+
+    def test_cashier_cannot_export(self):
+        cashier = add_employee(shop=self.shop, username="cashier", password="not-used", role=RoleChoices.CASHIER)
+        self.client.force_authenticate(cashier.user)
+        self.assertEqual(self.client.get(f"{self.url}csv/").status_code, 403)
@@ -0,0 +1,82 @@
+"""
+    Contrôle de cohérence du stock (`manage.py verify_stock`, nuit).
+
+    Le stock attendu d'un article est celui du journal : dernier StockSnapshot
+    plus les mouvements suivants (inventory.ledger.stock_levels_at). Il est
+    comparé à Item.quantity par paquets d'articles, en une requête agrégée par
+    paquet : les deux valeurs sont lues dans le même instantané MVCC, une vente
+    en cours ne crée donc pas de faux écart.
+
+    Les boutiques sont réparties sur un pool de processus. Avec repair=True,
+    Item.quantity est ramené au stock attendu, en un UPDATE par paquet, sauf
+    si l'article a bougé entre la lecture et la correction.
+"""
+import operator
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.db import connections, models
+from django.utils import timezone
+
+from catalog.models import Item
+from inventory.ledger import stock_levels_at
+
+VERIFY_CHUNK_SIZE = 5000
+
+
+def _repair_chunk(drifts):
+    """Un seul UPDATE ; renvoie le nombre d'articles corrigés."""
+    unchanged = [models.Q(id=drift["item_id"], quantity=drift["quantity"]) for drift in drifts]
+    return Item.objects.filter(functools.reduce(operator.or_, unchanged)).update(
+        quantity=models.Case(
+            *[models.When(id=drift["item_id"], then=models.Value(drift["expected"])) for drift in drifts],
+            default=models.F("quantity"),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def verify_shop_stock(*, shop_id, repair=False, chunk_size=VERIFY_CHUNK_SIZE):
+    """
+        Renvoie {shop_id, checked, drifts: [{item_id, name, quantity, expected,
+        difference}], repaired}. difference = quantity - expected.
+    """
+    result = {"shop_id": shop_id, "checked": 0, "drifts": [], "repaired": 0}
+    last_id = None
+    while True:
+        levels = stock_levels_at(shop=shop_id).order_by("id")
+        if last_id is not None:
+            levels = levels.filter(id__gt=last_id)
+        rows = list(levels.values_list("id", "name", "quantity", "stock_at")[:chunk_size])
+        if not rows:
+            return result
+        last_id = rows[-1][0]
+        result["checked"] += len(rows)
+
+        drifts = [
+            {"item_id": item_id, "name": name, "quantity": quantity, "expected": expected,
+             "difference": quantity - expected}
+            for item_id, name, quantity, expected in rows if quantity != expected
+        ]
+        result["drifts"].extend(drifts)
+        if repair and drifts:
+            result["repaired"] += _repair_chunk(drifts)
+
+
+def verify_shops_stock(*, shop_ids, workers=1, repair=False, chunk_size=VERIFY_CHUNK_SIZE):
+    """Résultats de verify_shop_stock, dans l'ordre où les boutiques se terminent."""
+    if workers <= 1:
+        for shop_id in shop_ids:
+            yield verify_shop_stock(shop_id=shop_id, repair=repair, chunk_size=chunk_size)
+        return
+
+    # Un processus fils ne doit pas réutiliser la connexion du parent : chacun ouvre la sienne.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        futures = [
+            pool.submit(verify_shop_stock, shop_id=shop_id, repair=repair, chunk_size=chunk_size)
+            for shop_id in shop_ids
+        ]
+        for future in as_completed(futures):
+            yield future.result()
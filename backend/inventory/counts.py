@@ -0,0 +1,169 @@
+"""
+    Inventaires physiques (comptage complet du stock).
+
+    Les postes de comptage envoient leurs quantités par lots (record_counts) :
+    un lot = une requête pour résoudre les articles et un seul INSERT ... ON
+    CONFLICT pour les lignes, quel que soit le nombre de postes en parallèle.
+    Chaque ligne garde le stock de l'article au moment de son premier
+    comptage (expected_quantity) : l'écart counted - expected ne compte donc
+    pas les ventes faites pendant l'inventaire.
+
+    La clôture (close_stock_count) applique tous les écarts en une
+    transaction : un UPDATE des articles, un bulk_create du journal.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, models, transaction
+from django.utils import timezone
+
+from catalog.models import Item
+from catalog.search import find_items_by_codes, normalize_code
+from inventory.ledger import record_movements
+from inventory.models import StockCount, StockCountLine, StockCountStatus, StockMovementKind
+
+COUNT_MODES = ("add", "set")
+MAX_COUNT_LINES = 1000
+
+_LINE_COLUMNS = (
+    "id", "created_at", "updated_at", "shop", "count", "item", "counted_quantity", "expected_quantity",
+)
+
+
+def _locked_open_count(count):
+    count = StockCount.objects.select_for_update().get(pk=count.pk)
+    if count.status != StockCountStatus.OPEN:
+        raise ValueError("Cet inventaire est déjà clôturé ou annulé.")
+    return count
+
+
+def open_stock_count(*, shop, employee=None, note=None):
+    try:
+        with transaction.atomic():
+            return StockCount.objects.create(shop=shop, employee=employee, note=note)
+    except IntegrityError:  # unique_open_stock_count_per_shop
+        raise ValueError("Un inventaire est déjà en cours dans cette boutique.")
+
+
+def _upsert_lines(*, count, lines, mode):
+    """
+        lines : [(item_id, quantité comptée, stock actuel)]. En mode « add »
+        la quantité s'ajoute à celle déjà comptée (plusieurs postes sur le
+        même article) et le stock attendu du premier comptage est conservé ;
+        en mode « set » elle la remplace (recomptage) et le stock attendu est
+        relu.
+    """
+    fields = [StockCountLine._meta.get_field(name) for name in _LINE_COLUMNS]
+    now = timezone.now()
+    params = []
+    for item_id, counted, expected in lines:
+        values = (StockCountLine._meta.pk.get_default(), now, now, count.shop_id, count.id, item_id, counted, expected)
+        params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, values))
+
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(field.column) for field in fields)
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(fields)) + ")"] * len(lines))
+    counted = qn("counted_quantity")
+    if mode == "add":
+        updates = f"{counted} = {qn(StockCountLine._meta.db_table)}.{counted} + EXCLUDED.{counted}"
+    else:
+        updates = f"{counted} = EXCLUDED.{counted}, {qn('expected_quantity')} = EXCLUDED.{qn('expected_quantity')}"
+    sql = (
+        f"INSERT INTO {qn(StockCountLine._meta.db_table)} ({columns}) VALUES {placeholders} "
+        f"ON CONFLICT ({qn('count_id')}, {qn('item_id')}) DO UPDATE SET {updates}, {qn('updated_at')} = EXCLUDED.{qn('updated_at')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+@transaction.atomic
+def record_counts(*, count, lines, mode="add"):
+    """
+        Enregistre un lot de comptages. lines : [{"item_id" ou "code",
+        "quantity"}], le code étant un code-barres ou un SKU scanné. Les
+        articles inconnus sont ignorés et renvoyés dans `unknown`.
+        Renvoie {accepted, unknown}.
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError("Mode de comptage inconnu : « add » ou « set » attendu.")
+    # Le verrou sérialise les lots avec la clôture ; un lot ne dure que quelques millisecondes.
+    count = _locked_open_count(count)
+
+    item_ids = {line["item_id"] for line in lines if line.get("item_id")}
+    items = dict(Item.objects.filter(shop=count.shop_id, id__in=item_ids).values_list("id", "quantity"))
+    by_code = find_items_by_codes(shop=count.shop_id, codes=[line["code"] for line in lines if line.get("code")])
+
+    counted, expected, unknown = defaultdict(int), {}, []
+    for line in lines:
+        if line.get("item_id"):
+            item_id, on_hand = line["item_id"], items.get(line["item_id"])
+        else:
+            row = by_code.get(normalize_code(line["code"]))
+            item_id, on_hand = (row["id"], row["quantity"]) if row else (None, None)
+        if on_hand is None:
+            unknown.append(str(line.get("item_id") or line.get("code")))
+            continue
+        # Un même article peut revenir dans le lot : cumul en « add », dernier comptage en « set ».
+        counted[item_id] = counted[item_id] + line["quantity"] if mode == "add" else line["quantity"]
+        expected[item_id] = on_hand
+
+    if counted:
+        _upsert_lines(
+            count=count, mode=mode,
+            lines=[(item_id, quantity, expected[item_id]) for item_id, quantity in counted.items()],
+        )
+    return {"accepted": len(counted), "unknown": unknown}
+
+
+@transaction.atomic
+def close_stock_count(*, count, employee=None, reset_uncounted=False):
+    """
+        Applique les écarts de l'inventaire : stock = stock actuel + (compté -
+        attendu), en un seul UPDATE, et un mouvement COUNT par article ajusté.
+        reset_uncounted : les articles non comptés sont mis à zéro (comptage
+        complet du magasin).
+    """
+    count = _locked_open_count(count)
+    lines = StockCountLine.objects.filter(count=count)
+
+    if reset_uncounted:
+        uncounted = (
+            Item.objects.filter(shop=count.shop_id).exclude(quantity=0)
+            .exclude(id__in=lines.values("item_id")).values_list("id", "quantity")
+        )
+        StockCountLine.objects.bulk_create([
+            StockCountLine(shop_id=count.shop_id, count=count, item_id=item_id, counted_quantity=0, expected_quantity=quantity)
+            for item_id, quantity in uncounted
+        ])
+
+    variance = models.F("counted_quantity") - models.F("expected_quantity")
+    adjusted = lines.annotate(variance=variance).exclude(variance=0)
+    variances, value_variance = {}, 0
+    for item_id, quantity, average_cost in adjusted.values_list("item_id", "variance", "item__average_cost"):
+        variances[item_id] = quantity
+        value_variance += quantity * average_cost
+
+    if variances:
+        line_variance = lines.filter(item=models.OuterRef("pk")).values(variance=variance)[:1]
+        Item.objects.filter(shop=count.shop_id, id__in=adjusted.values("item_id")).update(
+            quantity=models.F("quantity") + models.Subquery(line_variance),
+            updated_at=timezone.now(),
+        )
+        record_movements(shop=count.shop, kind=StockMovementKind.COUNT, quantities=variances, source_id=count.id)
+
+    count.status = StockCountStatus.CLOSED
+    count.closed_by = employee
+    count.closed_at = timezone.now()
+    count.counted_items = lines.count()
+    count.adjusted_items = len(variances)
+    count.units_variance = sum(variances.values())
+    count.value_variance = round(value_variance, 2)
+    count.save()
+    return count
+
+
+@transaction.atomic
+def cancel_stock_count(*, count):
+    count = _locked_open_count(count)
+    count.status = StockCountStatus.CANCELLED
+    count.save(update_fields=["status", "updated_at"])
+    return count
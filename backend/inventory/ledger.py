@@ -0,0 +1,120 @@
+"""
+    Journal des mouvements de stock et stock à une date donnée.
+
+    Chaque service qui modifie Item.quantity écrit ses mouvements dans la même
+    transaction (record_movements : un bulk_create). La tâche planifiée
+    `take_stock_snapshots` pose un StockSnapshot pour chaque article ayant
+    bougé depuis la précédente, calculé depuis le journal et non depuis
+    Item.quantity. Le stock d'un article à la date X vaut alors son dernier
+    instantané avant X plus les mouvements entre cet instantané et X : une
+    recherche d'index et un parcours borné par la période des instantanés.
+
+    Les instantanés s'arrêtent à now - STOCK_SNAPSHOT_LAG, pour qu'un
+    mouvement horodaté avant cette borne mais pas encore validé ne leur
+    échappe pas.
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from catalog.models import Item
+from inventory.models import StockMovement, StockSnapshot
+
+MOVEMENT_HISTORY_LIMIT = 500
+SNAPSHOT_CHUNK_SIZE = 2000
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def record_movements(*, shop, kind, quantities, source_id=None):
+    """quantities : {item_id: variation signée} ; les variations nulles sont ignorées."""
+    StockMovement.objects.bulk_create([
+        StockMovement(shop=shop, item_id=item_id, kind=kind, quantity=quantity, source_id=source_id)
+        for item_id, quantity in quantities.items() if quantity
+    ])
+
+
+def stock_levels_at(*, shop, at=None):
+    """
+        Articles de la boutique existant à `at`, annotés de stock_at. Deux
+        sous-requêtes corrélées par article, servies par les index
+        (item, taken_at) et (item, created_at). at=None : tout le journal
+        validé, sans borne d'horodatage (comparaison avec Item.quantity).
+    """
+    bounded = {"created_at__lte": at} if at is not None else {}
+    snapshots = StockSnapshot.objects.filter(item=OuterRef("pk")).order_by("-taken_at")
+    if at is not None:
+        snapshots = snapshots.filter(taken_at__lte=at)
+    since_snapshot = (
+        StockMovement.objects.filter(
+            item=OuterRef("pk"),
+            created_at__gt=Coalesce(OuterRef("snapshot_at"), Value(_EPOCH)),
+            **bounded,
+        )
+        .order_by()
+        .values("item")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    return (
+        Item.objects.filter(shop=shop, **bounded)
+        .annotate(
+            snapshot_at=Subquery(snapshots.values("taken_at")[:1]),
+            snapshot_quantity=Subquery(snapshots.values("quantity")[:1]),
+        )
+        .annotate(
+            stock_at=Coalesce("snapshot_quantity", 0) + Coalesce(Subquery(since_snapshot, output_field=IntegerField()), 0)
+        )
+    )
+
+
+def stock_at(*, item, at):
+    return stock_levels_at(shop=item.shop_id, at=at).filter(pk=item.pk).values_list("stock_at", flat=True).first() or 0
+
+
+def movement_history(*, item, date_from, date_to, limit=MOVEMENT_HISTORY_LIMIT):
+    """
+        Stock d'ouverture et de clôture de l'article sur ]date_from, date_to],
+        et les mouvements de la période (les `limit` premiers).
+    """
+    movements = list(
+        StockMovement.objects.filter(item=item, created_at__gt=date_from, created_at__lte=date_to)
+        .order_by("created_at", "id")[:limit + 1]
+    )
+    return {
+        "opening_quantity": stock_at(item=item, at=date_from),
+        "closing_quantity": stock_at(item=item, at=date_to),
+        "movements": movements[:limit],
+        "truncated": len(movements) > limit,
+    }
+
+
+def take_stock_snapshots(*, shop, at=None):
+    """
+        Instantané des articles de la boutique ayant bougé depuis le précédent.
+        Renvoie le nombre d'instantanés créés.
+    """
+    at = at or timezone.now() - settings.STOCK_SNAPSHOT_LAG
+    previous = StockSnapshot.objects.filter(shop=shop).aggregate(last=Max("taken_at"))["last"]
+    if previous is not None and previous >= at:
+        return 0
+
+    moved = StockMovement.objects.filter(shop=shop, created_at__lte=at)
+    if previous is not None:
+        moved = moved.filter(created_at__gt=previous)
+    moved_ids = list(moved.order_by().values_list("item_id", flat=True).distinct())
+
+    created = 0
+    for start in range(0, len(moved_ids), SNAPSHOT_CHUNK_SIZE):
+        levels = stock_levels_at(shop=shop, at=at).filter(id__in=moved_ids[start:start + SNAPSHOT_CHUNK_SIZE])
+        created += len(StockSnapshot.objects.bulk_create(
+            [
+                StockSnapshot(shop=shop, item_id=item_id, taken_at=at, quantity=quantity)
+                for item_id, quantity in levels.values_list("id", "stock_at")
+            ],
+            ignore_conflicts=True,
+        ))
+    return created
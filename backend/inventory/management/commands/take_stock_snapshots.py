@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inventory.ledger import take_stock_snapshots
+from tenants.models import Shop
+
+
+class Command(BaseCommand):
+    help = (
+        "Pose un instantané de stock pour chaque article ayant bougé depuis le précédent "
+        "(tâche planifiée, quotidienne) : le stock à une date reste un calcul borné."
+    )
+
+    def handle(self, *args, **options):
+        total = 0
+        for shop in Shop.objects.order_by("created_at").iterator():
+            total += take_stock_snapshots(shop=shop)
+        self.stdout.write(self.style.SUCCESS(f"{total} instantané(s) de stock créé(s)."))
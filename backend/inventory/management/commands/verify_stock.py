@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inventory.consistency import VERIFY_CHUNK_SIZE, verify_shops_stock
+from tenants.models import Shop
+
+DRIFTS_SHOWN_PER_SHOP = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le stock de chaque article (Item.quantity) au journal des mouvements, "
+        "boutique par boutique sur un pool de processus ; --repair aligne le stock sur le journal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shop", action="append", dest="shops", help="Boutique à contrôler (répétable) ; toutes par défaut.")
+        parser.add_argument("--workers", type=int, default=settings.STOCK_VERIFY_WORKERS)
+        parser.add_argument("--chunk-size", type=int, default=VERIFY_CHUNK_SIZE)
+        parser.add_argument("--repair", action="store_true", help="Corriger Item.quantity des articles en écart.")
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by("created_at")
+        if options["shops"]:
+            shops = shops.filter(id__in=options["shops"])
+        names = dict(shops.values_list("id", "name"))
+
+        started = time.monotonic()
+        checked = drifting = repaired = 0
+        for result in verify_shops_stock(
+            shop_ids=list(names), workers=options["workers"], repair=options["repair"], chunk_size=options["chunk_size"],
+        ):
+            checked += result["checked"]
+            drifting += len(result["drifts"])
+            repaired += result["repaired"]
+            if not result["drifts"]:
+                continue
+
+            self.stdout.write(self.style.WARNING(
+                f"{names[result['shop_id']]} ({result['shop_id']}) : {len(result['drifts'])} article(s) en écart"
+                f" sur {result['checked']}, {result['repaired']} corrigé(s)."
+            ))
+            shown = result["drifts"] if options["verbosity"] > 1 else result["drifts"][:DRIFTS_SHOWN_PER_SHOP]
+            for drift in shown:
+                self.stdout.write(
+                    f"  {drift['item_id']} {drift['name']} : stock {drift['quantity']}, "
+                    f"journal {drift['expected']} ({drift['difference']:+d})"
+                )
+            if len(shown) < len(result["drifts"]):
+                self.stdout.write(f"  … {len(result['drifts']) - len(shown)} autre(s) (-v 2 pour tout afficher)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(names)} boutique(s), {checked} article(s) contrôlé(s) en {time.monotonic() - started:.1f} s : "
+            f"{drifting} en écart, {repaired} corrigé(s)."
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.17 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_initial'),
+        ('inventory', '0001_initial'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['shop', 'created_at'], name='purchase_shop_created_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:20
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def record_opening_stock(apps, schema_editor):
+    # Le journal démarre ici : le stock existant y entre comme stock initial.
+    Item = apps.get_model('catalog', 'Item')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    batch = []
+    for item_id, shop_id, quantity in Item.objects.exclude(quantity=0).values_list('id', 'shop_id', 'quantity').iterator(2000):
+        batch.append(StockMovement(item_id=item_id, shop_id=shop_id, kind='OPENING', quantity=quantity))
+        if len(batch) == 2000:
+            StockMovement.objects.bulk_create(batch)
+            batch = []
+    StockMovement.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_item_sync'),
+        ('inventory', '0003_purchase_order'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(choices=[('OPENING', 'Stock initial'), ('SALE', 'Vente'), ('PURCHASE', 'Achat'), ('PURCHASE_REVERSAL', "Annulation d'achat"), ('ADJUSTMENT', 'Ajustement')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('source_id', models.UUIDField(blank=True, null=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='catalog.item')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='tenants.shop')),
+            ],
+            options={
+                'db_table': 'stock_movements',
+                'indexes': [models.Index(fields=['item', 'created_at'], name='stock_movement_item_idx'), models.Index(fields=['shop', 'created_at'], name='stock_movement_shop_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='catalog.item')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='tenants.shop')),
+            ],
+            options={
+                'db_table': 'stock_snapshots',
+                'indexes': [models.Index(fields=['shop', 'taken_at'], name='stock_snapshot_shop_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item', 'taken_at'), name='unique_stock_snapshot_per_item')],
+            },
+        ),
+        migrations.RunPython(record_opening_stock, migrations.RunPython.noop),
+    ]
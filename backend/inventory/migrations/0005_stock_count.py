@@ -0,0 +1,71 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:25
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_item_average_cost'),
+        ('inventory', '0004_stock_ledger'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='kind',
+            field=models.CharField(choices=[('OPENING', 'Stock initial'), ('SALE', 'Vente'), ('PURCHASE', 'Achat'), ('PURCHASE_REVERSAL', "Annulation d'achat"), ('ADJUSTMENT', 'Ajustement'), ('COUNT', 'Inventaire')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='StockCount',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('OPEN', 'En cours'), ('CLOSED', 'Clôturé'), ('CANCELLED', 'Annulé')], default='OPEN', max_length=20)),
+                ('note', models.CharField(blank=True, max_length=255, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('counted_items', models.PositiveIntegerField(default=0)),
+                ('adjusted_items', models.PositiveIntegerField(default=0)),
+                ('units_variance', models.IntegerField(default=0)),
+                ('value_variance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='closed_stock_counts', to='tenants.employee')),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_counts', to='tenants.employee')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='tenants.shop')),
+            ],
+            options={
+                'db_table': 'stock_counts',
+            },
+        ),
+        migrations.CreateModel(
+            name='StockCountLine',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('counted_quantity', models.IntegerField()),
+                ('expected_quantity', models.IntegerField()),
+                ('count', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.stockcount')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_count_lines', to='catalog.item')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='tenants.shop')),
+            ],
+            options={
+                'db_table': 'stock_count_lines',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockcount',
+            index=models.Index(fields=['shop', 'created_at'], name='stock_count_shop_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockcount',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'OPEN')), fields=('shop',), name='unique_open_stock_count_per_shop'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockcountline',
+            constraint=models.UniqueConstraint(fields=('count', 'item'), name='unique_stock_count_line_per_item'),
+        ),
+    ]
@@ -21,7 +21,29 @@ class Vendor(MerchantScopedModel):
         return self.name
 
 
+class PurchaseOrder(ShopScopedModel):
+    """
+        Livraison reçue en une fois : ses lignes sont des Purchase (related_name 'lines').
+        Le fournisseur de l'en-tête s'applique aux lignes qui n'en précisent pas.
+    """
+    vendor = models.ForeignKey(Vendor, on_delete=models.SET_NULL, blank=True, null=True, related_name="purchase_orders")
+    employee = models.ForeignKey('tenants.Employee', on_delete=models.SET_NULL, blank=True, null=True,
+                                 related_name="purchase_orders")
+    reference = models.CharField(max_length=50, blank=True, null=True)
+    description = models.TextField(max_length=300, blank=True, null=True)
+    total_value = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'created_at'], name='purchase_order_shop_idx'),
+        ]
+
+    def __str__(self):
+        return self.reference or f'Bon {self.id}'
+
+
 class Purchase(ShopScopedModel):
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, blank=True, null=True, related_name='lines')
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='purchases')
     vendor = models.ForeignKey(Vendor, on_delete=models.SET_NULL, blank=True, null=True, related_name="purchases")
     description = models.TextField(max_length=300, blank=True, null=True)
@@ -29,6 +51,125 @@ class Purchase(ShopScopedModel):
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     total_value = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'created_at'], name='purchase_shop_created_idx'),
+        ]
+
     def __str__(self):
         vendor_name = self.vendor.name if self.vendor else "N/A"
         return f'{self.item.name} x {self.quantity} <- {vendor_name}'
+
+
+class StockMovementKind(models.TextChoices):
+    OPENING = 'OPENING', 'Stock initial'
+    SALE = 'SALE', 'Vente'
+    PURCHASE = 'PURCHASE', 'Achat'
+    PURCHASE_REVERSAL = 'PURCHASE_REVERSAL', 'Annulation d\'achat'
+    ADJUSTMENT = 'ADJUSTMENT', 'Ajustement'
+    COUNT = 'COUNT', 'Inventaire'
+
+
+class StockMovement(ShopScopedModel):
+    """
+        Journal des variations de stock, en ajout seul : quantity est signée
+        (négative pour une vente). Item.quantity reste la valeur courante ;
+        le journal et les StockSnapshot répondent au « stock à la date X »
+        (voir inventory.ledger). source_id : vente, achat ou bon de réception d'origine.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_movements')
+    kind = models.CharField(max_length=20, choices=StockMovementKind.choices)
+    quantity = models.IntegerField()
+    source_id = models.UUIDField(blank=True, null=True)
+
+    class Meta:
+        db_table = "stock_movements"
+        indexes = [
+            models.Index(fields=['item', 'created_at'], name='stock_movement_item_idx'),
+            models.Index(fields=['shop', 'created_at'], name='stock_movement_shop_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.item_id} {self.quantity:+d} ({self.kind})'
+
+
+class StockSnapshot(ShopScopedModel):
+    """
+        Stock d'un article à taken_at, calculé depuis le journal par
+        `take_stock_snapshots`. Seuls les articles ayant bougé depuis leur
+        dernier instantané en reçoivent un nouveau.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_snapshots')
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        db_table = "stock_snapshots"
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'taken_at'], name='unique_stock_snapshot_per_item'),
+        ]
+        indexes = [
+            models.Index(fields=['shop', 'taken_at'], name='stock_snapshot_shop_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.item_id} = {self.quantity} ({self.taken_at:%Y-%m-%d %H:%M})'
+
+
+class StockCountStatus(models.TextChoices):
+    OPEN = 'OPEN', 'En cours'
+    CLOSED = 'CLOSED', 'Clôturé'
+    CANCELLED = 'CANCELLED', 'Annulé'
+
+
+class StockCount(ShopScopedModel):
+    """
+        Inventaire physique : les quantités comptées arrivent par lots
+        (StockCountLine), puis la clôture applique tous les écarts d'un coup
+        (voir inventory.counts). Un seul inventaire ouvert par boutique.
+    """
+    status = models.CharField(max_length=20, choices=StockCountStatus.choices, default=StockCountStatus.OPEN)
+    note = models.CharField(max_length=255, blank=True, null=True)
+    employee = models.ForeignKey('tenants.Employee', on_delete=models.SET_NULL, blank=True, null=True,
+                                 related_name="stock_counts")
+    closed_by = models.ForeignKey('tenants.Employee', on_delete=models.SET_NULL, blank=True, null=True,
+                                  related_name="closed_stock_counts")
+    closed_at = models.DateTimeField(blank=True, null=True)
+    # Bilan posé à la clôture.
+    counted_items = models.PositiveIntegerField(default=0)
+    adjusted_items = models.PositiveIntegerField(default=0)
+    units_variance = models.IntegerField(default=0)
+    value_variance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "stock_counts"
+        constraints = [
+            models.UniqueConstraint(fields=['shop'], condition=models.Q(status='OPEN'), name='unique_open_stock_count_per_shop'),
+        ]
+        indexes = [
+            models.Index(fields=['shop', 'created_at'], name='stock_count_shop_idx'),
+        ]
+
+    def __str__(self):
+        return f'Inventaire du {self.created_at:%Y-%m-%d} ({self.get_status_display()})'
+
+
+class StockCountLine(ShopScopedModel):
+    """
+        Quantité comptée d'un article. expected_quantity est le stock de
+        l'article au moment du comptage : l'écart ne compte pas les ventes
+        faites pendant l'inventaire.
+    """
+    count = models.ForeignKey(StockCount, on_delete=models.CASCADE, related_name='lines')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_count_lines')
+    counted_quantity = models.IntegerField()
+    expected_quantity = models.IntegerField()
+
+    class Meta:
+        db_table = "stock_count_lines"
+        constraints = [
+            models.UniqueConstraint(fields=['count', 'item'], name='unique_stock_count_line_per_item'),
+        ]
+
+    def __str__(self):
+        return f'{self.item_id} : {self.counted_quantity} (attendu {self.expected_quantity})'
@@ -0,0 +1,40 @@
+"""
+    Valorisation du stock d'une boutique au coût moyen pondéré (Item.average_cost,
+    tenu à jour par les réceptions) : une agrégation sur les articles, sans
+    relire l'historique des achats et des ventes.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from catalog.models import Item
+
+ZERO = Decimal("0")
+VALUATION_FIELDS = ("item_count", "out_of_stock_count", "units", "cost_value", "retail_value")
+
+
+def get_stock_valuation(*, shop):
+    """Stock valorisé par catégorie puis au total. Les stocks négatifs comptent pour zéro."""
+    money = DecimalField(max_digits=16, decimal_places=2)
+    in_stock = Q(quantity__gt=0)
+    rows = list(
+        Item.objects.filter(shop=shop)
+        .values("category_id", category_name=F("category__name"))
+        .annotate(
+            item_count=Count("id"),
+            out_of_stock_count=Count("id", filter=Q(quantity__lte=0)),
+            units=Coalesce(Sum("quantity", filter=in_stock), 0),
+            cost_value=Coalesce(Sum(
+                ExpressionWrapper(F("quantity") * F("average_cost"), output_field=money), filter=in_stock,
+            ), ZERO, output_field=money),
+            retail_value=Coalesce(Sum(
+                ExpressionWrapper(F("quantity") * F("price"), output_field=money), filter=in_stock,
+            ), ZERO, output_field=money),
+        )
+        .order_by("-cost_value", "category_name")
+    )
+    totals = {field: sum(row[field] for row in rows) for field in VALUATION_FIELDS}
+    for bucket in (*rows, totals):
+        bucket["potential_margin"] = bucket["retail_value"] - bucket["cost_value"]
+    return {"categories": rows, "totals": totals}
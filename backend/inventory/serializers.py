@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from inventory.models import Vendor, Purchase
+from inventory.counts import COUNT_MODES, MAX_COUNT_LINES
+from inventory.models import Vendor, Purchase, PurchaseOrder, StockMovement, StockCount, StockCountLine
 
 from inventory.services import receive_purchase
 
@@ -19,10 +20,11 @@ class PurchaseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Purchase
         fields = [
-            "id", "item", "item_name", "vendor", "vendor_name", "description",
+            "id", "order", "item", "item_name", "vendor", "vendor_name", "description",
             "quantity", "price", "total_value", "created_at",
         ]
-        read_only_fields = ["id", "total_value", "created_at"]
+        read_only_fields = ["id", "order", "total_value", "created_at"]
+        extra_kwargs = {"quantity": {"min_value": 1}}
 
     def create(self, validated_data):
         shop = self.context["request"].shop
@@ -36,4 +38,152 @@ class PurchaseSerializer(serializers.ModelSerializer):
                 description=validated_data.get("description", ""),
             )
         except ValueError as e:
-            raise serializers.ValidationError(str(e))
\ No newline at end of file
+            raise serializers.ValidationError(str(e))
+
+
+class PurchaseOrderLineInputSerializer(serializers.Serializer):
+    item_id = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    vendor_id = serializers.UUIDField(required=False, allow_null=True)
+    description = serializers.CharField(max_length=300, required=False, allow_blank=True)
+
+
+class PurchaseOrderCreateSerializer(serializers.Serializer):
+    """
+        Serializer d'entrée uniquement — la réception passe par
+        inventory.services.receive_purchase_order.
+    """
+    vendor_id = serializers.UUIDField(required=False, allow_null=True)
+    reference = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    description = serializers.CharField(max_length=300, required=False, allow_blank=True)
+    lines = PurchaseOrderLineInputSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class PurchaseOrderLineSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source="item.name", read_only=True)
+    vendor_name = serializers.CharField(source="vendor.name", read_only=True, default=None)
+
+    class Meta:
+        model = Purchase
+        fields = ["id", "item", "item_name", "vendor", "vendor_name", "description", "quantity", "price", "total_value"]
+
+
+class PurchaseOrderSerializer(serializers.ModelSerializer):
+    """Serializer de sortie (list/retrieve), lecture seule."""
+    vendor_name = serializers.CharField(source="vendor.name", read_only=True, default=None)
+    employee_username = serializers.CharField(source="employee.user.username", read_only=True, default=None)
+    lines = PurchaseOrderLineSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = PurchaseOrder
+        fields = [
+            "id", "created_at", "vendor", "vendor_name", "employee", "employee_username",
+            "reference", "description", "total_value", "lines",
+        ]
+        read_only_fields = fields
+
+
+class StockHistoryQuerySerializer(serializers.Serializer):
+    """Jours locaux inclus ; par défaut les 30 derniers jours."""
+    MAX_WINDOW_DAYS = 366
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get("date_from") and attrs.get("date_to"):
+            if attrs["date_from"] > attrs["date_to"]:
+                raise serializers.ValidationError("La date de début doit précéder la date de fin.")
+            if (attrs["date_to"] - attrs["date_from"]).days >= self.MAX_WINDOW_DAYS:
+                raise serializers.ValidationError(f"La période ne peut pas dépasser {self.MAX_WINDOW_DAYS} jours.")
+        return attrs
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ["id", "created_at", "kind", "quantity", "source_id"]
+
+
+class StockHistorySerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    opening_quantity = serializers.IntegerField(help_text="Stock au début de date_from")
+    closing_quantity = serializers.IntegerField(help_text="Stock à la fin de date_to")
+    movements = StockMovementSerializer(many=True)
+    truncated = serializers.BooleanField(help_text="true : seuls les 500 premiers mouvements sont listés")
+
+
+class StockValuationTotalsSerializer(serializers.Serializer):
+    item_count = serializers.IntegerField()
+    out_of_stock_count = serializers.IntegerField()
+    units = serializers.IntegerField()
+    cost_value = serializers.DecimalField(max_digits=16, decimal_places=2, help_text="Valeur au coût moyen pondéré.")
+    retail_value = serializers.DecimalField(max_digits=16, decimal_places=2, help_text="Valeur au prix de vente.")
+    potential_margin = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class CategoryValuationSerializer(StockValuationTotalsSerializer):
+    category_id = serializers.UUIDField()
+    category_name = serializers.CharField()
+
+
+class StockValuationSerializer(serializers.Serializer):
+    categories = CategoryValuationSerializer(many=True)
+    totals = StockValuationTotalsSerializer()
+
+
+class StockCountSerializer(serializers.ModelSerializer):
+    employee_username = serializers.CharField(source="employee.user.username", read_only=True, default=None)
+    closed_by_username = serializers.CharField(source="closed_by.user.username", read_only=True, default=None)
+
+    class Meta:
+        model = StockCount
+        fields = [
+            "id", "created_at", "status", "note", "employee", "employee_username", "closed_by", "closed_by_username",
+            "closed_at", "counted_items", "adjusted_items", "units_variance", "value_variance",
+        ]
+        read_only_fields = [field for field in fields if field != "note"]
+
+
+class StockCountLineInputSerializer(serializers.Serializer):
+    item_id = serializers.UUIDField(required=False)
+    code = serializers.CharField(max_length=64, required=False, help_text="Code-barres ou SKU scanné")
+    quantity = serializers.IntegerField(min_value=0)
+
+    def validate(self, attrs):
+        if not attrs.get("item_id") and not attrs.get("code"):
+            raise serializers.ValidationError("Indiquer item_id ou code.")
+        return attrs
+
+
+class StockCountBatchSerializer(serializers.Serializer):
+    """
+        Serializer d'entrée uniquement — voir inventory.counts.record_counts.
+        add : les quantités s'ajoutent aux comptages déjà reçus ; set : elles
+        les remplacent (recomptage).
+    """
+    mode = serializers.ChoiceField(choices=COUNT_MODES, default="add")
+    lines = StockCountLineInputSerializer(many=True, allow_empty=False, max_length=MAX_COUNT_LINES)
+
+
+class StockCountBatchResultSerializer(serializers.Serializer):
+    accepted = serializers.IntegerField(help_text="Articles enregistrés")
+    unknown = serializers.ListField(child=serializers.CharField(), help_text="Identifiants ou codes introuvables")
+
+
+class StockCountCloseSerializer(serializers.Serializer):
+    reset_uncounted = serializers.BooleanField(
+        default=False, help_text="Mettre à zéro le stock des articles non comptés (inventaire complet)."
+    )
+
+
+class StockCountLineSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source="item.name", read_only=True)
+    variance = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = StockCountLine
+        fields = ["id", "updated_at", "item", "item_name", "counted_quantity", "expected_quantity", "variance"]
+        read_only_fields = fields
@@ -1,7 +1,59 @@
+from collections import defaultdict
+
 from django.db import models
 from django.db import transaction
+from django.utils import timezone
+from django.db.models.functions import Coalesce, Greatest, NullIf
+
+from catalog.models import Item
+
+from inventory.ledger import record_movements
+from inventory.models import Purchase, PurchaseOrder, StockMovementKind, Vendor
+
 
-from inventory.models import Purchase
+COST = models.DecimalField(max_digits=12, decimal_places=4)
+
+
+def _weighted_average_cost(quantity, value):
+    """
+        Coût moyen après l'entrée de `quantity` unités valant `value` au total :
+        (stock × coût moyen + value) / (stock + quantity). Un stock négatif
+        compte pour zéro ; si le diviseur est nul, le coût moyen est conservé.
+        Les deux membres d'un SET lisent la ligne d'avant l'UPDATE.
+    """
+    on_hand = Greatest(models.F("quantity"), models.Value(0))
+    return Coalesce(
+        models.ExpressionWrapper(
+            (on_hand * models.F("average_cost") + models.Value(value, output_field=COST))
+            / NullIf(on_hand + quantity, models.Value(0)),
+            output_field=COST,
+        ),
+        models.F("average_cost"),
+        output_field=COST,
+    )
+
+
+def _increment_stock(*, shop, quantities, values):
+    """
+        Toutes les entrées en stock en un seul UPDATE ... SET quantity = CASE ...,
+        coût moyen pondéré compris. values : {item_id: valeur d'achat totale}.
+    """
+    Item.objects.filter(shop=shop, id__in=quantities).update(
+        quantity=models.Case(
+            *[models.When(id=item_id, then=models.F("quantity") + quantity) for item_id, quantity in quantities.items()],
+            default=models.F("quantity"),
+        ),
+        average_cost=models.Case(
+            *[
+                models.When(id=item_id, then=_weighted_average_cost(quantity, values[item_id]))
+                for item_id, quantity in quantities.items()
+            ],
+            default=models.F("average_cost"),
+            output_field=COST,
+        ),
+        # updated_at : auto_now ne s'applique pas à update(), la synchro du catalogue en dépend.
+        updated_at=timezone.now(),
+    )
 
 
 @transaction.atomic
@@ -9,29 +61,118 @@ def receive_purchase(*, shop, item, vendor, quantity, price, description=''):
     if item.shop_id != shop.id:
         raise ValueError("Cet article n'appartient pas à cette boutique.")
 
-    if vendor and vendor.merchant != shop.owner:
+    if vendor and vendor.merchant_id != shop.owner_id:
         raise ValueError("Ce fournisseur ne fait pas partie des fournisseurs de cette boutique.")
 
-    purchase = Purchase(
+    if quantity < 1:
+        raise ValueError("La quantité reçue doit être d'au moins une unité.")
+
+    purchase = Purchase.objects.create(
         shop=shop,
         item=item,
         vendor=vendor,
         quantity=quantity,
         price=price,
+        total_value=quantity * price,
         description=description,
     )
 
-    item.quantity = models.F('quantity') + quantity
-    item.save(update_fields=['quantity'])
-    item.refresh_from_db(fields=['quantity'])
+    _increment_stock(shop=shop, quantities={item.id: quantity}, values={item.id: quantity * price})
+    record_movements(shop=shop, kind=StockMovementKind.PURCHASE, quantities={item.id: quantity}, source_id=purchase.id)
 
     return purchase
 
 
+@transaction.atomic
+def receive_purchase_order(*, shop, lines_data, vendor_id=None, employee=None, reference=None, description=None):
+    """
+        Réceptionne une livraison complète : une requête pour les articles, une
+        pour les fournisseurs, un bulk_create des lignes (Purchase) et un seul
+        UPDATE pour le stock, quel que soit le nombre de lignes.
+
+        lines_data : [{"item_id", "quantity", "price", "vendor_id" (facultatif), "description" (facultatif)}].
+        Le fournisseur d'une ligne remplace celui du bon.
+    """
+    if any(line["quantity"] < 1 for line in lines_data):
+        raise ValueError("La quantité reçue doit être d'au moins une unité.")
+
+    item_ids = {line["item_id"] for line in lines_data}
+    items = Item.objects.filter(shop=shop, id__in=item_ids).only("id", "name", "shop_id").in_bulk()
+    if len(items) != len(item_ids):
+        raise ValueError("Un ou plusieurs articles du bon sont introuvables dans cette boutique.")
+
+    vendor_ids = {line["vendor_id"] for line in lines_data if line.get("vendor_id")}
+    if vendor_id:
+        vendor_ids.add(vendor_id)
+    vendors = Vendor.objects.filter(merchant=shop.owner_id, id__in=vendor_ids).in_bulk()
+    if len(vendors) != len(vendor_ids):
+        raise ValueError("Un ou plusieurs fournisseurs ne font pas partie des fournisseurs de cette boutique.")
+
+    order = PurchaseOrder.objects.create(
+        shop=shop,
+        vendor=vendors.get(vendor_id),
+        employee=employee,
+        reference=reference,
+        description=description,
+        total_value=sum(line["quantity"] * line["price"] for line in lines_data),
+    )
+
+    purchases = Purchase.objects.bulk_create([
+        Purchase(
+            shop=shop,
+            order=order,
+            item=items[line["item_id"]],
+            vendor=vendors.get(line.get("vendor_id") or vendor_id),
+            quantity=line["quantity"],
+            price=line["price"],
+            total_value=line["quantity"] * line["price"],
+            description=line.get("description") or description,
+        )
+        for line in lines_data
+    ])
+
+    # Un même article peut figurer sur plusieurs lignes : l'entrée en stock porte sur le cumul.
+    quantities, values = defaultdict(int), defaultdict(int)
+    for line in lines_data:
+        quantities[line["item_id"]] += line["quantity"]
+        values[line["item_id"]] += line["quantity"] * line["price"]
+    _increment_stock(shop=shop, quantities=quantities, values=values)
+    record_movements(shop=shop, kind=StockMovementKind.PURCHASE, quantities=quantities, source_id=order.id)
+
+    # Lignes déjà en mémoire (avec article et fournisseur) pour la réponse.
+    order._prefetched_objects_cache = {"lines": purchases}
+    return order
+
+
 @transaction.atomic
 def reverse_purchase(purchase: Purchase):
     item = purchase.item
-    item.quantity = models.F('quantity') - purchase.quantity
-    item.save(update_fields=['quantity'])
+    # Retire la réception du coût moyen ; s'il ne reste rien en stock, le coût moyen est conservé.
+    remaining = models.F('quantity') - purchase.quantity
+    Item.objects.filter(id=item.id).update(
+        quantity=remaining,
+        average_cost=models.Case(
+            models.When(
+                quantity__gt=purchase.quantity,
+                then=Greatest(
+                    models.ExpressionWrapper(
+                        (models.F('quantity') * models.F('average_cost') - purchase.total_value) / remaining,
+                        output_field=COST,
+                    ),
+                    models.Value(0, output_field=COST),
+                ),
+            ),
+            default=models.F('average_cost'),
+            output_field=COST,
+        ),
+        updated_at=timezone.now(),
+    )
+    record_movements(
+        shop=purchase.shop, kind=StockMovementKind.PURCHASE_REVERSAL,
+        quantities={item.id: -purchase.quantity}, source_id=purchase.id,
+    )
+    if purchase.order_id:
+        PurchaseOrder.objects.filter(id=purchase.order_id).update(
+            total_value=models.F('total_value') - purchase.total_value, updated_at=timezone.now()
+        )
     purchase.delete()
-    
\ No newline at end of file
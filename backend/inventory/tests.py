@@ -1,3 +1,278 @@
+from io import StringIO
+from decimal import Decimal
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from catalog.models import Item
+from catalog.services import quick_create_item
+
+from inventory.consistency import _repair_chunk, verify_shop_stock
+from inventory.counts import close_stock_count, open_stock_count, record_counts
+from inventory.ledger import take_stock_snapshots
+from inventory.models import Purchase, PurchaseOrder, StockMovement, StockMovementKind, Vendor
+from inventory.serializers import PurchaseSerializer
+from inventory.services import _increment_stock, receive_purchase, receive_purchase_order, reverse_purchase
+
+from sales.services import create_sale
+
+from tenants.services import register_merchant
+
+
+class WeightedAverageCostTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        self.item = quick_create_item(shop=self.shop, name="Savon", price=Decimal("100"), quantity=10)
+
+    def _receive(self, quantity, price):
+        purchase = receive_purchase(shop=self.shop, item=self.item, vendor=None, quantity=quantity, price=Decimal(price))
+        self.item.refresh_from_db()
+        return purchase
+
+    def test_receipt_blends_cost_with_stock_on_hand(self):
+        self._receive(10, "140")
+        self.assertEqual(self.item.quantity, 20)
+        self.assertEqual(self.item.average_cost, Decimal("120"))
+
+    def test_negative_stock_counts_as_zero(self):
+        Item.objects.filter(id=self.item.id).update(quantity=-3)
+        self._receive(5, "80")
+        self.assertEqual(self.item.quantity, 2)
+        self.assertEqual(self.item.average_cost, Decimal("80"))
+
+    def test_zero_quantity_is_rejected(self):
+        Item.objects.filter(id=self.item.id).update(quantity=0)
+        with self.assertRaises(ValueError):
+            self._receive(0, "80")
+        with self.assertRaises(ValueError):
+            receive_purchase_order(shop=self.shop, lines_data=[{"item_id": self.item.id, "quantity": 0, "price": Decimal("80")}])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.average_cost, Decimal("100"))
+
+    def test_empty_divisor_keeps_cost(self):
+        Item.objects.filter(id=self.item.id).update(quantity=-2)
+        _increment_stock(shop=self.shop, quantities={self.item.id: 0}, values={self.item.id: Decimal("0")})
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.average_cost, Decimal("100"))
+
+    def test_serializer_rejects_zero_quantity(self):
+        serializer = PurchaseSerializer(data={"item": self.item.id, "quantity": 0, "price": "80"})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("quantity", serializer.errors)
+
+    def test_reversal_restores_previous_cost(self):
+        purchase = self._receive(10, "140")
+        reverse_purchase(purchase)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 10)
+        self.assertEqual(self.item.average_cost, Decimal("100"))
+
+    def test_reversal_of_whole_stock_keeps_cost(self):
+        Item.objects.filter(id=self.item.id).update(quantity=0)
+        purchase = self._receive(4, "140")
+        reverse_purchase(purchase)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 0)
+        self.assertEqual(self.item.average_cost, Decimal("140"))
+
+    def test_order_lines_on_the_same_item_are_blended_once(self):
+        receive_purchase_order(shop=self.shop, lines_data=[
+            {"item_id": self.item.id, "quantity": 5, "price": Decimal("130")},
+            {"item_id": self.item.id, "quantity": 5, "price": Decimal("150")},
+        ])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 20)
+        self.assertEqual(self.item.average_cost, Decimal("120"))
+
+
+class PurchaseOrderTests(TestCase):
+    def setUp(self):
+        _, self.merchant, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        self.soap = quick_create_item(shop=self.shop, name="Savon", price=Decimal("100"), quantity=10)
+        self.oil = quick_create_item(shop=self.shop, name="Huile", price=Decimal("900"), quantity=0)
+        self.vendor = Vendor.objects.create(merchant=self.merchant, name="Grossiste")
+
+    def _stock(self, item):
+        return Item.objects.get(pk=item.pk).quantity
+
+    def test_order_receives_every_line_in_one_go(self):
+        order = receive_purchase_order(shop=self.shop, vendor_id=self.vendor.id, lines_data=[
+            {"item_id": self.soap.id, "quantity": 6, "price": Decimal("80")},
+            {"item_id": self.oil.id, "quantity": 2, "price": Decimal("700")},
+        ])
+        self.assertEqual(order.total_value, Decimal("1880"))
+        self.assertEqual((self._stock(self.soap), self._stock(self.oil)), (16, 2))
+        self.assertEqual(set(Purchase.objects.filter(order=order).values_list("vendor", flat=True)), {self.vendor.id})
+        movements = StockMovement.objects.filter(source_id=order.id, kind=StockMovementKind.PURCHASE)
+        self.assertEqual(dict(movements.values_list("item", "quantity")), {self.soap.id: 6, self.oil.id: 2})
+
+    def test_line_vendor_overrides_the_order_vendor(self):
+        other = Vendor.objects.create(merchant=self.merchant, name="Huilerie")
+        order = receive_purchase_order(shop=self.shop, vendor_id=self.vendor.id, lines_data=[
+            {"item_id": self.soap.id, "quantity": 1, "price": Decimal("80")},
+            {"item_id": self.oil.id, "quantity": 1, "price": Decimal("700"), "vendor_id": other.id},
+        ])
+        self.assertEqual(Purchase.objects.get(order=order, item=self.oil).vendor, other)
+        self.assertEqual(Purchase.objects.get(order=order, item=self.soap).vendor, self.vendor)
+
+    def test_unknown_item_rejects_the_whole_order(self):
+        _, _, other_shop = register_merchant(
+            username="other", password="not-used", company_name="Autre", shop_name="Ailleurs"
+        )
+        foreign = quick_create_item(shop=other_shop, name="Savon", price=Decimal("100"), quantity=0)
+        with self.assertRaises(ValueError):
+            receive_purchase_order(shop=self.shop, lines_data=[
+                {"item_id": self.soap.id, "quantity": 6, "price": Decimal("80")},
+                {"item_id": foreign.id, "quantity": 6, "price": Decimal("80")},
+            ])
+        self.assertEqual(self._stock(self.soap), 10)
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.assertFalse(Purchase.objects.exists())
+
+    def test_vendor_of_another_merchant_is_rejected(self):
+        _, other_merchant, _ = register_merchant(
+            username="other", password="not-used", company_name="Autre", shop_name="Ailleurs"
+        )
+        foreign = Vendor.objects.create(merchant=other_merchant, name="Grossiste")
+        with self.assertRaises(ValueError):
+            receive_purchase_order(shop=self.shop, vendor_id=foreign.id, lines_data=[
+                {"item_id": self.soap.id, "quantity": 6, "price": Decimal("80")},
+            ])
+        self.assertEqual(self._stock(self.soap), 10)
+
+
+class StockCountTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        self.soap = quick_create_item(shop=self.shop, name="Savon", price=Decimal("100"), quantity=10)
+        self.oil = quick_create_item(shop=self.shop, name="Huile", price=Decimal("900"), quantity=4)
+        self.count = open_stock_count(shop=self.shop)
+
+    def _sell(self, item, quantity):
+        total = item.price * quantity
+        create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": item.id, "price": item.price, "quantity": quantity, "total_item": total}],
+            payment_data={"sub_total": total, "grand_total": total, "amount_paid": total, "cash_payment_amount": total},
+        )
+
+    def _count(self, item, quantity, mode="add"):
+        record_counts(count=self.count, lines=[{"item_id": item.id, "quantity": quantity}], mode=mode)
+
+    def _stock(self, item):
+        return Item.objects.get(pk=item.pk).quantity
+
+    def test_sales_made_during_the_count_are_kept(self):
+        self._count(self.soap, 8)
+        self._sell(self.soap, 3)
+        count = close_stock_count(count=self.count)
+        # 8 comptés pour 10 attendus : 2 manquants, en plus des 3 vendus depuis.
+        self.assertEqual(self._stock(self.soap), 5)
+        self.assertEqual(count.units_variance, -2)
+        self.assertEqual(verify_shop_stock(shop_id=self.shop.id)["drifts"], [])
+
+    def test_add_mode_sums_counting_stations(self):
+        self._count(self.soap, 4)
+        self._sell(self.soap, 1)
+        self._count(self.soap, 5)
+        close_stock_count(count=self.count)
+        # Le stock attendu reste celui du premier comptage (10) : 9 comptés, 1 vendu.
+        self.assertEqual(self._stock(self.soap), 8)
+
+    def test_set_mode_recount_rereads_expected_stock(self):
+        self._count(self.soap, 8)
+        self._sell(self.soap, 3)
+        self._count(self.soap, 7, mode="set")
+        count = close_stock_count(count=self.count)
+        self.assertEqual(self._stock(self.soap), 7)
+        self.assertEqual(count.adjusted_items, 0)
+
+    def test_reset_uncounted_zeroes_items_nobody_counted(self):
+        self._count(self.soap, 10)
+        count = close_stock_count(count=self.count, reset_uncounted=True)
+        self.assertEqual((self._stock(self.soap), self._stock(self.oil)), (10, 0))
+        self.assertEqual((count.counted_items, count.adjusted_items, count.units_variance), (2, 1, -4))
+        self.assertEqual(verify_shop_stock(shop_id=self.shop.id)["drifts"], [])
+
+    def test_closed_count_refuses_new_lines(self):
+        close_stock_count(count=self.count)
+        with self.assertRaises(ValueError):
+            self._count(self.soap, 1)
+
+
+class StockConsistencyTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boutique", shop_name="Centre"
+        )
+        self.items = [
+            quick_create_item(shop=self.shop, name=name, price=Decimal("100"), quantity=10)
+            for name in ("Huile", "Riz", "Savon")
+        ]
+        self._sell(self.items[0], 3)
+        receive_purchase(shop=self.shop, item=self.items[1], vendor=None, quantity=5, price=Decimal("80"))
+
+    def _sell(self, item, quantity):
+        total = Decimal("100") * quantity
+        create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": item.id, "price": Decimal("100"), "quantity": quantity, "total_item": total}],
+            payment_data={"sub_total": total, "grand_total": total, "amount_paid": total, "cash_payment_amount": total},
+        )
+
+    def _drift(self, item, quantity):
+        # Écriture hors services (import SQL, correctif manuel...) : rien n'est journalisé.
+        Item.objects.filter(pk=item.pk).update(quantity=quantity)
+
+    def test_stock_kept_by_the_services_matches_the_ledger(self):
+        take_stock_snapshots(shop=self.shop, at=timezone.now())
+        self._sell(self.items[0], 2)
+
+        result = verify_shop_stock(shop_id=self.shop.id)
+        self.assertEqual((result["checked"], result["drifts"]), (3, []))
+
+    def test_drift_is_reported_across_chunks_and_repaired(self):
+        self._drift(self.items[0], 50)
+        self._drift(self.items[2], 4)
+
+        result = verify_shop_stock(shop_id=self.shop.id, repair=True, chunk_size=1)
+
+        self.assertEqual(result["checked"], 3)
+        self.assertEqual(
+            sorted((drift["name"], drift["quantity"], drift["expected"], drift["difference"]) for drift in result["drifts"]),
+            [("Huile", 50, 7, 43), ("Savon", 4, 10, -6)],
+        )
+        self.assertEqual(result["repaired"], 2)
+        self.assertEqual(
+            list(Item.objects.filter(shop=self.shop).order_by("name").values_list("quantity", flat=True)), [7, 15, 10]
+        )
+        self.assertEqual(verify_shop_stock(shop_id=self.shop.id)["drifts"], [])
+
+    def test_repair_leaves_an_item_that_moved_since_the_check(self):
+        self._drift(self.items[2], 4)
+        drifts = verify_shop_stock(shop_id=self.shop.id)["drifts"]
+        self._sell(self.items[2], 1)
+
+        self.assertEqual(_repair_chunk(drifts), 0)
+        self.items[2].refresh_from_db()
+        self.assertEqual(self.items[2].quantity, 3)
+
+    def test_command_reports_and_repairs(self):
+        self._drift(self.items[1], 0)
+        out = StringIO()
+
+        call_command("verify_stock", "--workers", "1", stdout=out)
+        self.assertIn("Riz : stock 0, journal 15 (-15)", out.getvalue())
+        self.assertIn("1 en écart, 0 corrigé(s)", out.getvalue())
 
-# Create your tests here.
+        call_command("verify_stock", "--workers", "1", "--repair", stdout=out)
+        self.assertIn("1 en écart, 1 corrigé(s)", out.getvalue())
+        self.items[1].refresh_from_db()
+        self.assertEqual(self.items[1].quantity, 15)
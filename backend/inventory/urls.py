@@ -1,12 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
 
-from inventory.views import VendorViewSet, PurchaseViewSet
+from inventory.views import VendorViewSet, PurchaseViewSet, PurchaseOrderViewSet, StockCountViewSet, StockValuationView
 
 router = SimpleRouter()
 router.register(r"vendors", VendorViewSet, basename="shop-vendors")
 router.register(r"purchases", PurchaseViewSet, basename="shop-purchases")
+router.register(r"purchase-orders", PurchaseOrderViewSet, basename="shop-purchase-orders")
+router.register(r"stock-counts", StockCountViewSet, basename="shop-stock-counts")
 
 urlpatterns = [
     path("shops/<uuid:shop_pk>/", include(router.urls)),
+    path("shops/<uuid:shop_pk>/reports/stock-valuation/", StockValuationView.as_view(), name="shop-report-stock-valuation"),
 ]
\ No newline at end of file
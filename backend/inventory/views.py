@@ -1,19 +1,37 @@
-from rest_framework import viewsets
+from django.db import models
 
-from django_filters import rest_framework as filters
+from rest_framework import viewsets, serializers
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.decorators import action
 
-from core.permissions import IsShopMember, ManagerOnlyMixin
-from core.schema import shop_scoped_schema
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 
-from inventory.models import Vendor, Purchase
+from core.exports import ExportMixin
+from core.filters import ShopDateRangeFilterSet
+from core.db_routing import ReplicaReadMixin
+from core.idempotency import IdempotencyMixin
+from core.pagination import PageOrKeysetPagination
+from core.permissions import IsShopManager, IsShopMember, IsShopManagerStrict, ManagerOnlyMixin
+from core.schema import SHOP_PK_PARAMETER, shop_scoped_schema
+from core.sparse_fields import SparseFieldsMixin
+
+from inventory.models import Vendor, Purchase, PurchaseOrder, StockCount
 
 from inventory.serializers import VendorSerializer, PurchaseSerializer
+from inventory.serializers import PurchaseOrderCreateSerializer, PurchaseOrderSerializer
+from inventory.serializers import StockValuationSerializer
+from inventory.serializers import StockCountSerializer, StockCountLineSerializer, StockCountCloseSerializer
+from inventory.serializers import StockCountBatchSerializer, StockCountBatchResultSerializer
+
+from inventory.reports import get_stock_valuation
+from inventory.counts import cancel_stock_count, close_stock_count, open_stock_count, record_counts
 
-from inventory.services import reverse_purchase
+from inventory.services import receive_purchase_order, reverse_purchase
 
 
 @shop_scoped_schema
-class VendorViewSet(ManagerOnlyMixin, viewsets.ModelViewSet):
+class VendorViewSet(SparseFieldsMixin, ReplicaReadMixin, IdempotencyMixin, ManagerOnlyMixin, viewsets.ModelViewSet):
     serializer_class = VendorSerializer
     permission_classes = [IsShopMember]
     search_fields = ["name", "address"]
@@ -30,11 +48,8 @@ class VendorViewSet(ManagerOnlyMixin, viewsets.ModelViewSet):
 
 
 @shop_scoped_schema
-class PurchaseViewSet(ManagerOnlyMixin, viewsets.ModelViewSet):
-    class PurchaseFilter(filters.FilterSet):
-        date_after = filters.DateFilter(field_name="created_at", lookup_expr="date__gte")
-        date_before = filters.DateFilter(field_name="created_at", lookup_expr="date__lte")
-
+class PurchaseViewSet(ExportMixin, SparseFieldsMixin, ReplicaReadMixin, IdempotencyMixin, ManagerOnlyMixin, viewsets.ModelViewSet):
+    class PurchaseFilter(ShopDateRangeFilterSet):
         class Meta:
             model = Purchase
             fields = ["item", "vendor", "date_after", "date_before"]
@@ -42,13 +57,179 @@ class PurchaseViewSet(ManagerOnlyMixin, viewsets.ModelViewSet):
     serializer_class = PurchaseSerializer
     permission_classes = [IsShopMember]
     filterset_class = PurchaseFilter
+    pagination_class = PageOrKeysetPagination
     ordering_fields = ["created_at", "quantity", "total_value"]
     ordering = ["-created_at"]
+    sparse_select_related = {"item_name": ["item"], "vendor_name": ["vendor"]}
+
+    export_filename = "achats"
+    export_select_related = ["item", "vendor"]
+    export_columns = [
+        ("Date", "created_at"),
+        ("Article", "item.name"),
+        ("Fournisseur", "vendor.name"),
+        ("Quantité", "quantity"),
+        ("Prix unitaire", "price"),
+        ("Valeur", "total_value"),
+        ("Description", "description"),
+    ]
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
             return Purchase.objects.none()
-        return Purchase.objects.filter(shop=self.request.shop).select_related("item", "vendor")
+        return Purchase.objects.filter(shop=self.request.shop)
 
     def perform_destroy(self, instance):
         reverse_purchase(instance)
+
+
+@shop_scoped_schema
+class PurchaseOrderViewSet(SparseFieldsMixin, ReplicaReadMixin, IdempotencyMixin, ManagerOnlyMixin, viewsets.ModelViewSet):
+    class PurchaseOrderFilter(ShopDateRangeFilterSet):
+        class Meta:
+            model = PurchaseOrder
+            fields = ["vendor", "date_after", "date_before"]
+
+    permission_classes = [IsShopMember]
+    http_method_names = ["get", "post", "head"]  # une ligne se corrige via purchases/ (DELETE)
+    filterset_class = PurchaseOrderFilter
+    pagination_class = PageOrKeysetPagination
+    search_fields = ["reference"]
+    ordering_fields = ["created_at", "total_value"]
+    ordering = ["-created_at"]
+    sparse_select_related = {"vendor_name": ["vendor"], "employee_username": ["employee__user"]}
+    sparse_prefetch_related = {"lines": ["lines__item", "lines__vendor"]}
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return PurchaseOrder.objects.none()
+        return PurchaseOrder.objects.filter(shop=self.request.shop)
+
+    def get_serializer_class(self):
+        return PurchaseOrderCreateSerializer if self.action == "create" else PurchaseOrderSerializer
+
+    def create(self, request, *args, **kwargs):
+        input_serializer = PurchaseOrderCreateSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+        data = input_serializer.validated_data
+        try:
+            order = receive_purchase_order(
+                shop=request.shop,
+                lines_data=data["lines"],
+                vendor_id=data.get("vendor_id"),
+                employee=request.employee,
+                reference=data.get("reference") or None,
+                description=data.get("description") or None,
+            )
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return Response(PurchaseOrderSerializer(order).data, status=201)
+
+
+@shop_scoped_schema
+class StockCountViewSet(ReplicaReadMixin, IdempotencyMixin, viewsets.ModelViewSet):
+    """
+        Inventaire physique : ouverture, comptages par lots depuis un ou
+        plusieurs postes (lines/), puis clôture qui applique tous les écarts.
+    """
+    serializer_class = StockCountSerializer
+    http_method_names = ["get", "post", "head"]
+    filterset_fields = ["status"]
+    ordering = ["-created_at"]
+
+    def get_permissions(self):
+        # Compter est ouvert à tout membre de la boutique ; ouvrir, clôturer ou annuler reste à OWNER/MANAGER.
+        if self.action in ["create", "close", "cancel"]:
+            return [IsShopMember(), IsShopManager()]
+        return [IsShopMember()]
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return StockCount.objects.none()
+        return StockCount.objects.filter(shop=self.request.shop).select_related("employee__user", "closed_by__user")
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            count = open_stock_count(
+                shop=request.shop, employee=request.employee, note=serializer.validated_data.get("note") or None,
+            )
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return Response(StockCountSerializer(count).data, status=201)
+
+    @extend_schema(
+        methods=["GET"],
+        parameters=[SHOP_PK_PARAMETER, OpenApiParameter(name="variance_only", type=bool,
+                                                        description="Seulement les articles en écart")],
+        responses={200: StockCountLineSerializer(many=True)},
+        summary="Lignes comptées d'un inventaire, avec leur écart",
+    )
+    @extend_schema(
+        methods=["POST"],
+        parameters=[SHOP_PK_PARAMETER],
+        request=StockCountBatchSerializer,
+        responses={200: StockCountBatchResultSerializer},
+        summary="Envoyer un lot de comptages (1000 lignes max)",
+    )
+    @action(detail=True, methods=["get", "post"], url_path="lines")
+    def lines(self, request, *args, **kwargs):
+        count = self.get_object()
+        if request.method == "GET":
+            lines = (
+                count.lines.select_related("item")
+                .annotate(variance=models.F("counted_quantity") - models.F("expected_quantity"))
+                .order_by("item__name", "id")
+            )
+            if request.query_params.get("variance_only") in ("true", "1"):
+                lines = lines.exclude(variance=0)
+            page = self.paginate_queryset(lines)
+            return self.get_paginated_response(StockCountLineSerializer(page, many=True).data)
+
+        serializer = StockCountBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = record_counts(count=count, **serializer.validated_data)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return Response(StockCountBatchResultSerializer(result).data)
+
+    @extend_schema(
+        parameters=[SHOP_PK_PARAMETER],
+        request=StockCountCloseSerializer,
+        responses={200: StockCountSerializer},
+        summary="Clôturer l'inventaire et appliquer les écarts",
+    )
+    @action(detail=True, methods=["post"], url_path="close")
+    def close(self, request, *args, **kwargs):
+        serializer = StockCountCloseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            count = close_stock_count(count=self.get_object(), employee=request.employee, **serializer.validated_data)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return Response(StockCountSerializer(count).data)
+
+    @extend_schema(parameters=[SHOP_PK_PARAMETER], request=None, responses={200: StockCountSerializer},
+                   summary="Annuler l'inventaire sans toucher au stock")
+    @action(detail=True, methods=["post"], url_path="cancel")
+    def cancel(self, request, *args, **kwargs):
+        try:
+            count = cancel_stock_count(count=self.get_object())
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return Response(StockCountSerializer(count).data)
+
+
+class StockValuationView(ReplicaReadMixin, APIView):
+    """GET /api/shops/{shop_pk}/reports/stock-valuation/ — réservé à OWNER/MANAGER."""
+    permission_classes = [IsShopMember, IsShopManagerStrict]
+
+    @extend_schema(
+        responses={200: StockValuationSerializer},
+        summary="Valeur du stock au coût moyen pondéré, par catégorie",
+        parameters=[SHOP_PK_PARAMETER],
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(StockValuationSerializer(get_stock_valuation(shop=request.shop)).data)
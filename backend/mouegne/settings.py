@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 
 import dj_database_url
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -22,6 +24,7 @@ DEBUG = os.environ['DEBUG']
 
 CORS_ALLOWED_ORIGINS = os.environ.get("CORS_ALLOWED_ORIGINS", "").split(",")
 ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "").split(",")
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 # Application definition
 
@@ -63,6 +66,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_routing.DatabaseRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'mouegne.urls'
@@ -93,6 +97,20 @@ DATABASES = {
     "default": dj_database_url.config(default=os.environ["DATABASE_URL"])
 }
 
+# Réplicas en lecture (URLs séparées par des virgules), voir core.db_routing.
+# En local : deux bases PostgreSQL, par ex. DATABASE_REPLICA_URLS=postgres://.../mouegne_replica
+# alimentée par réplication ; sous `manage.py test`, chaque réplica pointe sur la base de test principale.
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(","))):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {**dj_database_url.parse(url), "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["core.db_routing.ReplicaRouter"]
+# Après une écriture, l'utilisateur lit sur la principale le temps que les réplicas rattrapent.
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", 10))
+DATABASE_REPLICA_STICKY_CACHE = os.environ.get("DATABASE_REPLICA_STICKY_CACHE", "routing")
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -136,6 +154,17 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Durée pendant laquelle une requête rejouée avec le même en-tête Idempotency-Key
+# reçoit la réponse mémorisée (voir core.idempotency).
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# Bail d'une requête en cours : passé ce délai sans réponse (worker tué avant la fin),
+# une nouvelle requête avec la même clé reprend la main. Au-delà du timeout gunicorn (30 s).
+IDEMPOTENCY_PENDING_TIMEOUT = timedelta(seconds=60)
+
+# Rétention des articles supprimés pour la synchronisation des caisses (voir catalog.sync) :
+# une caisse restée hors ligne plus longtemps reçoit un catalogue complet.
+CATALOG_TOMBSTONE_TTL = timedelta(days=30)
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Mouegne API",
     "DESCRIPTION": "API de gestion de vente au comptoir multi-boutiques pour AEME Consulting.",
@@ -171,6 +200,68 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'static/images')
 MEDIA_URL = '/images/'
 
+# Reçus PDF déjà rendus (voir sales.receipts). Stockage interchangeable :
+# remplacer le BACKEND pour pointer vers un stockage objet partagé.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    "receipts": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": os.environ.get("RECEIPTS_ROOT", os.path.join(BASE_DIR, 'receipts')),
+        },
+    },
+}
+
+# Pool de processus qui rendent les reçus PDF en arrière-plan (0 = rendu dans la requête).
+RECEIPT_RENDER_WORKERS = int(os.environ.get("RECEIPT_RENDER_WORKERS", 2))
+RECEIPT_RENDER_TIMEOUT = 30
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Rapports de vente, partagés entre les workers gunicorn (table créée par
+    # `manage.py createcachetable`). Seules les requêtes de rapport le consultent.
+    "reports": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "cache_entries",
+    },
+    # Marqueur « lit sur la principale » après une écriture (core.db_routing). Il doit être
+    # partagé entre les workers gunicorn : la lecture qui suit une écriture peut tomber sur
+    # un autre worker. Une requête par clé primaire sur la principale par lecture routée.
+    "routing": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "db_routing_sticky",
+    },
+}
+
+# Ventes hors ligne (POST /sales/batch/) : date de vente fournie par la caisse (sold_at).
+# Plus ancienne que OFFLINE_SALE_MAX_AGE, elle est refusée ; l'horloge de la caisse peut
+# avancer de OFFLINE_SALE_CLOCK_SKEW au plus.
+OFFLINE_SALE_MAX_AGE = timedelta(days=7)
+OFFLINE_SALE_CLOCK_SKEW = timedelta(minutes=5)
+
+# Rapports de vente : une fenêtre qui inclut aujourd'hui est aussi périmée à chaque vente.
+SALES_REPORT_LIVE_CACHE_TTL = 15 * 60
+SALES_REPORT_CLOSED_CACHE_TTL = 24 * 60 * 60
+
+# Partitionnement mensuel optionnel des ventes (PostgreSQL, `manage.py partition_sales`)
+# et archivage à froid des mois anciens (`manage.py archive_sales`).
+SALES_PARTITION_MONTHS_AHEAD = 3
+SALES_ARCHIVE_AFTER_MONTHS = 24
+SALES_ARCHIVE_ROOT = os.environ.get("SALES_ARCHIVE_ROOT", os.path.join(BASE_DIR, 'archives'))
+
+# Journal de stock (inventory.ledger) : `manage.py take_stock_snapshots`, planifiée chaque nuit.
+# Un instantané s'arrête à now - STOCK_SNAPSHOT_LAG, après les transactions encore en cours.
+STOCK_SNAPSHOT_LAG = timedelta(minutes=5)
+# Processus du contrôle de cohérence nocturne (`manage.py verify_stock`).
+STOCK_VERIFY_WORKERS = int(os.environ.get("STOCK_VERIFY_WORKERS", min(4, os.cpu_count() or 1)))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,210 @@
+"""
+    Archivage à froid des ventes anciennes et relecture des tickets archivés.
+
+    Un mois archivé devient un fichier sales-AAAA-MM-<horodatage>.ndjson.gz
+    sous SALES_ARCHIVE_ROOT : une vente (avec ses lignes) par membre gzip,
+    dont la position est indexée dans ArchivedSale. Les ventes sortent des
+    tables vivantes : si elles sont partitionnées, la partition du mois est
+    détachée puis supprimée ; sinon les lignes sont supprimées par paquets.
+
+    Les cumuls journaliers (DailyShopSales) ne sont pas touchés : tableau de
+    bord et rapports consolidés gardent l'historique complet.
+"""
+import os
+import gzip
+import json
+import uuid
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from django.core.serializers.json import DjangoJSONEncoder
+
+from catalog.models import Item
+from tenants.models import Employee
+
+from sales.models import ArchivedSale, Customer, Sale, SaleDetail
+from sales.partitioning import SALE_DETAIL_TABLE, SALE_TABLE
+from sales.partitioning import add_months, detach_month_partition, is_partitioned, month_bounds, month_start
+
+ARCHIVE_CHUNK_SIZE = 500
+
+
+def _to_document(instance):
+    return {field.attname: getattr(instance, field.attname) for field in type(instance)._meta.concrete_fields}
+
+
+def _from_document(model, document):
+    instance = model(**{
+        field.attname: field.to_python(document.get(field.attname))
+        for field in model._meta.concrete_fields
+    })
+    instance._state.adding = False
+    instance._state.db = "default"
+    return instance
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _in_clause(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _db_ids(sale_ids):
+    # Requêtes brutes : les UUID sont convertis comme le ferait l'ORM (texte hexadécimal sous SQLite).
+    return [Sale._meta.pk.get_db_prep_value(sale_id, connection) for sale_id in sale_ids]
+
+
+def _details_for(sale_ids, sources):
+    sale_ids = _db_ids(sale_ids)
+    details = {}
+    for source in sources:
+        rows = SaleDetail.objects.raw(
+            f"SELECT * FROM {_quote(source)} WHERE sale_id IN ({_in_clause(sale_ids)})", sale_ids
+        )
+        for detail in rows:
+            details.setdefault(detail.sale_id, []).append(detail)
+    return details
+
+
+def _archive_chunk(*, sales, detail_sources, output, archive_name, delete_sales):
+    sale_ids = [sale.id for sale in sales]
+    details = _details_for(sale_ids, detail_sources)
+
+    index = []
+    for sale in sales:
+        document = {
+            "sale": _to_document(sale),
+            "details": [_to_document(detail) for detail in details.get(sale.id, [])],
+        }
+        member = gzip.compress(json.dumps(document, cls=DjangoJSONEncoder).encode() + b"\n")
+        index.append(ArchivedSale(
+            shop_id=sale.shop_id, sale_id=sale.id, sale_created_at=sale.created_at,
+            archive_name=archive_name, offset=output.tell(), length=len(member),
+        ))
+        output.write(member)
+    ArchivedSale.objects.bulk_create(index)
+
+    sale_ids = _db_ids(sale_ids)
+    with connection.cursor() as cursor:
+        # Lignes restées dans les tables vivantes (ligne écrite juste après minuit le dernier jour du mois).
+        cursor.execute(
+            f"DELETE FROM {_quote(SALE_DETAIL_TABLE)} WHERE sale_id IN ({_in_clause(sale_ids)})", sale_ids
+        )
+        if delete_sales:
+            cursor.execute(f"DELETE FROM {_quote(SALE_TABLE)} WHERE id IN ({_in_clause(sale_ids)})", sale_ids)
+
+
+def archive_month(*, month, archive_root=None, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+        Archive les ventes du mois (UTC) et les retire des tables vivantes, en
+        une transaction : en cas d'erreur, rien n'est indexé ni supprimé (un
+        fichier orphelin peut rester, il est ignoré). Renvoie le nombre de
+        ventes archivées.
+    """
+    archive_root = archive_root or settings.SALES_ARCHIVE_ROOT
+    os.makedirs(archive_root, exist_ok=True)
+    archive_name = f"sales-{month:%Y-%m}-{datetime.datetime.now():%Y%m%d%H%M%S}.ndjson.gz"
+    path = os.path.join(archive_root, archive_name)
+    start, end = month_bounds(month)
+
+    archived = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            partitioned = is_partitioned(cursor, SALE_TABLE)
+            sale_partition = detach_month_partition(cursor, SALE_TABLE, month) if partitioned else None
+            detail_partition = detach_month_partition(cursor, SALE_DETAIL_TABLE, month) if partitioned else None
+
+        sale_source = sale_partition or SALE_TABLE
+        detail_sources = [detail_partition, SALE_DETAIL_TABLE] if detail_partition else [SALE_DETAIL_TABLE]
+        sales = Sale.objects.raw(
+            f"SELECT * FROM {_quote(sale_source)} WHERE created_at >= %s AND created_at < %s ORDER BY created_at",
+            [start, end],
+        )
+
+        with open(f"{path}.tmp", "wb") as output:
+            chunk = []
+            for sale in sales.iterator():
+                chunk.append(sale)
+                if len(chunk) == chunk_size:
+                    _archive_chunk(sales=chunk, detail_sources=detail_sources, output=output,
+                                   archive_name=archive_name, delete_sales=sale_partition is None)
+                    archived += len(chunk)
+                    chunk = []
+            if chunk:
+                _archive_chunk(sales=chunk, detail_sources=detail_sources, output=output,
+                               archive_name=archive_name, delete_sales=sale_partition is None)
+                archived += len(chunk)
+            output.flush()
+            os.fsync(output.fileno())
+
+        with connection.cursor() as cursor:
+            for partition in (sale_partition, detail_partition):
+                if partition:
+                    cursor.execute(f"DROP TABLE {_quote(partition)}")
+
+        if archived:
+            os.replace(f"{path}.tmp", path)
+        else:
+            os.remove(f"{path}.tmp")
+    return archived
+
+
+def archivable_months(*, older_than_months):
+    """Mois (UTC) entièrement antérieurs à la limite et contenant encore des ventes, du plus ancien au plus récent."""
+    cutoff = add_months(month_start(datetime.datetime.now(datetime.timezone.utc)), -older_than_months)
+    oldest = Sale.objects.order_by("created_at").values_list("created_at", flat=True).first()
+    if oldest is None:
+        return []
+    month = month_start(oldest.astimezone(datetime.timezone.utc))
+    months = []
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def load_archived_sale(*, shop, sale_id, archive_root=None):
+    """
+        Vente archivée reconstruite en mémoire (non enregistrable), lignes et
+        articles préchargés, ou None. Sert la consultation et la réimpression
+        des anciens tickets par SaleViewSet.
+    """
+    try:
+        sale_id = uuid.UUID(str(sale_id))
+    except ValueError:
+        return None
+    entry = ArchivedSale.objects.filter(shop=shop, sale_id=sale_id).first()
+    if entry is None:
+        return None
+
+    path = os.path.join(archive_root or settings.SALES_ARCHIVE_ROOT, entry.archive_name)
+    with open(path, "rb") as archive:
+        archive.seek(entry.offset)
+        document = json.loads(gzip.decompress(archive.read(entry.length)))
+
+    sale = _from_document(Sale, document["sale"])
+    details = [_from_document(SaleDetail, detail) for detail in document["details"]]
+
+    # Client, caissier ou article supprimés depuis : la référence est simplement perdue.
+    if sale.customer_id and not Customer.objects.filter(id=sale.customer_id).exists():
+        sale.customer_id = None
+    if sale.employee_id and not Employee.objects.filter(id=sale.employee_id).exists():
+        sale.employee_id = None
+    known_items = Item.objects.filter(id__in=[d.item_id for d in details if d.item_id]).values_list("id", flat=True)
+    known_items = set(known_items)
+    for detail in details:
+        if detail.item_id not in known_items:
+            detail.item_id = None
+        detail.sale = sale
+
+    prefetch_related_objects(details, "item")
+    # Même forme que le cache de prefetch_related : sale.saledetail_set.all() ne requête pas la base.
+    prefetched = SaleDetail.objects.none()
+    prefetched._result_cache = details
+    prefetched._prefetch_done = True
+    sale._prefetched_objects_cache = {"saledetail_set": prefetched}
+    return sale
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sales.archive import archivable_months, archive_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive sur disque (SALES_ARCHIVE_ROOT) les ventes des mois plus anciens que --older-than "
+        "et les retire des tables vivantes ; les tickets restent consultables et réimprimables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=settings.SALES_ARCHIVE_AFTER_MONTHS,
+                            help="Âge minimal, en mois révolus.")
+
+    def handle(self, *args, **options):
+        total = 0
+        for month in archivable_months(older_than_months=options["older_than"]):
+            archived = archive_month(month=month)
+            total += archived
+            if archived:
+                self.stdout.write(f"{month:%Y-%m} : {archived} vente(s) archivée(s).")
+        self.stdout.write(self.style.SUCCESS(f"{total} vente(s) archivée(s)."))
@@ -0,0 +1,139 @@
+import time
+import uuid
+import random
+import threading
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from catalog.services import quick_create_item
+
+from sales.services import create_sale
+
+from tenants.models import RoleChoices
+from tenants.services import add_employee, register_merchant
+
+User = get_user_model()
+
+MODES = {"locked": False, "optimistic": True}
+MODE_LABELS = {"locked": "verrouillé", "optimistic": "optimiste"}
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit de create_sale (ventes/s) avec N caisses en parallèle, en décrémentation "
+        "verrouillée (SELECT ... FOR UPDATE) puis optimiste, sur une boutique jetable créée pour "
+        "l'occasion dans la base configurée puis supprimée. À lancer sur PostgreSQL : SQLite "
+        "sérialise les écritures et ne dit rien de la contention sur les lignes d'articles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tills", type=int, default=8, help="Caisses (threads) en parallèle.")
+        parser.add_argument("--sales", type=int, default=200, help="Ventes par caisse et par mode.")
+        parser.add_argument("--items", type=int, default=20,
+                            help="Articles du catalogue ; moins il y en a, plus les caisses se les disputent.")
+        parser.add_argument("--cart-size", type=int, default=3, help="Articles par vente.")
+        parser.add_argument("--mode", choices=[*MODES, "both"], default="both")
+        parser.add_argument("--keep", action="store_true", help="Conserver la boutique de test.")
+
+    def handle(self, *args, **options):
+        cart_size = min(options["cart_size"], options["items"])
+        modes = list(MODES) if options["mode"] == "both" else [options["mode"]]
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+
+        user, _, shop = register_merchant(
+            username=prefix, password=None, company_name="Benchmark", shop_name=prefix,
+        )
+        try:
+            stock = options["tills"] * options["sales"] * len(modes)
+            items = [
+                quick_create_item(shop=shop, name=f"Article {index}", price=Decimal("100"), quantity=stock)
+                for index in range(options["items"])
+            ]
+            tills = [
+                add_employee(shop=shop, username=f"{prefix}-till-{index}", password=None, role=RoleChoices.CASHIER)
+                for index in range(options["tills"])
+            ]
+            results = {
+                mode: self._run(shop=shop, items=items, tills=tills, sales=options["sales"],
+                                cart_size=cart_size, optimistic_stock=MODES[mode])
+                for mode in modes
+            }
+        finally:
+            if not options["keep"]:
+                User.objects.filter(username__startswith=prefix).delete()
+
+        self.stdout.write(
+            f"{connection.vendor}, {options['tills']} caisse(s), {options['items']} article(s), "
+            f"{cart_size} article(s) par vente"
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{MODE_LABELS[mode]:>11} : {result['ok']} vente(s) en {result['elapsed']:.2f} s — "
+                f"{result['rate']:.1f} ventes/s (p50 {result['p50']:.1f} ms, p95 {result['p95']:.1f} ms, "
+                f"{result['failed']} échec(s))"
+            )
+        if len(results) == 2 and results["locked"]["rate"]:
+            ratio = results["optimistic"]["rate"] / results["locked"]["rate"]
+            self.stdout.write(self.style.SUCCESS(f"optimiste / verrouillé : x{ratio:.2f}"))
+
+    def _run(self, *, shop, items, tills, sales, cart_size, optimistic_stock):
+        start = threading.Barrier(len(tills) + 1)
+        lock = threading.Lock()
+        latencies, failures = [], []
+
+        def till(employee):
+            rng = random.Random(employee.id.int)
+            own_latencies, own_failures = [], 0
+            try:
+                start.wait()
+                for _ in range(sales):
+                    cart = rng.sample(items, cart_size)
+                    total = Decimal("100") * cart_size
+                    began = time.perf_counter()
+                    try:
+                        create_sale(
+                            shop=shop, customer=None, employee=employee, optimistic_stock=optimistic_stock,
+                            items_data=[
+                                {"item_id": item.id, "price": Decimal("100"), "quantity": 1, "total_item": Decimal("100")}
+                                for item in cart
+                            ],
+                            payment_data={
+                                "sub_total": total, "grand_total": total,
+                                "amount_paid": total, "cash_payment_amount": total,
+                            },
+                        )
+                    except (ValueError, DatabaseError):
+                        own_failures += 1
+                    else:
+                        own_latencies.append((time.perf_counter() - began) * 1000)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(own_latencies)
+                    failures.append(own_failures)
+
+        threads = [threading.Thread(target=till, args=(employee,)) for employee in tills]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        return {
+            "ok": len(latencies),
+            "failed": sum(failures),
+            "elapsed": elapsed,
+            "rate": len(latencies) / elapsed if elapsed else 0,
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+        }
@@ -0,0 +1,27 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.partitioning import add_months, count_orphan_sale_details, create_future_partitions
+from sales.partitioning import month_bounds, month_start
+
+
+class Command(BaseCommand):
+    help = "Crée les partitions de ventes des mois à venir (tâche planifiée, au moins mensuelle)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=settings.SALES_PARTITION_MONTHS_AHEAD)
+
+    def handle(self, *args, **options):
+        try:
+            created = create_future_partitions(months_ahead=options["months_ahead"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partition(s) créée(s)."))
+
+        # Pas de clé étrangère sale_details -> sales_sale sur les tables partitionnées : contrôle du mois passé et du mois courant.
+        previous_month = add_months(month_start(datetime.datetime.now(datetime.timezone.utc)), -1)
+        orphans = count_orphan_sale_details(since=month_bounds(previous_month)[0])
+        if orphans:
+            self.stderr.write(self.style.WARNING(f"{orphans} ligne(s) de vente sans vente depuis le {previous_month:%Y-%m-%d}."))
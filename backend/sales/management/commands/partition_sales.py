@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.partitioning import enable_partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Convertit les tables de ventes en tables partitionnées par mois (PostgreSQL). "
+        "Opération unique, à lancer dans une fenêtre de maintenance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=settings.SALES_PARTITION_MONTHS_AHEAD)
+
+    def handle(self, *args, **options):
+        try:
+            months = enable_partitioning(months_ahead=options["months_ahead"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Ventes partitionnées : {len(months)} mois, de {months[0]:%Y-%m} à {months[-1]:%Y-%m}."
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tenants.models import Shop
+
+from sales.receipts import prune_shop_receipts, receipt_settings_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime du stockage \"receipts\" les PDF rendus avec d'anciens paramètres de boutique "
+        "(nom, coordonnées, logo…). Ils ne sont plus servis ; à planifier chaque nuit."
+    )
+
+    def handle(self, *args, **options):
+        total = 0
+        for shop in Shop.objects.filter(settings__isnull=False).select_related("settings").iterator():
+            version = receipt_settings_version(shop=shop, shop_settings=shop.settings)
+            total += prune_shop_receipts(shop=shop, keep_version=version)
+        self.stdout.write(self.style.SUCCESS(f"{total} reçu(s) périmé(s) supprimé(s)."))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.17 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+        ('tenants', '0002_shopsettings_optimistic_stock_decrement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.UniqueConstraint(fields=('shop', 'idempotency_key'), name='unique_sale_idempotency_key_per_shop'),
+        ),
+    ]
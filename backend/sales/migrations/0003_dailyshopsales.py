@@ -0,0 +1,69 @@
+# Generated by Django 5.2.17 on 2026-10-18 11:47
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_sales(apps, schema_editor):
+    Sale = apps.get_model('sales', 'Sale')
+    DailyShopSales = apps.get_model('sales', 'DailyShopSales')
+
+    payment_mode = Case(
+        When(Q(total_mobile_money__gt=0) & Q(cash_payment_amount__gt=0), then=Value('MIXED')),
+        When(total_mobile_money__gt=0, then=Value('MOBILE_MONEY')),
+        default=Value('CASH'),
+    )
+    rows = (
+        Sale.objects.annotate(day=TruncDate('created_at'), payment_mode=payment_mode)
+        .values('shop_id', 'day', 'payment_mode')
+        .annotate(
+            sale_count=Count('id'),
+            sub_total=Sum('sub_total', output_field=DecimalField()),
+            tax_amount=Sum('tax_amount', output_field=DecimalField()),
+            grand_total=Sum('grand_total', output_field=DecimalField()),
+            total_mobile_money=Sum('total_mobile_money', output_field=DecimalField()),
+            cash_payment_amount=Sum('cash_payment_amount', output_field=DecimalField()),
+            amount_change=Sum('amount_change', output_field=DecimalField()),
+        )
+        .order_by()
+    )
+    DailyShopSales.objects.bulk_create([DailyShopSales(**row) for row in rows.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_sale_idempotency_key'),
+        ('tenants', '0002_shopsettings_optimistic_stock_decrement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyShopSales',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('payment_mode', models.CharField(choices=[('CASH', 'Cash'), ('MOBILE_MONEY', 'Mobile Money'), ('MIXED', 'Mixed')], max_length=20)),
+                ('sale_count', models.PositiveIntegerField(default=0)),
+                ('sub_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('grand_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_mobile_money', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash_payment_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('amount_change', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='tenants.shop')),
+            ],
+            options={
+                'verbose_name': 'Daily Shop Sales',
+                'verbose_name_plural': 'Daily Shop Sales',
+                'db_table': 'daily_shop_sales',
+                'constraints': [models.UniqueConstraint(fields=('shop', 'day', 'payment_mode'), name='unique_daily_sales_per_shop_day_mode')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.17 on 2026-10-18 11:54
+
+import zoneinfo
+
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+
+def rebuild_daily_sales(apps, schema_editor):
+    """Les cumuls étaient découpés en jours UTC : on les recalcule en jours locaux de chaque boutique."""
+    Shop = apps.get_model('tenants', 'Shop')
+    Sale = apps.get_model('sales', 'Sale')
+    DailyShopSales = apps.get_model('sales', 'DailyShopSales')
+
+    payment_mode = Case(
+        When(Q(total_mobile_money__gt=0) & Q(cash_payment_amount__gt=0), then=Value('MIXED')),
+        When(total_mobile_money__gt=0, then=Value('MOBILE_MONEY')),
+        default=Value('CASH'),
+    )
+    DailyShopSales.objects.all().delete()
+    for shop_id, shop_timezone in Shop.objects.values_list('id', 'timezone').iterator():
+        rows = (
+            Sale.objects.filter(shop_id=shop_id)
+            .annotate(day=TruncDate('created_at', tzinfo=zoneinfo.ZoneInfo(shop_timezone)), payment_mode=payment_mode)
+            .values('shop_id', 'day', 'payment_mode')
+            .annotate(
+                sale_count=Count('id'),
+                sub_total=Sum('sub_total', output_field=DecimalField()),
+                tax_amount=Sum('tax_amount', output_field=DecimalField()),
+                grand_total=Sum('grand_total', output_field=DecimalField()),
+                total_mobile_money=Sum('total_mobile_money', output_field=DecimalField()),
+                cash_payment_amount=Sum('cash_payment_amount', output_field=DecimalField()),
+                amount_change=Sum('amount_change', output_field=DecimalField()),
+            )
+            .order_by()
+        )
+        DailyShopSales.objects.bulk_create([DailyShopSales(**row) for row in rows.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_initial'),
+        ('sales', '0003_dailyshopsales'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['shop', 'created_at'], name='sale_shop_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saledetail',
+            index=models.Index(fields=['shop', 'created_at'], name='sale_detail_shop_created_idx'),
+        ),
+        migrations.RunPython(rebuild_daily_sales, migrations.RunPython.noop),
+    ]
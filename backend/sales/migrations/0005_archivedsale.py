@@ -0,0 +1,35 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_shop_local_days'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sale_id', models.UUIDField(unique=True)),
+                ('sale_created_at', models.DateTimeField()),
+                ('archive_name', models.CharField(max_length=255)),
+                ('offset', models.BigIntegerField()),
+                ('length', models.PositiveIntegerField()),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='tenants.shop')),
+            ],
+            options={
+                'verbose_name': 'Archived Sale',
+                'verbose_name_plural': 'Archived Sales',
+                'db_table': 'archived_sales',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_archivedsale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyshopsales',
+            name='cost_of_goods',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='cost_of_goods',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='saledetail',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True),
+        ),
+    ]
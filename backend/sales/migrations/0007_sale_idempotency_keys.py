@@ -0,0 +1,57 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:36
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def copy_sale_keys(apps, schema_editor):
+    Sale = apps.get_model('sales', 'Sale')
+    SaleIdempotencyKey = apps.get_model('sales', 'SaleIdempotencyKey')
+    batch = []
+    sales = Sale.objects.exclude(idempotency_key=None).order_by('created_at').values_list('id', 'shop_id', 'idempotency_key')
+    for sale_id, shop_id, key in sales.iterator(2000):
+        batch.append(SaleIdempotencyKey(shop_id=shop_id, key=key, sale_id=sale_id))
+        if len(batch) == 2000:
+            SaleIdempotencyKey.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    # ignore_conflicts : sur une table déjà partitionnée, l'ancienne contrainte élargie a pu laisser des doublons.
+    SaleIdempotencyKey.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_cost_of_goods'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleIdempotencyKey',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('key', models.CharField(max_length=64)),
+                ('sale_id', models.UUIDField()),
+            ],
+            options={
+                'db_table': 'sale_idempotency_keys',
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='sale',
+            name='unique_sale_idempotency_key_per_shop',
+        ),
+        migrations.AddField(
+            model_name='saleidempotencykey',
+            name='shop',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='tenants.shop'),
+        ),
+        migrations.AddConstraint(
+            model_name='saleidempotencykey',
+            constraint=models.UniqueConstraint(fields=('shop', 'key'), name='unique_sale_key_per_shop'),
+        ),
+        migrations.RunPython(copy_sale_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.17 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0007_sale_idempotency_keys'),
+        ('tenants', '0003_shop_timezone'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailyshopsales',
+            name='unique_daily_sales_per_shop_day_mode',
+        ),
+        migrations.AddField(
+            model_name='dailyshopsales',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyshopsales',
+            constraint=models.UniqueConstraint(fields=('shop', 'day', 'payment_mode', 'shard'), name='unique_daily_sales_per_shop_day_mode_shard'),
+        ),
+    ]
@@ -57,11 +57,18 @@ class Sale(ShopScopedModel):
     cash_payment_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     mobile_money_covers_total = models.BooleanField(default=False)
     has_sav = models.BooleanField(default=False)
+    # Coût d'achat des articles vendus (coût moyen pondéré au moment de la vente).
+    cost_of_goods = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Clé générée par la caisse ; son unicité est portée par SaleIdempotencyKey.
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
 
     class Meta:
 
         verbose_name = "Sale"
         verbose_name_plural = "Sales"
+        indexes = [
+            models.Index(fields=['shop', 'created_at'], name='sale_shop_created_idx'),
+        ]
 
     def sum_products(self):
         return sum(d.quantity for d in self.saledetail_set.all())
@@ -74,17 +81,102 @@ class Sale(ShopScopedModel):
         )
 
 
+class SaleIdempotencyKey(ShopScopedModel):
+    """
+        Clés d'idempotence des ventes synchronisées hors ligne : rejouer une
+        vente ne crée pas de doublon. Table à part, jamais partitionnée,
+        écrite dans la transaction de la vente : l'unicité (shop, key) tient
+        même quand sales_sale est partitionnée (voir sales.partitioning).
+        sale_id sans clé étrangère, pour la même raison.
+    """
+    key = models.CharField(max_length=64)
+    sale_id = models.UUIDField()
+
+    class Meta:
+        db_table = "sale_idempotency_keys"
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'key'], name='unique_sale_key_per_shop'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} -> {self.sale_id}"
+
+
 class SaleDetail(ShopScopedModel):
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name="saledetail_set")
     item = models.ForeignKey(Item, on_delete=models.SET_NULL, blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField()
     total_detail = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=4, blank=True, null=True)
 
     class Meta:
         db_table = "sale_details"
         verbose_name = "Sale Detail"
         verbose_name_plural = "Sale Details"
+        indexes = [
+            models.Index(fields=['shop', 'created_at'], name='sale_detail_shop_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Detail ID: {self.id} | Sale ID: {self.sale.id} | Quantity: {self.quantity}"
+
+
+class PaymentModeChoices(models.TextChoices):
+    CASH = 'CASH'
+    MOBILE_MONEY = 'MOBILE_MONEY'
+    MIXED = 'MIXED'
+
+
+class DailyShopSales(ShopScopedModel):
+    """
+        Cumul des ventes d'une boutique par jour local et par mode de paiement.
+        Incrémenté par sales.services.create_sale dans la même transaction que
+        la vente : le tableau de bord lit quelques lignes au lieu de toutes les ventes.
+        Chaque (boutique, jour, mode) est réparti sur plusieurs lignes (shard,
+        une par caisse en pratique) que les lectures additionnent : deux
+        caisses n'attendent pas le verrou de la même ligne jusqu'au commit.
+    """
+    day = models.DateField()
+    payment_mode = models.CharField(max_length=20, choices=PaymentModeChoices.choices)
+    shard = models.PositiveSmallIntegerField(default=0)
+    sale_count = models.PositiveIntegerField(default=0)
+    sub_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    grand_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_mobile_money = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cash_payment_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    amount_change = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost_of_goods = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "daily_shop_sales"
+        verbose_name = "Daily Shop Sales"
+        verbose_name_plural = "Daily Shop Sales"
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'day', 'payment_mode', 'shard'], name='unique_daily_sales_per_shop_day_mode_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.shop_id} | {self.day} | {self.payment_mode} | {self.grand_total}"
+
+
+class ArchivedSale(ShopScopedModel):
+    """
+        Index des ventes sorties des tables vivantes par `archive_sales`.
+        Chaque vente est un membre gzip autonome du fichier d'archive du mois :
+        offset/length permettent de relire un ticket sans décompresser le reste.
+    """
+    sale_id = models.UUIDField(unique=True)
+    sale_created_at = models.DateTimeField()
+    archive_name = models.CharField(max_length=255)
+    offset = models.BigIntegerField()
+    length = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = "archived_sales"
+        verbose_name = "Archived Sale"
+        verbose_name_plural = "Archived Sales"
 
     def __str__(self):
-        return f"Detail ID: {self.id} | Sale ID: {self.sale.id} | Quantity: {self.quantity}"
\ No newline at end of file
+        return f"{self.sale_id} ({self.archive_name})"
@@ -0,0 +1,266 @@
+"""
+    Partitionnement mensuel (PostgreSQL, RANGE sur created_at) des tables
+    sales_sale et sale_details. Optionnel : activé une fois par
+    `manage.py partition_sales`, entretenu par `create_sale_partitions`.
+
+    Contraintes du partitionnement déclaratif :
+    - la clé primaire devient (id, created_at). Aucune autre contrainte
+      d'unicité n'est élargie à created_at, ce qui la viderait de son sens :
+      la conversion est refusée s'il en reste une. L'unicité des clés
+      d'idempotence est portée par la table non partitionnée
+      sale_idempotency_keys (SaleIdempotencyKey) ;
+    - la clé étrangère sale_details.sale_id -> sales_sale est supprimée (une
+      clé étrangère vers une table partitionnée devrait inclure created_at).
+      Ce qui la remplace : create_sale écrit la vente et ses lignes dans la
+      même transaction ; la suppression d'une vente passe par l'ORM, dont le
+      CASCADE est émulé par Django ; l'archivage supprime les lignes avec
+      leur vente. `create_sale_partitions` signale les lignes orphelines des
+      derniers mois (count_orphan_sale_details), qui ne devraient jamais
+      apparaître.
+
+    Les bornes des partitions sont des mois UTC. Une partition DEFAULT reçoit
+    les lignes d'un mois sans partition (tâche planifiée en retard) plutôt
+    que de faire échouer l'encaissement ; elles sont déplacées dans leur
+    partition dès que celle-ci est créée.
+"""
+import re
+import datetime
+
+from django.db import connection, transaction
+
+SALE_TABLE = "sales_sale"
+SALE_DETAIL_TABLE = "sale_details"
+PARTITIONED_TABLES = (SALE_TABLE, SALE_DETAIL_TABLE)
+PARTITION_KEY = "created_at"
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(first, last):
+    return (last.year - first.year) * 12 + last.month - first.month
+
+
+def month_bounds(month):
+    """Bornes UTC [début, fin[ du mois."""
+    start = datetime.datetime.combine(month, datetime.time.min, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime.combine(add_months(month, 1), datetime.time.min, tzinfo=datetime.timezone.utc)
+    return start, end
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table):
+    return f"{table}_default"
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned(cursor, table=SALE_TABLE):
+    if connection.vendor != "postgresql":
+        return False
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+    return cursor.fetchone() is not None
+
+
+def table_exists(cursor, table):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+    return cursor.fetchone()[0]
+
+
+def list_partitions(cursor, table):
+    """[(nom, bornes)] des partitions attachées, triées par nom."""
+    cursor.execute(
+        """
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        ORDER BY child.relname
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _create_partition(cursor, table, month):
+    start, end = month_bounds(month)
+    cursor.execute(
+        f"CREATE TABLE {_quote(partition_name(table, month))} PARTITION OF {_quote(table)} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [start, end],
+    )
+
+
+def ensure_month_partition(cursor, table, month):
+    """
+        Crée la partition du mois si besoin. Si la partition DEFAULT contient
+        déjà des lignes de ce mois, elle est détachée le temps de les déplacer :
+        PostgreSQL refuse sinon la nouvelle partition.
+        Renvoie True si la partition a été créée.
+    """
+    if table_exists(cursor, partition_name(table, month)):
+        return False
+
+    default = default_partition_name(table)
+    start, end = month_bounds(month)
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {_quote(default)} WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s)",
+        [start, end],
+    )
+    if not cursor.fetchone()[0]:
+        _create_partition(cursor, table, month)
+        return True
+
+    cursor.execute(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(default)}")
+    _create_partition(cursor, table, month)
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {_quote(default)} WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s "
+        f"RETURNING *) INSERT INTO {_quote(table)} SELECT * FROM moved",
+        [start, end],
+    )
+    cursor.execute(f"ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(default)} DEFAULT")
+    return True
+
+
+def detach_month_partition(cursor, table, month):
+    """Détache la partition du mois ; renvoie son nom, ou None si elle n'existe pas."""
+    name = partition_name(table, month)
+    if not table_exists(cursor, name):
+        return None
+    cursor.execute(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}")
+    return name
+
+
+def _table_definitions(cursor, table):
+    cursor.execute(
+        """
+        SELECT conname, contype, pg_get_constraintdef(oid)
+        FROM pg_constraint WHERE conrelid = to_regclass(%s) ORDER BY contype
+        """,
+        [table],
+    )
+    constraints = cursor.fetchall()
+    # Index autonomes (hors index portés par une contrainte).
+    cursor.execute(
+        """
+        SELECT index_class.relname, pg_get_indexdef(pg_index.indexrelid)
+        FROM pg_index
+        JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE pg_constraint.conindid = pg_index.indexrelid)
+        """,
+        [table],
+    )
+    return constraints, cursor.fetchall()
+
+
+def _with_partition_key(definition):
+    """PRIMARY KEY (id) -> PRIMARY KEY (id, created_at) : obligatoire sur une table partitionnée."""
+    if re.search(rf"\b{PARTITION_KEY}\b", definition):
+        return definition
+    return re.sub(r"\(([^()]*)\)", rf"(\1, {PARTITION_KEY})", definition, count=1)
+
+
+def _partition_table(cursor, table, months):
+    legacy = f"{table}_legacy"
+    constraints, indexes = _table_definitions(cursor, table)
+    for name, kind, definition in constraints:
+        if kind == "u" and not re.search(rf"\b{PARTITION_KEY}\b", definition):
+            raise ValueError(f"{table} : la contrainte d'unicité {name} ne peut pas être partitionnée sans être affaiblie.")
+
+    cursor.execute(f"ALTER TABLE {_quote(table)} RENAME TO {_quote(legacy)}")
+    # Libère les noms d'index et de contraintes, qui seront recréés sur la table partitionnée.
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {_quote(name)}")
+    for name, _, _ in constraints:
+        cursor.execute(f"ALTER TABLE {_quote(legacy)} DROP CONSTRAINT {_quote(name)}")
+
+    cursor.execute(
+        f"CREATE TABLE {_quote(table)} (LIKE {_quote(legacy)} INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE ({PARTITION_KEY})"
+    )
+    for month in months:
+        _create_partition(cursor, table, month)
+    cursor.execute(f"CREATE TABLE {_quote(default_partition_name(table))} PARTITION OF {_quote(table)} DEFAULT")
+
+    for name, kind, definition in constraints:
+        if kind == "p":
+            definition = _with_partition_key(definition)
+        cursor.execute(f"ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(name)} {definition}")
+    for _, definition in indexes:
+        cursor.execute(definition)
+
+    cursor.execute(f"INSERT INTO {_quote(table)} SELECT * FROM {_quote(legacy)}")
+    cursor.execute(f"DROP TABLE {_quote(legacy)}")
+
+
+@transaction.atomic
+def enable_partitioning(*, months_ahead):
+    """
+        Convertit sales_sale et sale_details en tables partitionnées par mois,
+        en recopiant l'historique. À lancer dans une fenêtre de maintenance :
+        les deux tables sont verrouillées pendant la copie.
+    """
+    if connection.vendor != "postgresql":
+        raise ValueError("Le partitionnement des ventes nécessite PostgreSQL.")
+
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor, SALE_TABLE):
+            raise ValueError("Les tables de vente sont déjà partitionnées.")
+
+        cursor.execute(f"LOCK TABLE {_quote(SALE_TABLE)}, {_quote(SALE_DETAIL_TABLE)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT min({PARTITION_KEY}) FROM {_quote(SALE_TABLE)}")
+        oldest = cursor.fetchone()[0]
+        current = month_start(datetime.datetime.now(datetime.timezone.utc))
+        first = month_start(oldest.astimezone(datetime.timezone.utc)) if oldest else current
+        months = [add_months(first, index) for index in range(months_between(first, current) + months_ahead + 1)]
+
+        # Clés étrangères entrantes (sale_details.sale_id) : voir la docstring du module.
+        cursor.execute(
+            "SELECT conname, conrelid::regclass::text FROM pg_constraint WHERE confrelid = to_regclass(%s)",
+            [SALE_TABLE],
+        )
+        for name, referencing_table in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {_quote(referencing_table)} DROP CONSTRAINT {_quote(name)}")
+
+        for table in PARTITIONED_TABLES:
+            _partition_table(cursor, table, months)
+    return months
+
+
+@transaction.atomic
+def create_future_partitions(*, months_ahead):
+    """Crée les partitions du mois courant et des `months_ahead` suivants ; renvoie celles créées."""
+    created = []
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor, SALE_TABLE):
+            raise ValueError("Les tables de vente ne sont pas partitionnées (voir partition_sales).")
+        current = month_start(datetime.datetime.now(datetime.timezone.utc))
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            for table in PARTITIONED_TABLES:
+                if ensure_month_partition(cursor, table, month):
+                    created.append(partition_name(table, month))
+    return created
+
+
+def count_orphan_sale_details(*, since):
+    """Lignes de vente créées depuis `since` dont la vente n'existe plus (voir la docstring du module)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT count(*) FROM {_quote(SALE_DETAIL_TABLE)} detail WHERE detail.{PARTITION_KEY} >= %s "
+            f"AND NOT EXISTS (SELECT 1 FROM {_quote(SALE_TABLE)} sale WHERE sale.id = detail.sale_id)",
+            [since],
+        )
+        return cursor.fetchone()[0]
@@ -0,0 +1,137 @@
+"""
+    Rendu du reçu pour imprimantes thermiques (58/80 mm), sans HTML ni WeasyPrint.
+
+    Le contenu reprend celui de sales/receipt.html ligne à ligne. Une même liste
+    de lignes typées alimente les deux sorties : texte à chasse fixe et octets
+    ESC/POS envoyés tels quels à l'imprimante.
+"""
+import textwrap
+
+from django.utils import timezone
+
+from sales.templatetags.receipt_filters import currency_format
+
+# Nombre de caractères par ligne en police A selon la largeur du papier.
+PAPER_WIDTHS = {"58": 32, "80": 48}
+DEFAULT_PAPER = "80"
+
+ESC = b"\x1b"
+GS = b"\x1d"
+ESCPOS_INIT = ESC + b"@"
+ESCPOS_CODEPAGE_CP858 = ESC + b"t\x13"  # accents français + symbole euro
+ESCPOS_ALIGN = {"left": ESC + b"a\x00", "center": ESC + b"a\x01"}
+ESCPOS_BOLD_ON, ESCPOS_BOLD_OFF = ESC + b"E\x01", ESC + b"E\x00"
+ESCPOS_DOUBLE_HEIGHT_ON, ESCPOS_DOUBLE_HEIGHT_OFF = GS + b"!\x01", GS + b"!\x00"
+ESCPOS_FEED_AND_CUT = ESC + b"d\x04" + GS + b"V\x42\x00"
+
+
+class ReceiptLine:
+    __slots__ = ("text", "align", "bold", "title")
+
+    def __init__(self, text="", align="left", bold=False, title=False):
+        self.text = text
+        self.align = align
+        self.bold = bold
+        self.title = title
+
+
+def _columns(left, right, width):
+    """« Sous-total ........ 1 500 FCFA » : libellé à gauche, montant calé à droite."""
+    left = left[:max(width - len(right) - 1, 0)]
+    return f"{left}{' ' * (width - len(left) - len(right))}{right}"
+
+
+def receipt_lines(*, sale, shop, shop_settings, width):
+    separator = ReceiptLine("-" * width)
+    lines = [ReceiptLine(shop.name.upper(), align="center", bold=True, title=True)]
+    if shop.address:
+        lines.append(ReceiptLine(shop.address, align="center"))
+    if shop.phone_number:
+        lines.append(ReceiptLine(f"Tel: {shop.phone_number}", align="center"))
+    if shop_settings.tax_number:
+        lines.append(ReceiptLine(f"NIU: {shop_settings.tax_number}", align="center"))
+
+    lines += [
+        ReceiptLine(),
+        ReceiptLine(f"Date: {timezone.localtime(sale.created_at, shop.tzinfo):%Y/%m/%d %H:%M:%S}"),
+        ReceiptLine(f"Ticket: {sale.id}"),
+        separator,
+        ReceiptLine(_columns("ARTICLE", "TOTAL", width), bold=True),
+        separator,
+    ]
+
+    for detail in sale.saledetail_set.all():
+        name = detail.item.name if detail.item else ""
+        lines.append(ReceiptLine(name[:width]))
+        lines.append(ReceiptLine(_columns(
+            f"  {detail.quantity} x {currency_format(detail.price, False)}",
+            currency_format(detail.total_detail, False),
+            width,
+        )))
+
+    lines.append(separator)
+    lines.append(ReceiptLine(_columns("Sous-total", currency_format(sale.sub_total), width)))
+    if sale.tax_amount:
+        lines.append(ReceiptLine(_columns("Taxes", currency_format(sale.tax_amount), width)))
+    lines.append(ReceiptLine(_columns("Total", currency_format(sale.grand_total), width), bold=True))
+    lines.append(ReceiptLine(_columns("Montant payé", currency_format(sale.amount_paid), width)))
+    if sale.total_mobile_money:
+        lines.append(ReceiptLine(_columns("Mobile Money", currency_format(sale.total_mobile_money), width)))
+    if sale.cash_payment_amount:
+        lines.append(ReceiptLine(_columns("Espèces", currency_format(sale.cash_payment_amount), width)))
+    if sale.amount_change:
+        lines.append(ReceiptLine(_columns("Monnaie rendue", currency_format(sale.amount_change), width)))
+
+    customer = (
+        f"{sale.customer.first_name or ''} {sale.customer.last_name or ''}".strip()
+        if sale.customer else "Client de passage"
+    )
+    lines += [separator, ReceiptLine(f"Client: {customer}", align="center", bold=True), separator]
+
+    if sale.has_sav:
+        notice = "NB: Le service après-vente s'applique conformément aux conditions communiquées en boutique."
+        lines += [ReceiptLine(text) for text in textwrap.wrap(notice, width)]
+        if shop.phone_number:
+            lines += [ReceiptLine(text) for text in textwrap.wrap(f"Contact boutique: {shop.phone_number}", width)]
+        lines.append(separator)
+
+    lines += [
+        ReceiptLine(),
+        ReceiptLine("Votre satisfaction, notre priorité", align="center"),
+        ReceiptLine(),
+        ReceiptLine("Powered by Mouegne", align="center"),
+    ]
+    return lines
+
+
+def _wrap(line, width):
+    """Les lignes trop longues (nom de boutique, n° de ticket sur 58 mm...) passent à la ligne."""
+    return textwrap.wrap(line.text, width) or [""]
+
+
+def render_receipt_text(*, sale, shop, shop_settings, paper=DEFAULT_PAPER):
+    width = PAPER_WIDTHS[paper]
+    rendered = []
+    for line in receipt_lines(sale=sale, shop=shop, shop_settings=shop_settings, width=width):
+        for text in _wrap(line, width):
+            rendered.append(text.center(width).rstrip() if line.align == "center" else text)
+    return "\n".join(rendered) + "\n"
+
+
+def render_receipt_escpos(*, sale, shop, shop_settings, paper=DEFAULT_PAPER):
+    width = PAPER_WIDTHS[paper]
+    output = bytearray(ESCPOS_INIT + ESCPOS_CODEPAGE_CP858)
+    for line in receipt_lines(sale=sale, shop=shop, shop_settings=shop_settings, width=width):
+        output += ESCPOS_ALIGN[line.align]
+        if line.bold:
+            output += ESCPOS_BOLD_ON
+        if line.title:
+            output += ESCPOS_DOUBLE_HEIGHT_ON
+        for text in _wrap(line, width):
+            output += text.encode("cp858", errors="replace") + b"\n"
+        if line.title:
+            output += ESCPOS_DOUBLE_HEIGHT_OFF
+        if line.bold:
+            output += ESCPOS_BOLD_OFF
+    output += ESCPOS_ALIGN["left"] + ESCPOS_FEED_AND_CUT
+    return bytes(output)
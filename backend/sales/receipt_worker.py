@@ -0,0 +1,33 @@
+"""
+    Code exécuté par les processus du pool de rendu des reçus (voir sales.receipts).
+
+    Volontairement indépendant de Django : le processus reçoit du HTML déjà
+    rendu et renvoie les octets du PDF. WeasyPrint, la feuille de style du reçu
+    et la configuration des polices ne sont chargés qu'une fois par processus,
+    puis réutilisés pour tous les rendus suivants.
+"""
+from pathlib import Path
+
+RECEIPT_STYLESHEET = Path(__file__).resolve().parent / "templates" / "sales" / "receipt.css"
+
+_font_config = None
+_stylesheets = None
+
+
+def warm_up():
+    global _font_config, _stylesheets
+    if _stylesheets is not None:
+        return
+
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    _font_config = FontConfiguration()
+    _stylesheets = [CSS(filename=str(RECEIPT_STYLESHEET), font_config=_font_config)]
+
+
+def write_pdf(html_string):
+    from weasyprint import HTML
+
+    warm_up()
+    return HTML(string=html_string).write_pdf(stylesheets=_stylesheets, font_config=_font_config)
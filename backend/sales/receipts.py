@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import threading
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as RenderTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+
+from sales import receipt_worker
+from sales.models import Sale
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_TEMPLATE = "sales/receipt.html"
+
+# Pool propre à chaque processus gunicorn, créé au premier rendu (donc après le fork).
+_render_pool = None
+_render_lock = threading.Lock()
+_pending_renders = {}
+
+
+def get_receipt_storage():
+    return storages["receipts"]
+
+
+def receipt_settings_version(*, shop, shop_settings):
+    """
+        Empreinte des informations de la boutique imprimées sur le reçu.
+        Toute modification (nom, coordonnées, fuseau, NIU, logo) change la version,
+        donc la clé du PDF en cache et son ETag.
+    """
+    fingerprint = "|".join(str(value or "") for value in [
+        shop.name, shop.address, shop.phone_number, shop.timezone,
+        shop_settings.tax_number, shop_settings.logo.name,
+    ])
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def receipt_etag(*, sale, version):
+    return f'"{sale.id}-{version}"'
+
+
+def receipt_path(*, sale, version):
+    return f"{sale.shop_id}/{sale.id}-{version}.pdf"
+
+
+def render_receipt_html(*, sale, shop, shop_settings):
+    prefetch_related_objects([sale], "saledetail_set__item")
+    return render_to_string(RECEIPT_TEMPLATE, {
+        "sale": sale,
+        "shop": shop,
+        "shop_settings": shop_settings,
+    })
+
+
+def get_render_pool():
+    """
+        Processus de rendu de longue durée : WeasyPrint y est importé et la
+        feuille de style analysée une seule fois (receipt_worker.warm_up).
+        RECEIPT_RENDER_WORKERS = 0 désactive le pool (rendu dans la requête).
+    """
+    global _render_pool
+    if not settings.RECEIPT_RENDER_WORKERS:
+        return None
+
+    with _render_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=settings.RECEIPT_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=receipt_worker.warm_up,
+            )
+        return _render_pool
+
+
+def _reset_render_pool():
+    global _render_pool
+    with _render_lock:
+        _render_pool = None
+        _pending_renders.clear()
+
+
+def _store_rendered_receipt(path, future):
+    try:
+        if future.exception() is None:
+            storage = get_receipt_storage()
+            if not storage.exists(path):
+                storage.save(path, ContentFile(future.result()))
+        else:
+            logger.error("Échec du rendu du reçu %s", path, exc_info=future.exception())
+    finally:
+        with _render_lock:
+            _pending_renders.pop(path, None)
+
+
+def submit_receipt_render(*, sale, shop, shop_settings, version):
+    """
+        Lance le rendu du reçu dans le pool, ou renvoie le rendu déjà en cours
+        pour ce reçu. Le PDF est écrit dans le stockage dès qu'il est prêt.
+        Renvoie None si le pool est désactivé.
+    """
+    path = receipt_path(sale=sale, version=version)
+    with _render_lock:
+        future = _pending_renders.get(path)
+    if future is not None:
+        return future
+
+    pool = get_render_pool()
+    if pool is None:
+        return None
+
+    html_string = render_receipt_html(sale=sale, shop=shop, shop_settings=shop_settings)
+    with _render_lock:
+        future = _pending_renders.get(path)
+        if future is None:
+            future = pool.submit(receipt_worker.write_pdf, html_string)
+            _pending_renders[path] = future
+            future.add_done_callback(partial(_store_rendered_receipt, path))
+    return future
+
+
+def prerender_receipt(*, sale, shop, shop_settings):
+    """Appelée après le commit d'une vente : le reçu est prêt avant que la caisse ne le demande."""
+    version = receipt_settings_version(shop=shop, shop_settings=shop_settings)
+    try:
+        submit_receipt_render(sale=sale, shop=shop, shop_settings=shop_settings, version=version)
+    except BrokenProcessPool:
+        _reset_render_pool()
+        logger.exception("Pool de rendu des reçus indisponible, pré-rendu ignoré pour la vente %s", sale.id)
+    except Exception:
+        # Simple optimisation : la vente est déjà enregistrée, le reçu sera rendu à la demande.
+        logger.exception("Pré-rendu du reçu impossible pour la vente %s", sale.id)
+
+
+def prerender_receipts(*, sale_ids, shop, shop_settings):
+    """Pré-rendu des ventes synchronisées par lot (caisse hors ligne) : une requête pour toutes les ventes."""
+    sales = list(Sale.objects.filter(shop=shop, id__in=sale_ids).select_related("customer"))
+    prefetch_related_objects(sales, "saledetail_set__item")
+    for sale in sales:
+        prerender_receipt(sale=sale, shop=shop, shop_settings=shop_settings)
+
+
+def get_receipt_pdf(*, sale, shop, shop_settings, version):
+    """
+        Une vente est immuable : son reçu n'est rendu qu'une fois par version
+        des paramètres de la boutique, puis relu depuis le stockage "receipts".
+        Si le rendu est en cours (pré-rendu après la vente), on attend son résultat
+        plutôt que de rendre une seconde fois. Pool indisponible, trop lent
+        (RECEIPT_RENDER_TIMEOUT) ou en erreur : le reçu est rendu dans la requête.
+    """
+    storage = get_receipt_storage()
+    path = receipt_path(sale=sale, version=version)
+
+    if storage.exists(path):
+        with storage.open(path, "rb") as receipt_file:
+            return receipt_file.read()
+
+    try:
+        future = submit_receipt_render(sale=sale, shop=shop, shop_settings=shop_settings, version=version)
+        if future is not None:
+            return future.result(timeout=settings.RECEIPT_RENDER_TIMEOUT)
+    except BrokenProcessPool:
+        _reset_render_pool()
+        logger.exception("Pool de rendu des reçus indisponible, rendu dans la requête.")
+    except RenderTimeout:
+        logger.warning("Rendu du reçu %s trop long dans le pool, rendu dans la requête.", path)
+    except Exception:
+        # Erreur levée par le processus de rendu : on retente dans la requête plutôt que de renvoyer une 500.
+        logger.exception("Échec du rendu du reçu %s dans le pool, rendu dans la requête.", path)
+
+    pdf_bytes = receipt_worker.write_pdf(render_receipt_html(sale=sale, shop=shop, shop_settings=shop_settings))
+    if not storage.exists(path):
+        storage.save(path, ContentFile(pdf_bytes))
+    return pdf_bytes
+
+
+def prune_shop_receipts(*, shop, keep_version):
+    """
+        Supprime les reçus de la boutique rendus avec une autre version que
+        `keep_version`. Jamais servis (la version fait partie du chemin), ils
+        ne font qu'occuper le disque : voir la commande prune_receipts.
+        Renvoie le nombre de fichiers supprimés.
+    """
+    storage = get_receipt_storage()
+    directory = str(shop.id)
+    if not storage.exists(directory):
+        return 0
+
+    _, filenames = storage.listdir(directory)
+    deleted = 0
+    for filename in filenames:
+        if filename.endswith(f"-{keep_version}.pdf"):
+            continue
+        storage.delete(f"{directory}/{filename}")
+        deleted += 1
+    return deleted
@@ -0,0 +1,51 @@
+from django.http import Http404
+
+from rest_framework import renderers
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class ReceiptRenderer(renderers.BaseRenderer):
+    """
+        Le corps du reçu est produit par la vue ; seules les réponses d'erreur
+        DRF (404, 403...) passent réellement par le renderer, et sortent en JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return renderers.JSONRenderer().render(data)
+
+
+class PDFReceiptRenderer(ReceiptRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+
+
+class TextReceiptRenderer(ReceiptRenderer):
+    media_type = "text/plain"
+    format = "text"
+    charset = "utf-8"
+
+
+class EscPosReceiptRenderer(ReceiptRenderer):
+    media_type = "application/octet-stream"
+    format = "escpos"
+
+
+class ReceiptFormatNegotiation(DefaultContentNegotiation):
+    """
+        Le format du reçu se choisit uniquement via ?format= (PDF par défaut).
+        L'en-tête Accept est ignoré : axios envoie « application/json, text/plain »
+        par défaut, ce qui sélectionnerait la sortie texte.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        requested = format_suffix or request.query_params.get(self.settings.URL_FORMAT_OVERRIDE)
+        if not requested:
+            return renderers[0], renderers[0].media_type
+
+        for renderer in renderers:
+            if renderer.format == requested:
+                return renderer, renderer.media_type
+        raise Http404
@@ -0,0 +1,194 @@
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.core.cache import caches
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, Rank
+
+from core.filters import day_range
+
+from sales.models import DailyShopSales, PaymentModeChoices, Sale, SaleDetail
+from sales.services import ROLLUP_FIELDS
+
+TOP_ITEMS_ORDERINGS = {"quantity": "quantity", "revenue": "revenue"}
+
+
+def get_dashboard_kpis(*, shop, date_from, date_to):
+    """
+        Indicateurs du tableau de bord sur [date_from, date_to] (jours locaux inclus).
+        Une seule requête sur le cumul DailyShopSales : quelques lignes par jour
+        (mode de paiement × shard), quel que soit le nombre de tickets encaissés.
+    """
+    rows = DailyShopSales.objects.filter(shop=shop, day__gte=date_from, day__lte=date_to).values(
+        "day", "payment_mode", "sale_count", *ROLLUP_FIELDS
+    ).order_by("day")
+
+    def empty_totals():
+        return {"sale_count": 0, **{field: Decimal("0") for field in ROLLUP_FIELDS}}
+
+    totals = empty_totals()
+    by_payment_mode = {mode: {"payment_mode": mode, **empty_totals()} for mode in PaymentModeChoices.values}
+    by_day = {}
+
+    for row in rows:
+        day = by_day.setdefault(row["day"], {"day": row["day"], "sale_count": 0, "grand_total": Decimal("0")})
+        day["sale_count"] += row["sale_count"]
+        day["grand_total"] += row["grand_total"]
+        for bucket in (totals, by_payment_mode[row["payment_mode"]]):
+            bucket["sale_count"] += row["sale_count"]
+            for field in ROLLUP_FIELDS:
+                bucket[field] += row[field]
+
+    grand_total = totals["grand_total"]
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        **totals,
+        "average_ticket": grand_total / totals["sale_count"] if totals["sale_count"] else Decimal("0"),
+        "mobile_money_share": float(totals["total_mobile_money"] / grand_total) if grand_total else 0.0,
+        "by_payment_mode": list(by_payment_mode.values()),
+        "by_day": list(by_day.values()),
+    }
+
+
+def get_margin_report(*, shop, date_from, date_to):
+    """
+        Marge brute par jour local : chiffre d'affaires hors taxes (sub_total)
+        moins le coût des articles vendus, lus dans DailyShopSales — une requête
+        sur quelques lignes par jour. Les ventes antérieures au suivi du coût
+        moyen ont un coût nul.
+    """
+    rows = (
+        DailyShopSales.objects.filter(shop=shop, day__gte=date_from, day__lte=date_to)
+        .values("day")
+        .annotate(sale_count=Sum("sale_count"), revenue=Sum("sub_total"), cost_of_goods=Sum("cost_of_goods"))
+        .order_by("day")
+    )
+
+    def with_margin(row):
+        row["gross_margin"] = row["revenue"] - row["cost_of_goods"]
+        row["margin_rate"] = float(row["gross_margin"] / row["revenue"]) if row["revenue"] else 0.0
+        return row
+
+    days = [with_margin(row) for row in rows]
+    totals = with_margin({
+        field: sum((day[field] for day in days), Decimal("0"))
+        for field in ("revenue", "cost_of_goods")
+    })
+    totals["sale_count"] = sum(day["sale_count"] for day in days)
+    return {"date_from": date_from, "date_to": date_to, **totals, "by_day": days}
+
+
+def _live_token(shop, *, date_from, today):
+    """
+        Nombre de ventes d'hier et d'aujourd'hui dans la fenêtre, lu dans le
+        cumul (quelques lignes par jour) : une vente
+        n'étant jamais modifiée ni supprimée, il change à chaque nouvelle
+        vente. Hier compte aussi : une vente de 23 h 59 validée après minuit.
+        Rien n'est donc écrit dans le cache à l'encaissement.
+    """
+    since = max(date_from, today - datetime.timedelta(days=1))
+    total = DailyShopSales.objects.filter(shop=shop, day__gte=since).aggregate(count=Sum("sale_count"))["count"]
+    return total or 0
+
+
+def cached_report(name, *, shop, date_from, date_to, compute, **params):
+    """
+        Rapport mis en cache par boutique, fenêtre et paramètres. Une fenêtre
+        close (avant aujourd'hui, heure locale) ne peut plus changer : elle est
+        gardée longtemps. Une fenêtre qui inclut aujourd'hui est liée au
+        nombre de ventes du jour (_live_token).
+    """
+    today = timezone.localdate(timezone=shop.tzinfo)
+    suffix = ":".join(f"{key}={value}" for key, value in sorted(params.items()))
+    key = f"sales-reports:{shop.id}:{name}:{date_from}:{date_to}:{shop.timezone}:{suffix}"
+
+    if date_to < today:
+        timeout = settings.SALES_REPORT_CLOSED_CACHE_TTL
+    else:
+        key = f"{key}:{_live_token(shop, date_from=date_from, today=today)}"
+        timeout = settings.SALES_REPORT_LIVE_CACHE_TTL
+
+    cache = caches["reports"]
+    report = cache.get(key)
+    if report is None:
+        report = compute(shop=shop, date_from=date_from, date_to=date_to, **params)
+        cache.set(key, report, timeout)
+    return report
+
+
+def _window(queryset, *, shop, date_from, date_to):
+    start, end = day_range(date_from=date_from, date_to=date_to, tzinfo=shop.tzinfo)
+    return queryset.filter(shop=shop, created_at__gte=start, created_at__lt=end)
+
+
+def compute_top_items(*, shop, date_from, date_to, limit, order_by):
+    """
+        Articles les plus vendus : une agrégation GROUP BY article sur les
+        lignes de vente de la fenêtre, classées en base (RANK() OVER ...).
+        Les ex aequo partagent le même rang.
+    """
+    ordering = F(TOP_ITEMS_ORDERINGS[order_by]).desc()
+    rows = (
+        _window(SaleDetail.objects, shop=shop, date_from=date_from, date_to=date_to)
+        .filter(item__isnull=False)
+        .values("item_id", item_name=F("item__name"))
+        .annotate(
+            quantity=Sum("quantity"),
+            revenue=Sum("total_detail"),
+            sale_count=Count("sale_id", distinct=True),
+        )
+        .annotate(rank=Window(Rank(), order_by=ordering))
+        .order_by("rank", "item_name")[:limit]
+    )
+    return {"date_from": date_from, "date_to": date_to, "order_by": order_by, "items": list(rows)}
+
+
+def compute_hourly_heatmap(*, shop, date_from, date_to):
+    """Tickets et chiffre d'affaires par jour de semaine (1 = lundi) et heure locale."""
+    tzinfo = shop.tzinfo
+    rows = (
+        _window(Sale.objects, shop=shop, date_from=date_from, date_to=date_to)
+        .annotate(weekday=ExtractIsoWeekDay("created_at", tzinfo=tzinfo), hour=ExtractHour("created_at", tzinfo=tzinfo))
+        .values("weekday", "hour")
+        .annotate(sale_count=Count("id"), grand_total=Sum("grand_total"))
+        .order_by("weekday", "hour")
+    )
+    return {"date_from": date_from, "date_to": date_to, "cells": list(rows)}
+
+
+def compute_employee_totals(*, shop, date_from, date_to):
+    """Totaux encaissés par caissier ; employee_id vaut None pour les ventes sans caissier."""
+    rows = (
+        _window(Sale.objects, shop=shop, date_from=date_from, date_to=date_to)
+        .values("employee_id", username=F("employee__user__username"))
+        .annotate(
+            sale_count=Count("id"),
+            grand_total=Sum("grand_total"),
+            cash_payment_amount=Sum("cash_payment_amount"),
+            total_mobile_money=Sum("total_mobile_money"),
+            amount_change=Sum("amount_change"),
+        )
+        .order_by("-grand_total")
+    )
+    employees = list(rows)
+    for row in employees:
+        row["average_ticket"] = row["grand_total"] / row["sale_count"]
+    return {"date_from": date_from, "date_to": date_to, "employees": employees}
+
+
+def get_top_items(*, shop, date_from, date_to, limit=10, order_by="quantity"):
+    return cached_report(
+        "top-items", shop=shop, date_from=date_from, date_to=date_to,
+        compute=compute_top_items, limit=limit, order_by=order_by,
+    )
+
+
+def get_hourly_heatmap(*, shop, date_from, date_to):
+    return cached_report("hourly", shop=shop, date_from=date_from, date_to=date_to, compute=compute_hourly_heatmap)
+
+
+def get_employee_totals(*, shop, date_from, date_to):
+    return cached_report("employees", shop=shop, date_from=date_from, date_to=date_to, compute=compute_employee_totals)
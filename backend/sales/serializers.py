@@ -1,6 +1,9 @@
+from django.conf import settings
+from django.utils import timezone
+
 from rest_framework import serializers
 
-from sales.models import Customer, Sale, SaleDetail
+from sales.models import Customer, Sale, SaleDetail, PaymentModeChoices
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -37,6 +40,40 @@ class SaleCreateSerializer(serializers.Serializer):
     items = SaleItemInputSerializer(many=True, allow_empty=False)
 
 
+class SaleBatchEntrySerializer(SaleCreateSerializer):
+    """
+        Une vente saisie hors ligne : la clé d'idempotence, générée par la caisse, est obligatoire.
+        sold_at : heure de la vente à la caisse ; à défaut, l'heure de synchronisation.
+    """
+    idempotency_key = serializers.CharField(max_length=64)
+    sold_at = serializers.DateTimeField(required=False)
+
+    def validate_sold_at(self, value):
+        now = timezone.now()
+        if value > now + settings.OFFLINE_SALE_CLOCK_SKEW:
+            raise serializers.ValidationError("La date de vente est dans le futur : vérifiez l'horloge de la caisse.")
+        if value < now - settings.OFFLINE_SALE_MAX_AGE:
+            raise serializers.ValidationError(
+                f"Vente trop ancienne pour être synchronisée (plus de {settings.OFFLINE_SALE_MAX_AGE.days} jours)."
+            )
+        return min(value, now)
+
+
+class SaleBatchCreateSerializer(serializers.Serializer):
+    """
+        Enveloppe de la synchronisation hors ligne. Chaque vente est validée
+        individuellement dans la vue, pour qu'une entrée mal formée ne bloque pas le lot.
+    """
+    sales = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=500)
+
+
+class SaleBatchResultSerializer(serializers.Serializer):
+    idempotency_key = serializers.CharField(allow_null=True)
+    status = serializers.ChoiceField(choices=["created", "duplicate", "error"])
+    sale_id = serializers.UUIDField(allow_null=True)
+    error = serializers.JSONField(allow_null=True)
+
+
 class SaleDetailOutputSerializer(serializers.ModelSerializer):
     item_name = serializers.CharField(source="item.name", read_only=True, default=None)
 
@@ -59,3 +96,126 @@ class SaleSerializer(serializers.ModelSerializer):
             "amount_change", "total_mobile_money", "cash_payment_amount",
             "mobile_money_covers_total", "has_sav", "items",
         ]
+
+
+class DashboardKPIQuerySerializer(serializers.Serializer):
+    """Paramètres ?from=&to= (dates locales incluses) du tableau de bord."""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get("date_from") and attrs.get("date_to") and attrs["date_from"] > attrs["date_to"]:
+            raise serializers.ValidationError("La date de début doit précéder la date de fin.")
+        return attrs
+
+
+class SalesReportQuerySerializer(DashboardKPIQuerySerializer):
+    MAX_WINDOW_DAYS = 366
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs.get("date_from") and attrs.get("date_to"):
+            if (attrs["date_to"] - attrs["date_from"]).days >= self.MAX_WINDOW_DAYS:
+                raise serializers.ValidationError(f"La période ne peut pas dépasser {self.MAX_WINDOW_DAYS} jours.")
+        return attrs
+
+
+class TopItemsQuerySerializer(SalesReportQuerySerializer):
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=100)
+    order_by = serializers.ChoiceField(choices=["quantity", "revenue"], required=False, default="quantity")
+
+
+class SalesTotalsSerializer(serializers.Serializer):
+    sale_count = serializers.IntegerField()
+    sub_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    tax_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    grand_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total_mobile_money = serializers.DecimalField(max_digits=14, decimal_places=2)
+    cash_payment_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    amount_change = serializers.DecimalField(max_digits=14, decimal_places=2)
+    cost_of_goods = serializers.DecimalField(
+        max_digits=14, decimal_places=2, help_text="Coût d'achat des articles vendus (coût moyen pondéré)."
+    )
+
+
+class PaymentModeTotalsSerializer(SalesTotalsSerializer):
+    payment_mode = serializers.ChoiceField(choices=PaymentModeChoices.choices)
+
+
+class DayTotalsSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    sale_count = serializers.IntegerField()
+    grand_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class DashboardKPISerializer(SalesTotalsSerializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    average_ticket = serializers.DecimalField(max_digits=14, decimal_places=2)
+    mobile_money_share = serializers.FloatField(help_text="Part du chiffre d'affaires payée en Mobile Money (0 à 1).")
+    by_payment_mode = PaymentModeTotalsSerializer(many=True)
+    by_day = DayTotalsSerializer(many=True)
+
+
+class MarginTotalsSerializer(serializers.Serializer):
+    sale_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2, help_text="Chiffre d'affaires hors taxes.")
+    cost_of_goods = serializers.DecimalField(max_digits=14, decimal_places=2)
+    gross_margin = serializers.DecimalField(max_digits=14, decimal_places=2)
+    margin_rate = serializers.FloatField(help_text="Marge brute / chiffre d'affaires (0 à 1).")
+
+
+class DayMarginSerializer(MarginTotalsSerializer):
+    day = serializers.DateField()
+
+
+class MarginReportSerializer(MarginTotalsSerializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    by_day = DayMarginSerializer(many=True)
+
+
+class TopItemSerializer(serializers.Serializer):
+    rank = serializers.IntegerField()
+    item_id = serializers.UUIDField()
+    item_name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    sale_count = serializers.IntegerField()
+
+
+class TopItemsReportSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    order_by = serializers.CharField()
+    items = TopItemSerializer(many=True)
+
+
+class HourlyCellSerializer(serializers.Serializer):
+    weekday = serializers.IntegerField(help_text="Jour ISO : 1 = lundi, 7 = dimanche.")
+    hour = serializers.IntegerField(help_text="Heure locale de la boutique (0 à 23).")
+    sale_count = serializers.IntegerField()
+    grand_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class HourlyHeatmapSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    cells = HourlyCellSerializer(many=True)
+
+
+class EmployeeTotalsSerializer(serializers.Serializer):
+    employee_id = serializers.UUIDField(allow_null=True)
+    username = serializers.CharField(allow_null=True)
+    sale_count = serializers.IntegerField()
+    grand_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    cash_payment_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total_mobile_money = serializers.DecimalField(max_digits=14, decimal_places=2)
+    amount_change = serializers.DecimalField(max_digits=14, decimal_places=2)
+    average_ticket = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class EmployeeTotalsReportSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    employees = EmployeeTotalsSerializer(many=True)
@@ -1,12 +1,160 @@
-from django.db import transaction, models
+import uuid
+import random
+from decimal import Decimal
+from collections import defaultdict
+
+from django.utils import timezone
+from django.db import transaction, models, IntegrityError
+from django.db.models.functions import TruncDate
 
 from catalog.models import Item
 
-from sales.models import Sale, SaleDetail
+from inventory.ledger import record_movements
+from inventory.models import StockMovementKind
+
+from sales.models import Customer, DailyShopSales, PaymentModeChoices, Sale, SaleDetail, SaleIdempotencyKey
+
+
+PAYMENT_FIELDS = (
+    "sub_total", "grand_total", "tax_amount", "tax_percentage",
+    "amount_paid", "amount_change", "total_mobile_money",
+    "cash_payment_amount", "mobile_money_covers_total", "has_sav",
+)
+
+SALE_BATCH_CHUNK_SIZE = 50
+
+# Lignes de cumul par boutique, jour et mode de paiement (voir DailyShopSales).
+DAILY_SALES_SHARDS = 8
+
+# Montants d'une vente cumulés dans DailyShopSales.
+ROLLUP_FIELDS = (
+    "sub_total", "tax_amount", "grand_total", "total_mobile_money", "cash_payment_amount", "amount_change",
+    "cost_of_goods",
+)
+
+
+def _lock_cart_items(*, shop, quantities):
+    """
+        Verrouille en UNE requête tous les articles du panier, toujours dans
+        l'ordre des id : deux caisses qui vendent les mêmes articles prennent
+        les verrous dans le même ordre et ne peuvent donc pas s'interbloquer.
+    """
+    items = {
+        item.id: item
+        for item in Item.objects.select_for_update().filter(shop=shop, id__in=quantities).order_by("id")
+    }
+    if len(items) != len(quantities):
+        raise ValueError("Un ou plusieurs articles du panier sont introuvables dans cette boutique.")
+    return items
+
+
+def _decrement_stock_optimistic(*, shop, quantities, allow_zero_stock):
+    """
+        Décrémentation sans SELECT ... FOR UPDATE : un UPDATE conditionnel par
+        article (quantity >= n), toujours dans l'ordre des id. Zéro ligne
+        modifiée signifie stock insuffisant (ou article inconnu) ; l'exception
+        annule toute la vente via la transaction englobante.
+    """
+    for item_id in sorted(quantities):
+        quantity = quantities[item_id]
+        queryset = Item.objects.filter(id=item_id, shop=shop)
+        if not allow_zero_stock:
+            queryset = queryset.filter(quantity__gte=quantity)
+
+        # updated_at : auto_now ne s'applique pas à update(), la synchro du catalogue en dépend.
+        if not queryset.update(quantity=models.F("quantity") - quantity, updated_at=timezone.now()):
+            name = Item.objects.filter(id=item_id, shop=shop).values_list("name", flat=True).first()
+            if name is None:
+                raise ValueError("Un ou plusieurs articles du panier sont introuvables dans cette boutique.")
+            raise ValueError(f"Quantité en stock insuffisante pour: {name}")
+
+
+def get_payment_mode(sale):
+    if sale.total_mobile_money and sale.cash_payment_amount:
+        return PaymentModeChoices.MIXED
+    if sale.total_mobile_money:
+        return PaymentModeChoices.MOBILE_MONEY
+    return PaymentModeChoices.CASH
+
+
+def daily_sales_shard(sale):
+    """Une ligne de cumul par caissier : ses ventes se suivent, elles ne se disputent pas la ligne."""
+    if sale.employee_id:
+        return sale.employee_id.int % DAILY_SALES_SHARDS
+    return random.randrange(DAILY_SALES_SHARDS)
+
+
+def record_daily_sales(sale):
+    """
+        Ajoute la vente au cumul du jour local de la boutique (UPDATE ... SET x = x + n). La ligne du
+        jour n'est créée qu'à la première vente ; si deux caisses la créent en
+        même temps, la perdante retombe sur l'incrément.
+    """
+    lookup = {
+        "shop_id": sale.shop_id,
+        "day": timezone.localdate(sale.created_at, sale.shop.tzinfo),
+        "payment_mode": get_payment_mode(sale),
+        "shard": daily_sales_shard(sale),
+    }
+    increments = {field: models.F(field) + getattr(sale, field) for field in ROLLUP_FIELDS}
+    increments["sale_count"] = models.F("sale_count") + 1
+
+    if DailyShopSales.objects.filter(**lookup).update(**increments):
+        return
+
+    try:
+        with transaction.atomic():
+            DailyShopSales.objects.create(
+                **lookup, sale_count=1, **{field: getattr(sale, field) for field in ROLLUP_FIELDS}
+            )
+    except IntegrityError:
+        DailyShopSales.objects.filter(**lookup).update(**increments)
+
+
+@transaction.atomic
+def rebuild_daily_sales(*, shop, previous_tzinfo=None):
+    """
+        Recalcule les cumuls de la boutique à partir de ses ventes, dans son
+        fuseau actuel ; previous_tzinfo est le fuseau dans lequel les lignes
+        existantes ont été découpées. Les jours antérieurs à la plus ancienne
+        vente conservée (mois archivés) ne sont plus recalculables et gardent
+        leurs lignes. Renvoie le nombre de lignes recréées.
+    """
+    sales = Sale.objects.filter(shop=shop)
+    first_sale = sales.aggregate(first=models.Min("created_at"))["first"]
+    if first_sale is None:
+        return 0
+    first_day = min(
+        timezone.localdate(first_sale, tzinfo) for tzinfo in (shop.tzinfo, previous_tzinfo or shop.tzinfo)
+    )
+    DailyShopSales.objects.filter(shop=shop, day__gte=first_day).delete()
+
+    payment_mode = models.Case(
+        models.When(models.Q(total_mobile_money__gt=0) & models.Q(cash_payment_amount__gt=0),
+                    then=models.Value(PaymentModeChoices.MIXED)),
+        models.When(total_mobile_money__gt=0, then=models.Value(PaymentModeChoices.MOBILE_MONEY)),
+        default=models.Value(PaymentModeChoices.CASH),
+    )
+    rows = (
+        sales.annotate(day=TruncDate("created_at", tzinfo=shop.tzinfo), payment_mode=payment_mode)
+        .values("day", "payment_mode")
+        .annotate(sale_count=models.Count("id"), **{field: models.Sum(field) for field in ROLLUP_FIELDS})
+        .order_by()
+    )
+    # Les ventes recalculées tiennent dans le shard 0 ; les suivantes se répartissent à nouveau.
+    return len(DailyShopSales.objects.bulk_create(
+        [DailyShopSales(shop=shop, shard=0, **row) for row in rows.iterator()], batch_size=1000,
+    ))
 
 
 @transaction.atomic
-def create_sale(*, shop, customer, employee, items_data, payment_data, allow_zero_stock=False):
+def create_sale(*, shop, customer, employee, items_data, payment_data, allow_zero_stock=False,
+                optimistic_stock=False, idempotency_key=None, sold_at=None):
+    """
+        sold_at : heure réelle d'une vente enregistrée hors ligne (bornée par
+        SaleBatchEntrySerializer) ; la vente, ses lignes et le cumul du jour la
+        prennent à la place de l'heure de synchronisation.
+    """
     if customer and customer.merchant_id != shop.owner_id:
         raise ValueError("Ce client n'appartient pas au commerçant de cette boutique.")
 
@@ -20,24 +168,150 @@ def create_sale(*, shop, customer, employee, items_data, payment_data, allow_zer
     if amount_paid < payment_data["grand_total"]:
         raise ValueError("Le montant payé doit être supérieur ou égal au total général.")
 
-    sale = Sale.objects.create(shop=shop, customer=customer, employee=employee, **payment_data)
-
+    # Un même article peut figurer sur plusieurs lignes : le contrôle de stock
+    # et la décrémentation portent sur la quantité cumulée.
+    quantities = defaultdict(int)
     for entry in items_data:
-        item = Item.objects.select_for_update().get(id=entry["item_id"], shop=shop)
+        quantities[entry["item_id"]] += entry["quantity"]
+
+    sale_id = uuid.uuid4()
+    if idempotency_key:
+        # En premier : un rejeu concurrent de la même clé attend ici la fin de
+        # cette transaction, puis échoue (IntegrityError) sans avoir rien verrouillé.
+        SaleIdempotencyKey.objects.create(shop=shop, key=idempotency_key, sale_id=sale_id)
+
+    if not optimistic_stock:
+        items = _lock_cart_items(shop=shop, quantities=quantities)
 
-        if not allow_zero_stock and item.quantity < entry["quantity"]:
-            raise ValueError(f"Quantité en stock insuffisante pour: {item.name}")
+        if not allow_zero_stock:
+            for item_id, quantity in quantities.items():
+                if items[item_id].quantity < quantity:
+                    raise ValueError(f"Quantité en stock insuffisante pour: {items[item_id].name}")
+        unit_costs = {item_id: item.average_cost for item_id, item in items.items()}
+    else:
+        # Article inconnu : pas de coût ici, l'UPDATE conditionnel refusera la vente.
+        unit_costs = dict(Item.objects.filter(shop=shop, id__in=quantities).values_list("id", "average_cost"))
 
-        SaleDetail.objects.create(
+    cost_of_goods = sum(
+        (unit_costs.get(item_id, 0) * quantity for item_id, quantity in quantities.items()), Decimal("0")
+    ).quantize(Decimal("0.01"))
+    sale = Sale.objects.create(
+        id=sale_id, shop=shop, customer=customer, employee=employee, idempotency_key=idempotency_key,
+        cost_of_goods=cost_of_goods, **payment_data
+    )
+
+    SaleDetail.objects.bulk_create([
+        SaleDetail(
             shop=shop,
             sale=sale,
-            item=item,
+            item_id=entry["item_id"],
             price=entry["price"],
             quantity=entry["quantity"],
             total_detail=entry["total_item"],
+            unit_cost=unit_costs.get(entry["item_id"]),
+        )
+        for entry in items_data
+    ])
+
+    if optimistic_stock:
+        # Les verrous de ligne ne sont pris qu'ici, en toute fin de transaction.
+        _decrement_stock_optimistic(shop=shop, quantities=quantities, allow_zero_stock=allow_zero_stock)
+    else:
+        # Toutes les décrémentations en un seul UPDATE ... SET quantity = CASE ...
+        Item.objects.filter(id__in=quantities).update(
+            quantity=models.Case(
+                *[
+                    models.When(id=item_id, then=models.F("quantity") - quantity)
+                    for item_id, quantity in quantities.items()
+                ],
+                default=models.F("quantity"),
+            ),
+            updated_at=timezone.now(),
         )
 
-        item.quantity = models.F("quantity") - entry["quantity"]
-        item.save(update_fields=["quantity"])
+    if sold_at is not None:
+        # created_at est auto_now_add : la date de la caisse est posée après l'INSERT. Le filtre
+        # created_at >= limite le balayage à la partition du jour quand la table est partitionnée.
+        SaleDetail.objects.filter(sale=sale, created_at__gte=sale.created_at).update(created_at=sold_at)
+        Sale.objects.filter(pk=sale.pk, created_at=sale.created_at).update(created_at=sold_at)
+        sale.created_at = sold_at
+
+    # Le journal de stock garde l'heure de synchronisation : c'est là que Item.quantity a bougé.
+    record_movements(
+        shop=shop, kind=StockMovementKind.SALE, source_id=sale.id,
+        quantities={item_id: -quantity for item_id, quantity in quantities.items()},
+    )
+    record_daily_sales(sale)
 
     return sale
+
+
+def create_sales_batch(*, shop, employee, sales_data, allow_zero_stock=False, optimistic_stock=False,
+                       chunk_size=SALE_BATCH_CHUNK_SIZE):
+    """
+        Synchronisation des ventes enregistrées hors ligne par une caisse.
+        Chaque vente passe par create_sale (dans un savepoint), par lots de
+        `chunk_size` ventes par transaction. Une vente refusée n'empêche pas
+        les autres ; une clé d'idempotence déjà connue renvoie la vente existante.
+
+        Retourne un résultat par vente, dans l'ordre reçu :
+        {"idempotency_key", "status": created|duplicate|error, "sale_id", "error"}.
+    """
+    customer_ids = {entry["customer_id"] for entry in sales_data if entry.get("customer_id")}
+    customers = Customer.objects.filter(merchant=shop.owner_id, id__in=customer_ids).in_bulk()
+
+    results = []
+    for start in range(0, len(sales_data), chunk_size):
+        chunk = sales_data[start:start + chunk_size]
+
+        with transaction.atomic():
+            known = dict(
+                SaleIdempotencyKey.objects.filter(
+                    shop=shop, key__in=[entry["idempotency_key"] for entry in chunk]
+                ).values_list("key", "sale_id")
+            )
+
+            for entry in chunk:
+                key = entry["idempotency_key"]
+                result = {"idempotency_key": key, "status": "created", "sale_id": None, "error": None}
+                results.append(result)
+
+                if key in known:
+                    result.update(status="duplicate", sale_id=known[key])
+                    continue
+
+                customer = None
+                if entry.get("customer_id"):
+                    customer = customers.get(entry["customer_id"])
+                    if customer is None:
+                        result.update(status="error", error="Client introuvable.")
+                        continue
+
+                try:
+                    sale = create_sale(
+                        shop=shop,
+                        customer=customer,
+                        employee=employee,
+                        items_data=entry["items"],
+                        payment_data={field: entry[field] for field in PAYMENT_FIELDS},
+                        allow_zero_stock=allow_zero_stock,
+                        optimistic_stock=optimistic_stock,
+                        idempotency_key=key,
+                        sold_at=entry.get("sold_at"),
+                    )
+                except ValueError as e:
+                    result.update(status="error", error=str(e))
+                    continue
+                except IntegrityError:
+                    # Même vente rejouée en parallèle par une autre requête : celle-ci a gagné.
+                    sale_id = SaleIdempotencyKey.objects.filter(shop=shop, key=key).values_list("sale_id", flat=True).first()
+                    if sale_id is None:
+                        raise
+                    result.update(status="duplicate", sale_id=sale_id)
+                    known[key] = sale_id
+                    continue
+
+                result["sale_id"] = sale.id
+                known[key] = sale.id
+
+    return results
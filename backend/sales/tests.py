@@ -1,3 +1,694 @@
-from django.test import TestCase
+import time
+import datetime
+import tempfile
+import threading
+import unittest
+from io import StringIO
+from unittest import mock
+from concurrent.futures import Future
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import IntegrityError, connection, transaction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from catalog.models import Item
+from catalog.services import quick_create_item
+
+from sales import receipts
+from sales.archive import archive_month, load_archived_sale
+from sales.models import ArchivedSale, DailyShopSales, Sale, SaleDetail, SaleIdempotencyKey
+from sales.partitioning import _with_partition_key
+from sales.receipt_text import (
+    ESCPOS_BOLD_ON, ESCPOS_FEED_AND_CUT, ESCPOS_INIT, render_receipt_escpos, render_receipt_text,
+)
+from sales.reports import get_dashboard_kpis, get_employee_totals
+from sales.serializers import SaleBatchEntrySerializer
+from sales.services import create_sale, create_sales_batch
+
+from tenants.models import Employee
+from tenants.services import register_merchant, update_shop
+
+try:
+    import weasyprint  # noqa: F401  (charge pango/cairo : OSError si les bibliothèques système manquent)
+    WEASYPRINT_AVAILABLE = True
+except (ImportError, OSError):
+    WEASYPRINT_AVAILABLE = False
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "Verrous de ligne concurrents : PostgreSQL requis.")
+class ConcurrentStockDecrementTests(TransactionTestCase):
+    """
+        Plusieurs caisses vendent le même article en parallèle : le stock ne doit
+        jamais passer sous zéro, quel que soit le mode de décrémentation.
+    """
+    TILLS = 8
+    SALES_PER_TILL = 10
+    INITIAL_STOCK = 25
+
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=self.INITIAL_STOCK)
+        self.topup = quick_create_item(shop=self.shop, name="Crédit", price=Decimal("100"), quantity=10_000)
+
+    def _ring_up(self, *, optimistic_stock, allow_zero_stock=False):
+        payment_data = {
+            "sub_total": Decimal("250"), "grand_total": Decimal("250"),
+            "amount_paid": Decimal("250"), "cash_payment_amount": Decimal("250"),
+        }
+        items_data = [
+            {"item_id": self.topup.id, "price": Decimal("100"), "quantity": 1, "total_item": Decimal("100")},
+            {"item_id": self.bread.id, "price": Decimal("150"), "quantity": 1, "total_item": Decimal("150")},
+        ]
+        outcomes = []
+
+        def till():
+            try:
+                for _ in range(self.SALES_PER_TILL):
+                    try:
+                        create_sale(
+                            shop=self.shop, customer=None, employee=None,
+                            items_data=items_data, payment_data=payment_data,
+                            allow_zero_stock=allow_zero_stock, optimistic_stock=optimistic_stock,
+                        )
+                        outcomes.append(True)
+                    except ValueError:
+                        outcomes.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=till) for _ in range(self.TILLS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def _assert_consistent(self, outcomes):
+        sold = outcomes.count(True)
+        self.bread.refresh_from_db()
+        self.topup.refresh_from_db()
+
+        self.assertEqual(len(outcomes), self.TILLS * self.SALES_PER_TILL)
+        self.assertEqual(sold, self.INITIAL_STOCK)
+        self.assertEqual(self.bread.quantity, 0)
+        # Une vente refusée ne doit rien laisser derrière elle (ni vente, ni décrémentation partielle).
+        self.assertEqual(self.topup.quantity, 10_000 - sold)
+        self.assertEqual(Sale.objects.filter(shop=self.shop).count(), sold)
+
+    def test_locked_mode_never_oversells(self):
+        self._assert_consistent(self._ring_up(optimistic_stock=False))
+
+    def test_optimistic_mode_never_oversells(self):
+        self._assert_consistent(self._ring_up(optimistic_stock=True))
+
+    def test_optimistic_mode_honours_allow_zero_stock(self):
+        outcomes = self._ring_up(optimistic_stock=True, allow_zero_stock=True)
+        self.bread.refresh_from_db()
+
+        self.assertTrue(all(outcomes))
+        self.assertEqual(self.bread.quantity, self.INITIAL_STOCK - len(outcomes))
+
+    def test_optimistic_mode_rejects_unknown_item(self):
+        other_shop = register_merchant(
+            username="other", password="not-used", company_name="Autre", shop_name="Ailleurs"
+        )[2]
+        foreign = quick_create_item(shop=other_shop, name="Pain", price=Decimal("150"), quantity=5)
+
+        with self.assertRaises(ValueError):
+            create_sale(
+                shop=self.shop, customer=None, employee=None,
+                items_data=[{"item_id": foreign.id, "price": Decimal("150"), "quantity": 1, "total_item": Decimal("150")}],
+                payment_data={"sub_total": Decimal("150"), "grand_total": Decimal("150"), "amount_paid": Decimal("150"),
+                              "cash_payment_amount": Decimal("150")},
+                optimistic_stock=True,
+            )
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.quantity, 5)
+
+
+class LockedStockDecrementTests(TestCase):
+    """
+        Mode verrouillé : un seul SELECT ... FOR UPDATE et un seul UPDATE ... CASE
+        pour tout le panier, quel que soit le nombre d'articles.
+    """
+
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.items = [
+            quick_create_item(shop=self.shop, name=f"Article {index}", price=Decimal("100"), quantity=10)
+            for index in range(5)
+        ]
+        # Vendeur fixe : toujours la même ligne de cumul, déjà créée au moment des mesures.
+        self.owner = Employee.objects.get(shop=self.shop)
+        self.spare = quick_create_item(shop=self.shop, name="Réserve", price=Decimal("100"), quantity=10)
+
+    def _sell(self, lines):
+        total = Decimal("100") * sum(quantity for _, quantity in lines)
+        return create_sale(
+            shop=self.shop, customer=None, employee=self.owner,
+            items_data=[
+                {"item_id": item.id, "price": Decimal("100"), "quantity": quantity, "total_item": Decimal("100") * quantity}
+                for item, quantity in lines
+            ],
+            payment_data=_cash_payment(total),
+        )
+
+    @staticmethod
+    def _item_queries(queries):
+        selects = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT") and 'FROM "catalog_item"' in q["sql"]]
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('UPDATE "catalog_item"')]
+        return selects, updates
+
+    def test_cart_is_locked_and_decremented_in_one_query_each(self):
+        self._sell([(self.spare, 1)])
+        with CaptureQueriesContext(connection) as single:
+            self._sell([(self.items[0], 1)])
+        with CaptureQueriesContext(connection) as cart:
+            self._sell([(item, 2) for item in self.items])
+
+        selects, updates = self._item_queries(cart)
+        self.assertEqual((len(selects), len(updates)), (1, 1))
+        self.assertIn("CASE WHEN", updates[0])
+        self.assertEqual(len(cart), len(single))
+        cart_items = Item.objects.filter(id__in=[item.id for item in self.items]).order_by("name")
+        self.assertEqual(list(cart_items.values_list("quantity", flat=True)), [7, 8, 8, 8, 8])
+
+    def test_repeated_lines_are_checked_against_their_combined_quantity(self):
+        with self.assertRaisesMessage(ValueError, "Quantité en stock insuffisante pour: Article 0"):
+            self._sell([(self.items[0], 6), (self.items[1], 1), (self.items[0], 5)])
+
+        self.assertFalse(Sale.objects.filter(shop=self.shop).exists())
+        self.assertEqual(set(Item.objects.filter(shop=self.shop).values_list("quantity", flat=True)), {10})
+
+    def test_item_of_another_shop_is_refused(self):
+        _, _, other_shop = register_merchant(
+            username="other", password="not-used", company_name="Autre", shop_name="Ailleurs"
+        )
+        foreign = quick_create_item(shop=other_shop, name="Pain", price=Decimal("100"), quantity=5)
+
+        with self.assertRaisesMessage(ValueError, "introuvables dans cette boutique"):
+            self._sell([(self.items[0], 1), (foreign, 1)])
+
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.quantity, 5)
+
+
+def _cash_payment(total):
+    return {"sub_total": total, "grand_total": total, "amount_paid": total, "cash_payment_amount": total}
+
+
+class SaleIdempotencyKeyTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=10)
+
+    def _sell(self, key):
+        return create_sale(
+            shop=self.shop, customer=None, employee=None, idempotency_key=key,
+            items_data=[{"item_id": self.bread.id, "price": Decimal("150"), "quantity": 1, "total_item": Decimal("150")}],
+            payment_data=_cash_payment(Decimal("150")),
+        )
+
+    def test_key_points_to_its_sale(self):
+        sale = self._sell("till-1-0001")
+        self.assertEqual(SaleIdempotencyKey.objects.get(shop=self.shop, key="till-1-0001").sale_id, sale.id)
+
+    def test_reused_key_is_rejected_before_touching_stock(self):
+        self._sell("till-1-0001")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self._sell("till-1-0001")
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.quantity, 9)
+        self.assertEqual(Sale.objects.filter(shop=self.shop).count(), 1)
+
+    def test_partitioning_widens_only_the_primary_key(self):
+        self.assertEqual(_with_partition_key("PRIMARY KEY (id)"), "PRIMARY KEY (id, created_at)")
+        self.assertEqual(_with_partition_key("PRIMARY KEY (id, created_at)"), "PRIMARY KEY (id, created_at)")
+
+
+class SaleArchiveTests(TestCase):
+    """Aller-retour archivage / relecture, sur le chemin non partitionné (SQLite compris)."""
+
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=10)
+        self.archive_root = tempfile.mkdtemp()
+        self.month = datetime.date(2024, 3, 1)
+
+    def _sell_in(self, month, key):
+        sale = create_sale(
+            shop=self.shop, customer=None, employee=None, idempotency_key=key,
+            items_data=[{"item_id": self.bread.id, "price": Decimal("150"), "quantity": 2, "total_item": Decimal("300")}],
+            payment_data=_cash_payment(Decimal("300")),
+        )
+        created_at = datetime.datetime.combine(month, datetime.time(12), tzinfo=datetime.timezone.utc)
+        Sale.objects.filter(id=sale.id).update(created_at=created_at)
+        SaleDetail.objects.filter(sale=sale).update(created_at=created_at)
+        return sale
+
+    def test_archived_month_leaves_live_tables_and_reloads(self):
+        archived = [self._sell_in(self.month, f"k{n}") for n in range(3)]
+        kept = self._sell_in(datetime.date(2024, 4, 1), "k-april")
+
+        self.assertEqual(archive_month(month=self.month, archive_root=self.archive_root, chunk_size=2), 3)
+
+        self.assertEqual(list(Sale.objects.filter(shop=self.shop).values_list("id", flat=True)), [kept.id])
+        self.assertEqual(SaleDetail.objects.filter(sale_id__in=[sale.id for sale in archived]).count(), 0)
+        self.assertEqual(ArchivedSale.objects.filter(shop=self.shop).count(), 3)
+
+        reloaded = load_archived_sale(shop=self.shop, sale_id=archived[1].id, archive_root=self.archive_root)
+        self.assertEqual(reloaded.id, archived[1].id)
+        self.assertEqual(reloaded.grand_total, Decimal("300"))
+        self.assertEqual(reloaded.idempotency_key, "k1")
+        details = list(reloaded.saledetail_set.all())
+        self.assertEqual([(detail.item_id, detail.quantity) for detail in details], [(self.bread.id, 2)])
+
+    def test_archived_keys_still_block_replays(self):
+        sale = self._sell_in(self.month, "k-archived")
+        archive_month(month=self.month, archive_root=self.archive_root)
+        self.assertEqual(SaleIdempotencyKey.objects.get(shop=self.shop, key="k-archived").sale_id, sale.id)
+
+    def test_empty_month_writes_no_archive(self):
+        self.assertEqual(archive_month(month=self.month, archive_root=self.archive_root), 0)
+        self.assertFalse(ArchivedSale.objects.exists())
+
+
+class SalesReportCacheTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=10)
+        self.today = timezone.localdate(timezone=self.shop.tzinfo)
+        self.addCleanup(caches["reports"].clear)
+
+    def _sell(self):
+        create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": self.bread.id, "price": Decimal("150"), "quantity": 1, "total_item": Decimal("150")}],
+            payment_data=_cash_payment(Decimal("150")),
+        )
+
+    def _sale_count(self):
+        report = get_employee_totals(shop=self.shop, date_from=self.today, date_to=self.today)
+        return sum(row["sale_count"] for row in report["employees"])
+
+    def test_live_window_follows_new_sales(self):
+        self._sell()
+        self.assertEqual(self._sale_count(), 1)
+        self._sell()
+        self.assertEqual(self._sale_count(), 2)
+
+    def test_sale_does_not_touch_the_report_cache(self):
+        self._sell()
+        self._sale_count()
+        with CaptureQueriesContext(connection) as queries:
+            self._sell()
+        self.assertFalse([query for query in queries.captured_queries if "cache_entries" in query["sql"]])
+
+
+class DailySalesShardTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.owner = Employee.objects.get(shop=self.shop)
+        self.bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=100)
+        self.today = timezone.localdate(timezone=self.shop.tzinfo)
+
+    def _sell(self, employee):
+        create_sale(
+            shop=self.shop, customer=None, employee=employee,
+            items_data=[{"item_id": self.bread.id, "price": Decimal("150"), "quantity": 1, "total_item": Decimal("150")}],
+            payment_data=_cash_payment(Decimal("150")),
+        )
+
+    def test_a_cashier_always_uses_the_same_row(self):
+        for _ in range(3):
+            self._sell(self.owner)
+        self.assertEqual(list(DailyShopSales.objects.filter(shop=self.shop).values_list("sale_count", flat=True)), [3])
+
+    def test_reads_add_up_the_shards(self):
+        for _ in range(20):
+            self._sell(None)
+        self._sell(self.owner)
+        kpis = get_dashboard_kpis(shop=self.shop, date_from=self.today, date_to=self.today)
+        self.assertEqual(kpis["sale_count"], 21)
+        self.assertEqual(kpis["grand_total"], Decimal("3150"))
+        self.assertEqual(kpis["by_day"], [{"day": self.today, "sale_count": 21, "grand_total": Decimal("3150")}])
+
+
+class ShopTimezoneRollupTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=10)
+        # 23h30 UTC : le 11 mars à Douala (UTC+1), encore le 10 mars à New York.
+        self.late_evening = datetime.datetime(2024, 3, 10, 23, 30, tzinfo=datetime.timezone.utc)
+        sale = create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": self.bread.id, "price": Decimal("150"), "quantity": 1, "total_item": Decimal("150")}],
+            payment_data=_cash_payment(Decimal("150")),
+        )
+        Sale.objects.filter(id=sale.id).update(created_at=self.late_evening)
+        DailyShopSales.objects.filter(shop=self.shop).update(day=datetime.date(2024, 3, 11))
+
+    def _rollup(self):
+        return list(DailyShopSales.objects.filter(shop=self.shop).order_by("day").values_list("day", "sale_count", "grand_total"))
+
+    def test_timezone_change_moves_sales_to_their_new_local_day(self):
+        update_shop(shop=self.shop, timezone="America/New_York")
+        self.assertEqual(self._rollup(), [(datetime.date(2024, 3, 10), 1, Decimal("150"))])
+
+    def test_days_before_the_oldest_live_sale_are_kept(self):
+        archived = DailyShopSales.objects.create(
+            shop=self.shop, day=datetime.date(2024, 1, 5), payment_mode="CASH", sale_count=4, grand_total=Decimal("600"),
+        )
+        update_shop(shop=self.shop, timezone="America/New_York")
+        self.assertEqual(self._rollup()[0], (archived.day, 4, Decimal("600")))
+        self.assertEqual(len(self._rollup()), 2)
+
+    def test_other_fields_leave_the_rollup_alone(self):
+        row = DailyShopSales.objects.get(shop=self.shop)
+        update_shop(shop=self.shop, name="Centre-ville")
+        self.assertEqual(DailyShopSales.objects.get(shop=self.shop).pk, row.pk)
+
+
+class SaleBatchTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        self.bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=10)
+
+    def _entry(self, key, quantity=1):
+        total = Decimal("150") * quantity
+        return {
+            "idempotency_key": key,
+            "items": [{"item_id": self.bread.id, "price": Decimal("150"), "quantity": quantity, "total_item": total}],
+            "sub_total": total, "grand_total": total, "tax_amount": Decimal("0"), "tax_percentage": Decimal("0"),
+            "amount_paid": total, "amount_change": Decimal("0"), "total_mobile_money": Decimal("0"),
+            "cash_payment_amount": total, "mobile_money_covers_total": False, "has_sav": False,
+        }
+
+    def _sync(self, entries, **kwargs):
+        return create_sales_batch(shop=self.shop, employee=None, sales_data=entries, **kwargs)
+
+    def _stock(self):
+        return Item.objects.get(pk=self.bread.pk).quantity
+
+    def test_key_repeated_in_one_batch_sells_once(self):
+        results = self._sync([self._entry("k-1"), self._entry("k-1")])
+        self.assertEqual([result["status"] for result in results], ["created", "duplicate"])
+        self.assertEqual(results[1]["sale_id"], results[0]["sale_id"])
+        self.assertEqual(Sale.objects.filter(shop=self.shop).count(), 1)
+        self.assertEqual(self._stock(), 9)
+
+    def test_key_repeated_across_chunks_sells_once(self):
+        results = self._sync([self._entry("k-1"), self._entry("k-2"), self._entry("k-1")], chunk_size=1)
+        self.assertEqual([result["status"] for result in results], ["created", "created", "duplicate"])
+        self.assertEqual(self._stock(), 8)
+
+    def test_replayed_batch_returns_the_same_sales(self):
+        entries = [self._entry("k-1"), self._entry("k-2")]
+        first = self._sync(entries)
+        replay = self._sync(entries)
+        self.assertEqual([result["status"] for result in replay], ["duplicate", "duplicate"])
+        self.assertEqual([result["sale_id"] for result in replay], [result["sale_id"] for result in first])
+        self.assertEqual(self._stock(), 8)
+
+    def test_refused_sale_leaves_its_key_free(self):
+        results = self._sync([self._entry("k-1", quantity=50), self._entry("k-2")])
+        self.assertEqual([result["status"] for result in results], ["error", "created"])
+        self.assertFalse(SaleIdempotencyKey.objects.filter(shop=self.shop, key="k-1").exists())
+
+        Item.objects.filter(pk=self.bread.pk).update(quantity=100)
+        self.assertEqual(self._sync([self._entry("k-1", quantity=50)])[0]["status"], "created")
+
+    def test_offline_sale_keeps_its_till_time(self):
+        # 22h30 à Douala la veille : la vente compte pour ce jour-là, pas pour le jour de synchronisation.
+        yesterday = timezone.localdate(timezone=self.shop.tzinfo) - datetime.timedelta(days=1)
+        sold_at = datetime.datetime.combine(yesterday, datetime.time(22, 30), tzinfo=self.shop.tzinfo)
+        sale_id = self._sync([{**self._entry("k-1"), "sold_at": sold_at}])[0]["sale_id"]
+
+        self.assertEqual(Sale.objects.get(pk=sale_id).created_at, sold_at)
+        self.assertEqual(set(SaleDetail.objects.filter(sale=sale_id).values_list("created_at", flat=True)), {sold_at})
+        self.assertEqual(list(DailyShopSales.objects.filter(shop=self.shop).values_list("day", flat=True)), [yesterday])
+
+    def test_sold_at_is_bounded(self):
+        now = timezone.now()
+        cases = {
+            now + datetime.timedelta(hours=1): False,
+            now - settings.OFFLINE_SALE_MAX_AGE - datetime.timedelta(hours=1): False,
+            now - datetime.timedelta(days=1): True,
+        }
+        for sold_at, valid in cases.items():
+            entry = {**self._entry("k-1"), "sold_at": sold_at.isoformat(), "items": [
+                {"item_id": str(self.bread.id), "price": "150", "quantity": 1, "total_item": "150"},
+            ]}
+            with self.subTest(sold_at=sold_at):
+                self.assertEqual(SaleBatchEntrySerializer(data=entry).is_valid(), valid)
+
+    def test_batch_endpoint_prerenders_created_receipts(self):
+        client = APIClient()
+        client.force_authenticate(self.shop.owner.user)
+        create_sale(
+            shop=self.shop, customer=None, employee=None, idempotency_key="k-1",
+            items_data=self._entry("k-1")["items"], payment_data=_cash_payment(Decimal("150")),
+        )
+        entries = [
+            {**self._entry(key), "items": [{"item_id": str(self.bread.id), "price": "150", "quantity": 1, "total_item": "150"}]}
+            for key in ("k-1", "k-2")
+        ]
+        with mock.patch("sales.views.prerender_receipts") as prerender, self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f"/api/shops/{self.shop.id}/sales/batch/", {"sales": entries}, format="json")
+        self.assertEqual([result["status"] for result in response.json()], ["duplicate", "created"])
+        prerender.assert_called_once()
+        self.assertEqual(prerender.call_args.kwargs["sale_ids"], [Sale.objects.get(idempotency_key="k-2").id])
+
+
+class ReceiptRenderTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=10)
+        self.sale = create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": bread.id, "price": Decimal("150"), "quantity": 1, "total_item": Decimal("150")}],
+            payment_data=_cash_payment(Decimal("150")),
+        )
+        self.shop_settings = self.shop.settings
+        self.version = receipts.receipt_settings_version(shop=self.shop, shop_settings=self.shop_settings)
+        self.path = receipts.receipt_path(sale=self.sale, version=self.version)
+
+        storage_root = tempfile.mkdtemp()
+        storages = {"receipts": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": storage_root},
+        }}
+        storage_override = override_settings(STORAGES={**settings.STORAGES, **storages})
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        self.addCleanup(self._shutdown_pool)
+
+    @staticmethod
+    def _shutdown_pool():
+        if receipts._render_pool is not None:
+            receipts._render_pool.shutdown(wait=True)
+        receipts._reset_render_pool()
+
+    def _get_pdf(self):
+        return receipts.get_receipt_pdf(
+            sale=self.sale, shop=self.shop, shop_settings=self.shop_settings, version=self.version
+        )
+
+    def _pool_returns(self, future):
+        return mock.patch.object(receipts, "submit_receipt_render", return_value=future)
+
+    @override_settings(RECEIPT_RENDER_TIMEOUT=0.01)
+    def test_slow_pool_falls_back_to_rendering_in_the_request(self):
+        with self._pool_returns(Future()), mock.patch.object(receipts.receipt_worker, "write_pdf", return_value=b"%PDF-sync"):
+            self.assertEqual(self._get_pdf(), b"%PDF-sync")
+        self.assertTrue(receipts.get_receipt_storage().exists(self.path))
+
+    def test_worker_error_falls_back_to_rendering_in_the_request(self):
+        failed = Future()
+        failed.set_exception(RuntimeError("police introuvable"))
+        with self._pool_returns(failed), mock.patch.object(receipts.receipt_worker, "write_pdf", return_value=b"%PDF-sync"):
+            self.assertEqual(self._get_pdf(), b"%PDF-sync")
+
+    def test_stored_receipt_is_read_back_without_rendering(self):
+        receipts.get_receipt_storage().save(self.path, ContentFile(b"%PDF-stored"))
+        with mock.patch.object(receipts, "submit_receipt_render") as submit:
+            self.assertEqual(self._get_pdf(), b"%PDF-stored")
+        submit.assert_not_called()
+
+    @unittest.skipUnless(WEASYPRINT_AVAILABLE, "WeasyPrint (pango) requis pour le pool de rendu.")
+    @override_settings(RECEIPT_RENDER_WORKERS=1)
+    def test_pool_renders_and_stores_the_receipt(self):
+        pool = receipts.get_render_pool()
+        with mock.patch.object(pool, "submit", wraps=pool.submit) as submit:
+            pdf = self._get_pdf()
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        submit.assert_called_once()
+        self.assertEqual(submit.call_args.args[0], receipts.receipt_worker.write_pdf)
+
+    @unittest.skipUnless(WEASYPRINT_AVAILABLE, "WeasyPrint (pango) requis pour le pool de rendu.")
+    @override_settings(RECEIPT_RENDER_WORKERS=1)
+    def test_prerendered_receipt_is_read_back_from_storage(self):
+        receipts.prerender_receipt(sale=self.sale, shop=self.shop, shop_settings=self.shop_settings)
+        deadline = time.monotonic() + 10
+        while receipts._pending_renders and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(receipts.get_receipt_storage().exists(self.path))
+
+        # Ni nouvelle soumission au pool, ni rendu dans la requête : le reçu vient du pré-rendu.
+        pool = receipts.get_render_pool()
+        with mock.patch.object(pool, "submit", side_effect=AssertionError), \
+                mock.patch.object(receipts.receipt_worker, "write_pdf", side_effect=AssertionError):
+            self.assertTrue(self._get_pdf().startswith(b"%PDF"))
+
+
+class ReceiptPruneTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        storage_root = tempfile.mkdtemp()
+        storages = {"receipts": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": storage_root},
+        }}
+        storage_override = override_settings(STORAGES={**settings.STORAGES, **storages})
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        self.storage = receipts.get_receipt_storage()
+        self.old_path = f"{self.shop.id}/sale-old.pdf"
+        self.storage.save(self.old_path, ContentFile(b"%PDF-old"))
+
+    def _current_path(self):
+        version = receipts.receipt_settings_version(shop=self.shop, shop_settings=self.shop.settings)
+        return f"{self.shop.id}/sale-{version}.pdf"
+
+    def test_settings_change_does_not_touch_stored_receipts(self):
+        self.shop.settings.tax_number = "M0123456789"
+        self.shop.settings.save()
+        self.shop.name = "Centre-ville"
+        self.shop.save()
+        self.assertTrue(self.storage.exists(self.old_path))
+
+    def test_prune_command_keeps_only_the_current_version(self):
+        current = self._current_path()
+        self.storage.save(current, ContentFile(b"%PDF-current"))
+        call_command("prune_receipts", stdout=StringIO())
+        self.assertFalse(self.storage.exists(self.old_path))
+        self.assertTrue(self.storage.exists(current))
+
+
+class ReceiptEndpointTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=10)
+        self.sale = create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": bread.id, "price": Decimal("150"), "quantity": 2, "total_item": Decimal("300")}],
+            payment_data=_cash_payment(Decimal("300")),
+        )
+        self.url = f"/api/shops/{self.shop.id}/sales/{self.sale.id}/receipt/"
+        self.client = APIClient()
+        self.client.force_authenticate(self.shop.owner.user)
+
+    def test_unchanged_receipt_is_answered_304(self):
+        first = self.client.get(self.url, {"format": "text"})
+        self.assertEqual(first.status_code, 200)
+
+        second = self.client.get(self.url, {"format": "text"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+
+    def test_each_format_and_paper_has_its_own_etag(self):
+        etags = {
+            self.client.get(self.url, params)["ETag"]
+            for params in ({"format": "text"}, {"format": "text", "paper": "58"}, {"format": "escpos"})
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_shop_change_invalidates_the_etag(self):
+        etag = self.client.get(self.url, {"format": "text"})["ETag"]
+        update_shop(shop=self.shop, name="Centre-ville")
+
+        response = self.client.get(self.url, {"format": "text"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("CENTRE-VILLE", response.content.decode())
+
+    def test_pdf_revalidation_skips_the_render(self):
+        with mock.patch("sales.views.get_receipt_pdf", return_value=b"%PDF-1.7") as get_pdf:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual((first.status_code, first["Content-Type"], first.content), (200, "application/pdf", b"%PDF-1.7"))
+        self.assertEqual(second.status_code, 304)
+        get_pdf.assert_called_once()
+
+    def test_escpos_receipt_is_sent_as_raw_bytes(self):
+        response = self.client.get(self.url, {"format": "escpos", "paper": "58"})
+
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        self.assertIn(f'filename="recu-{self.sale.id}.bin"', response["Content-Disposition"])
+        self.assertTrue(response.content.startswith(ESCPOS_INIT))
+
+    def test_unknown_paper_is_refused(self):
+        response = self.client.get(self.url, {"format": "escpos", "paper": "110"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ThermalReceiptTests(TestCase):
+    def setUp(self):
+        _, _, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Boulangerie du Centre"
+        )
+        item = quick_create_item(shop=self.shop, name="Pain complet aux céréales", price=Decimal("1500"), quantity=10)
+        self.sale = create_sale(
+            shop=self.shop, customer=None, employee=None,
+            items_data=[{"item_id": item.id, "price": Decimal("1500"), "quantity": 2, "total_item": Decimal("3000")}],
+            payment_data=_cash_payment(Decimal("3000")),
+        )
+
+    def _render(self, render, paper):
+        return render(sale=self.sale, shop=self.shop, shop_settings=self.shop.settings, paper=paper)
+
+    def test_escpos_output_is_framed_and_encoded_for_the_printer(self):
+        output = self._render(render_receipt_escpos, "80")
+
+        self.assertTrue(output.startswith(ESCPOS_INIT + b"\x1bt\x13"))
+        self.assertTrue(output.endswith(ESCPOS_FEED_AND_CUT))
+        self.assertIn(ESCPOS_BOLD_ON + b"\x1d!\x01BOULANGERIE DU CENTRE\n", output)
+        # Page de code 858 : « é » est l'octet 0x82.
+        self.assertIn(b"c\x82r\x82ales", output)
+
+    def test_lines_fit_the_paper_width(self):
+        for paper, width in (("58", 32), ("80", 48)):
+            with self.subTest(paper=paper):
+                lines = self._render(render_receipt_text, paper).splitlines()
+                self.assertLessEqual(max(len(line) for line in lines), width)
+                total = next(line for line in lines if line.startswith("Total"))
+                self.assertEqual(len(total), width)
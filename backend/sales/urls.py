@@ -2,7 +2,8 @@ from django.urls import path, include
 
 from rest_framework.routers import SimpleRouter
 
-from sales.views import CustomerViewSet, SaleViewSet
+from sales.views import CustomerViewSet, DashboardKPIView, SaleViewSet
+from sales.views import EmployeeTotalsReportView, HourlyHeatmapReportView, MarginReportView, TopItemsReportView
 
 router = SimpleRouter()
 router.register(r"customers", CustomerViewSet, basename="shop-customers")
@@ -10,4 +11,9 @@ router.register(r"sales", SaleViewSet, basename="shop-sales")
 
 urlpatterns = [
     path("shops/<uuid:shop_pk>/", include(router.urls)),
+    path("shops/<uuid:shop_pk>/dashboard/kpis/", DashboardKPIView.as_view(), name="shop-dashboard-kpis"),
+    path("shops/<uuid:shop_pk>/reports/top-items/", TopItemsReportView.as_view(), name="shop-report-top-items"),
+    path("shops/<uuid:shop_pk>/reports/hourly/", HourlyHeatmapReportView.as_view(), name="shop-report-hourly"),
+    path("shops/<uuid:shop_pk>/reports/employees/", EmployeeTotalsReportView.as_view(), name="shop-report-employees"),
+    path("shops/<uuid:shop_pk>/reports/margin/", MarginReportView.as_view(), name="shop-report-margin"),
 ]
@@ -1,32 +1,57 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
-from django.template.loader import render_to_string
-
-from weasyprint import HTML
+from django.utils.cache import get_conditional_response
 
+from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, serializers
 
-from django_filters import rest_framework as filters
 
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 
-from core.permissions import IsShopMember, ManagerWriteOnlyMixin
+from core.exports import ExportMixin
+from core.filters import ShopDateRangeFilterSet, day_range
+from core.db_routing import ReplicaReadMixin
+from core.idempotency import IdempotencyMixin
+from core.pagination import PageOrKeysetPagination
+from core.permissions import IsShopMember, IsShopManagerStrict, ManagerWriteOnlyMixin
 
-from core.schema import SHOP_PK_PARAMETER
+from core.schema import SHOP_PK_PARAMETER, SPARSE_FIELDS_PARAMETERS
 from core.schema import shop_scoped_schema
 
-from sales.models import Customer, Sale
+from core.sparse_fields import SparseFieldsMixin
+
+from sales.archive import load_archived_sale
+from sales.models import Customer, Sale, SaleDetail
 
 from sales.serializers import CustomerSerializer, SaleCreateSerializer, SaleSerializer
+from sales.serializers import SaleBatchCreateSerializer, SaleBatchEntrySerializer, SaleBatchResultSerializer
+from sales.serializers import DashboardKPIQuerySerializer, DashboardKPISerializer
+from sales.serializers import SalesReportQuerySerializer, TopItemsQuerySerializer
+from sales.serializers import EmployeeTotalsReportSerializer, HourlyHeatmapSerializer, TopItemsReportSerializer
+from sales.serializers import MarginReportSerializer
+
+from sales.renderers import EscPosReceiptRenderer, PDFReceiptRenderer, TextReceiptRenderer
+from sales.renderers import ReceiptFormatNegotiation
+
+from sales.receipt_text import DEFAULT_PAPER, PAPER_WIDTHS, render_receipt_escpos, render_receipt_text
+
+from sales.receipts import get_receipt_pdf, prerender_receipt, prerender_receipts, receipt_etag, receipt_settings_version
+
+from sales.reports import get_dashboard_kpis, get_employee_totals, get_hourly_heatmap, get_margin_report, get_top_items
 
-from sales.services import create_sale
+from sales.services import PAYMENT_FIELDS
+from sales.services import create_sale, create_sales_batch
 
 
 @shop_scoped_schema
-class CustomerViewSet(ManagerWriteOnlyMixin, viewsets.ModelViewSet):
+class CustomerViewSet(SparseFieldsMixin, ReplicaReadMixin, IdempotencyMixin, ManagerWriteOnlyMixin, viewsets.ModelViewSet):
     serializer_class = CustomerSerializer
     permission_classes = [IsShopMember]
     search_fields = ["first_name", "last_name", "phone", "email"]
@@ -49,14 +74,13 @@ class CustomerViewSet(ManagerWriteOnlyMixin, viewsets.ModelViewSet):
         summary="Créer une vente au comptoir",
         parameters=[SHOP_PK_PARAMETER]
     ),
-    list=extend_schema(responses={200: SaleSerializer(many=True)}, parameters=[SHOP_PK_PARAMETER]),
-    retrieve=extend_schema(responses={200: SaleSerializer}, parameters=[SHOP_PK_PARAMETER]),
+    list=extend_schema(
+        responses={200: SaleSerializer(many=True)}, parameters=[SHOP_PK_PARAMETER, *SPARSE_FIELDS_PARAMETERS]
+    ),
+    retrieve=extend_schema(responses={200: SaleSerializer}, parameters=[SHOP_PK_PARAMETER, *SPARSE_FIELDS_PARAMETERS]),
 )
-class SaleViewSet(viewsets.ModelViewSet):
-    class SaleFilter(filters.FilterSet):
-        date_after = filters.DateFilter(field_name="created_at", lookup_expr="date__gte")
-        date_before = filters.DateFilter(field_name="created_at", lookup_expr="date__lte")
-
+class SaleViewSet(ExportMixin, SparseFieldsMixin, ReplicaReadMixin, IdempotencyMixin, viewsets.ModelViewSet):
+    class SaleFilter(ShopDateRangeFilterSet):
         class Meta:
             model = Sale
             fields = ["customer", "employee", "has_sav", "date_after", "date_before"]
@@ -64,30 +88,96 @@ class SaleViewSet(viewsets.ModelViewSet):
     permission_classes = [IsShopMember]
     http_method_names = ["get", "post", "head"]  # pas d'update/delete sur une vente actée
     filterset_class = SaleFilter
+    pagination_class = PageOrKeysetPagination
     search_fields = ["first_name", "last_name", "phone", "email"]
-    ordering_fields = ["first_name", "loyalty_points", "created_at"]
+    ordering_fields = ["created_at", "grand_total"]
     ordering = ["-created_at"]
+    # Jointures posées par SparseFieldsMixin en lecture, selon les champs demandés.
+    # Le reçu n'en profite pas : il ne charge ses lignes qu'en cas de rendu effectif
+    # (voir sales.receipts).
+    sparse_select_related = {"customer_name": ["customer"], "employee_username": ["employee__user"]}
+    sparse_prefetch_related = {"items": ["saledetail_set__item"]}
+
+    export_filename = "ventes"
+    export_select_related = ["customer", "employee__user"]
+    export_columns = [
+        ("Date", "created_at"),
+        ("Ticket", "id"),
+        ("Client", "customer.get_full_name"),
+        ("Vendeur", "employee.user.username"),
+        ("Sous-total", "sub_total"),
+        ("Taxes", "tax_amount"),
+        ("Total", "grand_total"),
+        ("Montant payé", "amount_paid"),
+        ("Espèces", "cash_payment_amount"),
+        ("Mobile Money", "total_mobile_money"),
+        ("Monnaie rendue", "amount_change"),
+        ("SAV", "has_sav"),
+    ]
+    export_line_columns = [
+        ("Date", "sale.created_at"),
+        ("Ticket", "sale.id"),
+        ("Client", "sale.customer.get_full_name"),
+        ("Article", "item.name"),
+        ("Prix unitaire", "price"),
+        ("Quantité", "quantity"),
+        ("Total ligne", "total_detail"),
+    ]
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
             return Sale.objects.none()
 
-        queryset = Sale.objects.filter(shop=self.request.shop).select_related(
-            "customer", "employee__user"
-        ).prefetch_related("saledetail_set__item")
+        queryset = Sale.objects.filter(shop=self.request.shop)
 
-        # Par défaut : uniquement les ventes du jour, sauf si une plage de dates
-        # est explicitement demandée via date_after/date_before.
+        # Par défaut : uniquement les ventes du jour (de la boutique), sauf si une
+        # plage de dates est explicitement demandée via date_after/date_before.
         params = self.request.query_params
-        if self.action == "list" and "date_after" not in params and "date_before" not in params:
-            today = timezone.localdate()
-            queryset = queryset.filter(created_at__date=today)
+        if self.action in ("list", "export") and "date_after" not in params and "date_before" not in params:
+            tzinfo = self.request.shop.tzinfo
+            today = timezone.localdate(timezone=tzinfo)
+            start, end = day_range(date_from=today, date_to=today, tzinfo=tzinfo)
+            queryset = queryset.filter(created_at__gte=start, created_at__lt=end)
 
         return queryset
 
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Vente sortie des tables vivantes par `archive_sales` : consultation et
+            # réimpression restent possibles depuis l'archive.
+            if self.action not in ("retrieve", "receipt"):
+                raise
+            sale = load_archived_sale(shop=self.request.shop, sale_id=self.kwargs[self.lookup_field])
+            if sale is None:
+                raise
+            return sale
+
     def get_serializer_class(self):
         return SaleCreateSerializer if self.action == "create" else SaleSerializer
 
+    def _export_lines(self):
+        return self.request.query_params.get("lines", "").lower() in ("1", "true", "yes")
+
+    def get_export_queryset(self):
+        if not self._export_lines():
+            return super().get_export_queryset()
+        # ?lines=true : une ligne par article vendu, sur les ventes retenues par les filtres.
+        sales = self.filter_queryset(self.get_queryset()).order_by().values("id")
+        return (
+            SaleDetail.objects.filter(sale__in=sales)
+            .select_related("sale__customer", "item")
+            .order_by("sale__created_at", "id")
+        )
+
+    def get_export_columns(self):
+        return self.export_line_columns if self._export_lines() else self.export_columns
+
+    def get_export_filename(self):
+        filename = super().get_export_filename()
+        return filename.replace("ventes", "ventes-lignes", 1) if self._export_lines() else filename
+
     def create(self, request, *args, **kwargs):
         input_serializer = SaleCreateSerializer(data=request.data)
         input_serializer.is_valid(raise_exception=True)
@@ -99,13 +189,7 @@ class SaleViewSet(viewsets.ModelViewSet):
                 Customer, id=data["customer_id"], merchant=request.shop.owner
             )
 
-        payment_data = {
-            key: data[key] for key in [
-                "sub_total", "grand_total", "tax_amount", "tax_percentage",
-                "amount_paid", "amount_change", "total_mobile_money",
-                "cash_payment_amount", "mobile_money_covers_total", "has_sav",
-            ]
-        }
+        payment_data = {key: data[key] for key in PAYMENT_FIELDS}
 
         try:
             sale = create_sale(
@@ -115,21 +199,216 @@ class SaleViewSet(viewsets.ModelViewSet):
                 items_data=data["items"],
                 payment_data=payment_data,
                 allow_zero_stock=request.shop.settings.allow_zero_stock_sale,
+                optimistic_stock=request.shop.settings.optimistic_stock_decrement,
             )
         except ValueError as e:
             raise serializers.ValidationError(str(e))
 
+        # Le reçu part au rendu dès la vente validée : il est prêt quand la caisse l'imprime.
+        transaction.on_commit(partial(
+            prerender_receipt, sale=sale, shop=request.shop, shop_settings=request.shop.settings
+        ))
+
         return Response(SaleSerializer(sale).data, status=201)
 
-    @action(detail=True, methods=["get"], url_path="receipt")
+    @extend_schema(
+        request=SaleBatchCreateSerializer,
+        responses={200: SaleBatchResultSerializer(many=True)},
+        summary="Synchroniser des ventes enregistrées hors ligne",
+        parameters=[SHOP_PK_PARAMETER],
+    )
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request, *args, **kwargs):
+        """
+            Rejoue en une requête les ventes mises en file par la caisse pendant
+            une coupure réseau. Renvoie un résultat par vente, dans l'ordre reçu.
+        """
+        envelope = SaleBatchCreateSerializer(data=request.data)
+        envelope.is_valid(raise_exception=True)
+
+        results = []
+        valid_entries = []
+        for entry in envelope.validated_data["sales"]:
+            entry_serializer = SaleBatchEntrySerializer(data=entry)
+            if entry_serializer.is_valid():
+                valid_entries.append(entry_serializer.validated_data)
+                results.append(None)
+            else:
+                results.append({
+                    "idempotency_key": entry.get("idempotency_key"),
+                    "status": "error",
+                    "sale_id": None,
+                    "error": entry_serializer.errors,
+                })
+
+        processed = iter(create_sales_batch(
+            shop=request.shop,
+            employee=request.employee,
+            sales_data=valid_entries,
+            allow_zero_stock=request.shop.settings.allow_zero_stock_sale,
+            optimistic_stock=request.shop.settings.optimistic_stock_decrement,
+        ))
+        results = [result or next(processed) for result in results]
+
+        created = [result["sale_id"] for result in results if result["status"] == "created"]
+        if created:
+            transaction.on_commit(partial(
+                prerender_receipts, sale_ids=created, shop=request.shop, shop_settings=request.shop.settings
+            ))
+
+        return Response(SaleBatchResultSerializer(results, many=True).data)
+
+    @action(
+        detail=True, methods=["get"], url_path="receipt",
+        renderer_classes=[PDFReceiptRenderer, TextReceiptRenderer, EscPosReceiptRenderer],
+        content_negotiation_class=ReceiptFormatNegotiation,
+    )
     def receipt(self, request, *args, **kwargs):
+        """
+            ?format=pdf (défaut) : reçu PDF via WeasyPrint, mis en cache.
+            ?format=text / ?format=escpos : reçu pour imprimante thermique,
+            rendu à la volée (&paper=58 ou 80, 80 par défaut).
+        """
+        receipt_format = request.accepted_renderer.format
+        paper = request.query_params.get("paper", DEFAULT_PAPER)
+        if paper not in PAPER_WIDTHS:
+            raise serializers.ValidationError({"paper": f"Valeurs possibles : {', '.join(PAPER_WIDTHS)}."})
+
         sale = self.get_object()
-        html_string = render_to_string("sales/receipt.html", {
-            "sale": sale,
-            "shop": sale.shop,
-            "shop_settings": sale.shop.settings,
-        })
-        pdf_bytes = HTML(string=html_string).write_pdf()
-        response = HttpResponse(pdf_bytes, content_type="application/pdf")
-        response["Content-Disposition"] = f'inline; filename="recu-{sale.id}.pdf"'
+        shop = request.shop
+        shop_settings = shop.settings
+
+        # ETag fort : une vente est immuable, seul un changement des paramètres
+        # de la boutique imprimés sur le reçu en modifie le contenu.
+        version = receipt_settings_version(shop=shop, shop_settings=shop_settings)
+        variant = version if receipt_format == "pdf" else f"{version}-{receipt_format}-{paper}"
+        etag = receipt_etag(sale=sale, version=variant)
+        not_modified = get_conditional_response(request._request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        if receipt_format == "pdf":
+            content = get_receipt_pdf(sale=sale, shop=shop, shop_settings=shop_settings, version=version)
+            filename = f"recu-{sale.id}.pdf"
+        else:
+            prefetch_related_objects([sale], "saledetail_set__item")
+            render = render_receipt_text if receipt_format == "text" else render_receipt_escpos
+            content = render(sale=sale, shop=shop, shop_settings=shop_settings, paper=paper)
+            filename = f"recu-{sale.id}.{'txt' if receipt_format == 'text' else 'bin'}"
+
+        renderer = request.accepted_renderer
+        content_type = f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type
+        response = HttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'inline; filename="{filename}"'
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
         return response
+
+
+WINDOW_PARAMETERS = [
+    OpenApiParameter(name="from", type=str, description="Premier jour inclus (AAAA-MM-JJ)"),
+    OpenApiParameter(name="to", type=str, description="Dernier jour inclus (AAAA-MM-JJ)"),
+]
+
+
+class ShopWindowView(ReplicaReadMixin, APIView):
+    """
+        Base des vues de pilotage, réservées à OWNER/MANAGER : lit la fenêtre
+        ?from=&to= (jours locaux de la boutique inclus). Sans paramètre, la
+        journée en cours.
+    """
+    permission_classes = [IsShopMember, IsShopManagerStrict]
+    query_serializer_class = DashboardKPIQuerySerializer
+
+    def get_query(self, request):
+        data = {key: value for key, value in request.query_params.items() if value}
+        data.update({
+            key: value for key, value in {
+                "date_from": request.query_params.get("from"),
+                "date_to": request.query_params.get("to"),
+            }.items() if value
+        })
+        query = self.query_serializer_class(data=data)
+        query.is_valid(raise_exception=True)
+
+        params = dict(query.validated_data)
+        today = timezone.localdate(timezone=request.shop.tzinfo)
+        params["date_to"] = params.get("date_to", today)
+        params["date_from"] = params.get("date_from", min(today, params["date_to"]))
+        return params
+
+
+class DashboardKPIView(ShopWindowView):
+    """
+        GET /api/shops/{shop_pk}/dashboard/kpis/?from=&to= — réservé à OWNER/MANAGER.
+        Sans paramètre, renvoie la journée en cours.
+    """
+
+    @extend_schema(
+        responses={200: DashboardKPISerializer},
+        summary="Indicateurs de vente du tableau de bord",
+        parameters=[SHOP_PK_PARAMETER, *WINDOW_PARAMETERS],
+    )
+    def get(self, request, *args, **kwargs):
+        kpis = get_dashboard_kpis(shop=request.shop, **self.get_query(request))
+        return Response(DashboardKPISerializer(kpis).data)
+
+
+class TopItemsReportView(ShopWindowView):
+    """GET /api/shops/{shop_pk}/reports/top-items/?from=&to=&limit=&order_by=quantity|revenue"""
+    query_serializer_class = TopItemsQuerySerializer
+
+    @extend_schema(
+        responses={200: TopItemsReportSerializer},
+        summary="Articles les plus vendus sur la période",
+        parameters=[
+            SHOP_PK_PARAMETER, *WINDOW_PARAMETERS,
+            OpenApiParameter(name="limit", type=int, description="Nombre d'articles (1 à 100, 10 par défaut)"),
+            OpenApiParameter(name="order_by", type=str, enum=["quantity", "revenue"]),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        report = get_top_items(shop=request.shop, **self.get_query(request))
+        return Response(TopItemsReportSerializer(report).data)
+
+
+class HourlyHeatmapReportView(ShopWindowView):
+    """GET /api/shops/{shop_pk}/reports/hourly/?from=&to= — affluence par jour de semaine et heure."""
+    query_serializer_class = SalesReportQuerySerializer
+
+    @extend_schema(
+        responses={200: HourlyHeatmapSerializer},
+        summary="Affluence par jour de semaine et heure",
+        parameters=[SHOP_PK_PARAMETER, *WINDOW_PARAMETERS],
+    )
+    def get(self, request, *args, **kwargs):
+        report = get_hourly_heatmap(shop=request.shop, **self.get_query(request))
+        return Response(HourlyHeatmapSerializer(report).data)
+
+
+class EmployeeTotalsReportView(ShopWindowView):
+    """GET /api/shops/{shop_pk}/reports/employees/?from=&to= — totaux encaissés par caissier."""
+    query_serializer_class = SalesReportQuerySerializer
+
+    @extend_schema(
+        responses={200: EmployeeTotalsReportSerializer},
+        summary="Totaux encaissés par caissier",
+        parameters=[SHOP_PK_PARAMETER, *WINDOW_PARAMETERS],
+    )
+    def get(self, request, *args, **kwargs):
+        report = get_employee_totals(shop=request.shop, **self.get_query(request))
+        return Response(EmployeeTotalsReportSerializer(report).data)
+
+
+class MarginReportView(ShopWindowView):
+    """GET /api/shops/{shop_pk}/reports/margin/?from=&to= — coût des ventes et marge brute par jour."""
+    query_serializer_class = SalesReportQuerySerializer
+
+    @extend_schema(
+        responses={200: MarginReportSerializer},
+        summary="Coût des articles vendus et marge brute",
+        parameters=[SHOP_PK_PARAMETER, *WINDOW_PARAMETERS],
+    )
+    def get(self, request, *args, **kwargs):
+        report = get_margin_report(shop=request.shop, **self.get_query(request))
+        return Response(MarginReportSerializer(report).data)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.17 on 2026-10-18 11:54
+
+import tenants.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_shopsettings_optimistic_stock_decrement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='timezone',
+            field=models.CharField(default='Africa/Douala', max_length=63, validators=[tenants.models.validate_timezone]),
+        ),
+    ]
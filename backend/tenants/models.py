@@ -1,4 +1,7 @@
+import zoneinfo
+
 from django.db import models
+from django.core.exceptions import ValidationError
 
 from django.contrib.auth import get_user_model
 
@@ -16,6 +19,14 @@ class Merchant(BaseModel):
         return self.company_name
 
 
+DEFAULT_SHOP_TIMEZONE = 'Africa/Douala'
+
+
+def validate_timezone(value):
+    if value not in zoneinfo.available_timezones():
+        raise ValidationError(f'Fuseau horaire inconnu : {value}.')
+
+
 class Shop(BaseModel):
     owner = models.ForeignKey(Merchant, on_delete=models.CASCADE, related_name='shops')
     name = models.CharField(max_length=255)
@@ -25,10 +36,16 @@ class Shop(BaseModel):
     slug = models.SlugField(unique=True)
     is_active = models.BooleanField(default=True)
     currency = models.CharField(max_length=255, default='XAF')
+    # Fuseau IANA de la boutique : définit sa « journée » (ventes du jour, cumuls, reçus).
+    timezone = models.CharField(max_length=63, default=DEFAULT_SHOP_TIMEZONE, validators=[validate_timezone])
 
     def __str__(self):
         return f'{self.name} - {self.owner}'
 
+    @property
+    def tzinfo(self):
+        return zoneinfo.ZoneInfo(self.timezone)
+
 
 class RoleChoices(models.TextChoices):
     OWNER = 'OWNER'
@@ -58,6 +75,9 @@ class ShopSettings(BaseModel):
     tax_number = models.CharField(max_length=255)
     logo = models.ImageField(upload_to='logos/')
     allow_zero_stock_sale = models.BooleanField(default=False)
+    # Décrémente le stock par UPDATE conditionnel plutôt que SELECT ... FOR UPDATE :
+    # réduit l'attente entre caisses sur les articles présents dans presque tous les paniers.
+    optimistic_stock_decrement = models.BooleanField(default=False)
 
     def __str__(self):
         return f'{self.shop.name}[Settings]'
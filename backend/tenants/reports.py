@@ -0,0 +1,92 @@
+"""
+    Rapports consolidés d'un commerçant sur l'ensemble de ses boutiques.
+
+    Chaque rapport est une seule requête GROUP BY shop (ou par article) sur
+    toutes les boutiques du commerçant, au lieu d'un appel par boutique.
+    Les fenêtres de dates sont des jours locaux, dans le fuseau de chaque
+    boutique.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Window
+from django.db.models.functions import Coalesce, Rank
+
+from core.filters import shops_day_range_q
+
+from catalog.models import Item
+from inventory.models import Purchase
+from sales.models import DailyShopSales, SaleDetail
+from sales.services import ROLLUP_FIELDS
+
+ZERO = Decimal("0")
+
+
+def _with_totals(rows, fields):
+    totals = {field: sum(row[field] for row in rows) for field in fields}
+    return {"shops": rows, "totals": totals}
+
+
+def get_merchant_sales(*, merchant, date_from, date_to):
+    """Ventes par boutique sur [date_from, date_to], lues dans le cumul journalier DailyShopSales."""
+    rows = list(
+        DailyShopSales.objects.filter(shop__owner=merchant, day__gte=date_from, day__lte=date_to)
+        .values("shop_id", shop_name=F("shop__name"))
+        .annotate(sale_count=Sum("sale_count"), **{field: Sum(field) for field in ROLLUP_FIELDS})
+        .order_by("-grand_total")
+    )
+    return {"date_from": date_from, "date_to": date_to, **_with_totals(rows, ["sale_count", *ROLLUP_FIELDS])}
+
+
+def get_merchant_top_items(*, merchant, shops, date_from, date_to, limit=10):
+    """
+        Articles les plus vendus, toutes boutiques confondues. Un article n'existe
+        que dans sa boutique : les lignes sont regroupées par nom d'article.
+    """
+    rows = (
+        SaleDetail.objects.filter(shops_day_range_q(shops=shops, date_from=date_from, date_to=date_to))
+        .filter(shop__owner=merchant, item__isnull=False)
+        .values(item_name=F("item__name"))
+        .annotate(
+            quantity=Sum("quantity"),
+            revenue=Sum("total_detail"),
+            shop_count=Count("shop_id", distinct=True),
+        )
+        .annotate(rank=Window(Rank(), order_by=F("quantity").desc()))
+        .order_by("rank", "item_name")[:limit]
+    )
+    return {"date_from": date_from, "date_to": date_to, "items": list(rows)}
+
+
+def get_merchant_purchases(*, merchant, shops, date_from, date_to):
+    rows = list(
+        Purchase.objects.filter(shops_day_range_q(shops=shops, date_from=date_from, date_to=date_to))
+        .filter(shop__owner=merchant)
+        .values("shop_id", shop_name=F("shop__name"))
+        .annotate(purchase_count=Count("id"), quantity=Sum("quantity"), total_value=Sum("total_value"))
+        .order_by("-total_value")
+    )
+    return {"date_from": date_from, "date_to": date_to, **_with_totals(rows, ["purchase_count", "quantity", "total_value"])}
+
+
+def get_merchant_stock(*, merchant):
+    """État du stock par boutique, valorisé au coût moyen pondéré et au prix de vente."""
+    money = DecimalField(max_digits=16, decimal_places=2)
+    rows = list(
+        Item.objects.filter(shop__owner=merchant)
+        .values("shop_id", shop_name=F("shop__name"))
+        .annotate(
+            item_count=Count("id"),
+            out_of_stock_count=Count("id", filter=Q(quantity__lte=0)),
+            units=Coalesce(Sum("quantity", filter=Q(quantity__gt=0)), 0),
+            purchase_value=Coalesce(Sum(
+                ExpressionWrapper(F("quantity") * F("average_cost"), output_field=money),
+                filter=Q(quantity__gt=0),
+            ), ZERO, output_field=money),
+            retail_value=Coalesce(Sum(
+                ExpressionWrapper(F("quantity") * F("price"), output_field=money),
+                filter=Q(quantity__gt=0),
+            ), ZERO, output_field=money),
+        )
+        .order_by("shop_name")
+    )
+    return _with_totals(rows, ["item_count", "out_of_stock_count", "units", "purchase_value", "retail_value"])
@@ -7,6 +7,8 @@ from tenants.models import RoleChoices
 from tenants.models import Shop, Employee, ShopSettings
 from tenants.services import register_merchant
 
+from sales.serializers import SalesReportQuerySerializer, SalesTotalsSerializer
+
 
 class RegisterMerchantSerializer(serializers.Serializer):
     username = serializers.CharField(max_length=150)
@@ -43,7 +45,7 @@ class ShopSerializer(serializers.ModelSerializer):
         model = Shop
         fields = [
             "id", "name", "slug", "address", "description", "phone_number",
-            "currency", "is_active", "created_at", "updated_at",
+            "currency", "timezone", "is_active", "created_at", "updated_at",
         ]
         read_only_fields = ["id", "slug", "created_at", "updated_at"]
 
@@ -70,5 +72,73 @@ class EmployeeSerializer(serializers.ModelSerializer):
 class ShopSettingsSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShopSettings
-        fields = ["id", "tax_number", "logo", "allow_zero_stock_sale"]
+        fields = ["id", "tax_number", "logo", "allow_zero_stock_sale", "optimistic_stock_decrement"]
         read_only_fields = ["id"]
+
+
+class MerchantTopItemsQuerySerializer(SalesReportQuerySerializer):
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=100)
+
+
+class ShopRowSerializer(serializers.Serializer):
+    shop_id = serializers.UUIDField()
+    shop_name = serializers.CharField()
+
+
+class MerchantShopSalesSerializer(ShopRowSerializer, SalesTotalsSerializer):
+    pass
+
+
+class MerchantSalesReportSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    shops = MerchantShopSalesSerializer(many=True)
+    totals = SalesTotalsSerializer()
+
+
+class MerchantTopItemSerializer(serializers.Serializer):
+    rank = serializers.IntegerField()
+    item_name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    shop_count = serializers.IntegerField()
+
+
+class MerchantTopItemsReportSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    items = MerchantTopItemSerializer(many=True)
+
+
+class PurchaseTotalsSerializer(serializers.Serializer):
+    purchase_count = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    total_value = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class MerchantShopPurchasesSerializer(ShopRowSerializer, PurchaseTotalsSerializer):
+    pass
+
+
+class MerchantPurchasesReportSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    shops = MerchantShopPurchasesSerializer(many=True)
+    totals = PurchaseTotalsSerializer()
+
+
+class StockTotalsSerializer(serializers.Serializer):
+    item_count = serializers.IntegerField()
+    out_of_stock_count = serializers.IntegerField()
+    units = serializers.IntegerField()
+    purchase_value = serializers.DecimalField(max_digits=16, decimal_places=2, help_text="Valeur au coût moyen pondéré.")
+    retail_value = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class MerchantShopStockSerializer(ShopRowSerializer, StockTotalsSerializer):
+    pass
+
+
+class MerchantStockReportSerializer(serializers.Serializer):
+    shops = MerchantShopStockSerializer(many=True)
+    totals = StockTotalsSerializer()
@@ -2,13 +2,16 @@
 from django.db import transaction, IntegrityError
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
-from .models import Merchant, Shop, Employee, RoleChoices
+from .models import DEFAULT_SHOP_TIMEZONE, Merchant, Shop, Employee, RoleChoices
+
+from sales.services import rebuild_daily_sales
 
 User = get_user_model()
 
 
 @transaction.atomic
-def create_shop(*, merchant, name, address=None, email=None, phone_number=None, currency="XAF"):
+def create_shop(*, merchant, name, address=None, email=None, phone_number=None, currency="XAF",
+                timezone=DEFAULT_SHOP_TIMEZONE):
     base_slug = slugify(name)
     slug = base_slug
     counter = 1
@@ -23,11 +26,27 @@ def create_shop(*, merchant, name, address=None, email=None, phone_number=None,
         address=address,
         phone_number=phone_number,
         currency=currency,
+        timezone=timezone,
     )
     Employee.objects.create(user=merchant.user, shop=shop, role=RoleChoices.OWNER)
     return shop
 
 
+@transaction.atomic
+def update_shop(*, shop, **fields):
+    """
+        Met à jour la boutique. Les cumuls journaliers sont découpés en jours
+        locaux : un changement de fuseau les fait recalculer.
+    """
+    previous_tzinfo = shop.tzinfo
+    for field, value in fields.items():
+        setattr(shop, field, value)
+    shop.save()
+    if shop.timezone != previous_tzinfo.key:
+        rebuild_daily_sales(shop=shop, previous_tzinfo=previous_tzinfo)
+    return shop
+
+
 @transaction.atomic
 def register_merchant(*, username, password, company_name, phone_number=None, shop_name):
     if User.objects.filter(username=username).exists():
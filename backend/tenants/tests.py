@@ -1,3 +1,114 @@
+import datetime
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from rest_framework.test import APIClient
+
+from catalog.services import quick_create_item
+
+from sales.services import create_sale
+
+from tenants.models import RoleChoices
+from tenants.reports import get_merchant_sales, get_merchant_stock, get_merchant_top_items
+from tenants.services import add_employee, create_shop, register_merchant
+
+# 23h30 UTC le 10 mars : déjà le 11 à Douala (UTC+1), encore le 10 à New York.
+LATE_EVENING = datetime.datetime(2024, 3, 10, 23, 30, tzinfo=datetime.timezone.utc)
+DOUALA_DAY = datetime.date(2024, 3, 11)
+NEW_YORK_DAY = datetime.date(2024, 3, 10)
+
+
+def _sell(*, shop, item, quantity, sold_at=LATE_EVENING):
+    total = item.price * quantity
+    return create_sale(
+        shop=shop, customer=None, employee=None, sold_at=sold_at,
+        items_data=[{"item_id": item.id, "price": item.price, "quantity": quantity, "total_item": total}],
+        payment_data={"sub_total": total, "grand_total": total, "amount_paid": total, "cash_payment_amount": total},
+    )
+
+
+class MerchantReportTests(TestCase):
+    def setUp(self):
+        self.user, self.merchant, self.douala = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Douala"
+        )
+        self.new_york = create_shop(merchant=self.merchant, name="New York", timezone="America/New_York")
+        self.shops = [self.douala, self.new_york]
+        self.douala_bread = quick_create_item(shop=self.douala, name="Pain", price=Decimal("150"), quantity=20)
+        self.new_york_bread = quick_create_item(shop=self.new_york, name="Pain", price=Decimal("200"), quantity=20)
+
+        _, _, self.other_shop = register_merchant(
+            username="rival", password="not-used", company_name="Concurrent", shop_name="Akwa"
+        )
+        other_bread = quick_create_item(shop=self.other_shop, name="Pain", price=Decimal("100"), quantity=20)
+        _sell(shop=self.other_shop, item=other_bread, quantity=5)
+
+    def test_sales_are_totalled_across_the_merchant_shops_only(self):
+        _sell(shop=self.douala, item=self.douala_bread, quantity=2)
+        _sell(shop=self.douala, item=self.douala_bread, quantity=1)
+        _sell(shop=self.new_york, item=self.new_york_bread, quantity=1)
+
+        report = get_merchant_sales(merchant=self.merchant, date_from=NEW_YORK_DAY, date_to=DOUALA_DAY)
+
+        by_shop = {row["shop_id"]: row for row in report["shops"]}
+        self.assertEqual(set(by_shop), {self.douala.id, self.new_york.id})
+        self.assertEqual((by_shop[self.douala.id]["sale_count"], by_shop[self.douala.id]["grand_total"]), (2, Decimal("450")))
+        self.assertEqual((by_shop[self.new_york.id]["sale_count"], by_shop[self.new_york.id]["grand_total"]), (1, Decimal("200")))
+        self.assertEqual((report["totals"]["sale_count"], report["totals"]["grand_total"]), (3, Decimal("650")))
+
+    def test_each_shop_is_read_in_its_own_local_day(self):
+        _sell(shop=self.douala, item=self.douala_bread, quantity=2)
+        _sell(shop=self.new_york, item=self.new_york_bread, quantity=3)
+
+        for day, shop, quantity in ((NEW_YORK_DAY, self.new_york, 3), (DOUALA_DAY, self.douala, 2)):
+            with self.subTest(day=day):
+                sales = get_merchant_sales(merchant=self.merchant, date_from=day, date_to=day)
+                self.assertEqual([row["shop_id"] for row in sales["shops"]], [shop.id])
+
+                top = get_merchant_top_items(merchant=self.merchant, shops=self.shops, date_from=day, date_to=day)
+                self.assertEqual([(row["item_name"], row["quantity"], row["shop_count"]) for row in top["items"]],
+                                 [("Pain", quantity, 1)])
+
+    def test_top_items_group_the_same_name_across_shops(self):
+        _sell(shop=self.douala, item=self.douala_bread, quantity=2)
+        _sell(shop=self.new_york, item=self.new_york_bread, quantity=3)
+
+        top = get_merchant_top_items(merchant=self.merchant, shops=self.shops, date_from=NEW_YORK_DAY, date_to=DOUALA_DAY)
+
+        self.assertEqual(len(top["items"]), 1)
+        row = top["items"][0]
+        self.assertEqual((row["rank"], row["quantity"], row["revenue"], row["shop_count"]), (1, 5, Decimal("900"), 2))
+
+    def test_stock_is_valued_per_shop(self):
+        report = get_merchant_stock(merchant=self.merchant)
+
+        self.assertEqual([row["shop_name"] for row in report["shops"]], ["Douala", "New York"])
+        self.assertEqual(report["totals"]["units"], 40)
+        self.assertEqual(report["totals"]["retail_value"], Decimal("7000"))
+
+
+class MerchantReportAccessTests(TestCase):
+    def setUp(self):
+        self.user, self.merchant, self.shop = register_merchant(
+            username="owner", password="not-used", company_name="Boulangerie", shop_name="Centre"
+        )
+        bread = quick_create_item(shop=self.shop, name="Pain", price=Decimal("150"), quantity=10)
+        _sell(shop=self.shop, item=bread, quantity=1, sold_at=datetime.datetime(2024, 3, 10, 12, tzinfo=datetime.timezone.utc))
+        self.cashier = add_employee(shop=self.shop, username="cashier", password="not-used", role=RoleChoices.CASHIER)
+        self.client = APIClient()
+
+    def test_owner_reads_the_consolidated_report(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/merchant/reports/sales/", {"from": "2024-03-10", "to": "2024-03-10"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["totals"]["sale_count"], 1)
+        self.assertEqual([row["shop_id"] for row in response.data["shops"]], [str(self.shop.id)])
+
+    def test_shop_employee_is_refused(self):
+        self.client.force_authenticate(self.cashier.user)
+        for path in ("sales", "top-items", "purchases", "stock"):
+            with self.subTest(path=path):
+                response = self.client.get(f"/api/merchant/reports/{path}/")
+                self.assertEqual(response.status_code, 403)
@@ -2,6 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter, SimpleRouter
 
 from tenants.views import ShopViewSet, EmployeeViewSet, RegisterMerchantView, ShopSettingsView
+from tenants.views import MerchantPurchasesReportView, MerchantSalesReportView
+from tenants.views import MerchantStockReportView, MerchantTopItemsReportView
 
 router = DefaultRouter()
 router.register(r"shops", ShopViewSet, basename="shops")
@@ -13,5 +15,9 @@ urlpatterns = router.urls + [
     path("register-merchant/", RegisterMerchantView.as_view(), name="register-merchant"),
     path("shops/<uuid:shop_pk>/", include(shop_sub_router.urls)),
     path("shops/<uuid:shop_pk>/settings/", ShopSettingsView.as_view(), name="shop-settings"),
+    path("merchant/reports/sales/", MerchantSalesReportView.as_view(), name="merchant-report-sales"),
+    path("merchant/reports/top-items/", MerchantTopItemsReportView.as_view(), name="merchant-report-top-items"),
+    path("merchant/reports/purchases/", MerchantPurchasesReportView.as_view(), name="merchant-report-purchases"),
+    path("merchant/reports/stock/", MerchantStockReportView.as_view(), name="merchant-report-stock"),
 
 ]
@@ -1,7 +1,12 @@
 from django.db import models
+from django.utils import timezone
+
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+
 from rest_framework import generics
 from rest_framework import viewsets
 from rest_framework import serializers
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.generics import CreateAPIView
@@ -9,17 +14,29 @@ from rest_framework.generics import CreateAPIView
 from tenants.services import add_employee
 from tenants.serializers import ShopSettingsSerializer
 
+from core.db_routing import ReplicaReadMixin
+from core.idempotency import IdempotencyMixin
+
+from core.permissions import IsMerchant
 from core.permissions import IsShopOwner
 from core.permissions import IsShopMember
 from core.permissions import IsShopManager
 
 from core.schema import shop_scoped_schema
+from core.sparse_fields import SparseFieldsMixin
 
-from tenants.services import create_shop
+from tenants.services import create_shop, update_shop
 from tenants.models import Shop, Employee
 from tenants.serializers import EmployeeCreateSerializer
 from tenants.serializers import RegisterMerchantSerializer
 from tenants.serializers import ShopSerializer, EmployeeSerializer
+from tenants.serializers import MerchantTopItemsQuerySerializer
+from tenants.serializers import MerchantPurchasesReportSerializer, MerchantSalesReportSerializer
+from tenants.serializers import MerchantStockReportSerializer, MerchantTopItemsReportSerializer
+
+from tenants.reports import get_merchant_purchases, get_merchant_sales, get_merchant_stock, get_merchant_top_items
+
+from sales.serializers import SalesReportQuerySerializer
 
 
 class RegisterMerchantView(CreateAPIView):
@@ -51,10 +68,14 @@ class ShopViewSet(viewsets.ModelViewSet):
         shop = create_shop(merchant=merchant, **serializer.validated_data)
         serializer.instance = shop
 
+    def perform_update(self, serializer):
+        serializer.instance = update_shop(shop=serializer.instance, **serializer.validated_data)
+
 
 @shop_scoped_schema
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(SparseFieldsMixin, ReplicaReadMixin, IdempotencyMixin, viewsets.ModelViewSet):
     permission_classes = [IsShopMember]
+    sparse_select_related = {"username": ["user"]}
 
     def get_permissions(self):
         # Seuls OWNER/MANAGER peuvent créer, modifier ou désactiver un employé.
@@ -63,7 +84,7 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         return [permission() for permission in self.permission_classes]
 
     def get_queryset(self):
-        return Employee.objects.filter(shop=self.request.shop).select_related("user")
+        return Employee.objects.filter(shop=self.request.shop)
 
     def get_serializer_class(self):
         return EmployeeCreateSerializer if self.action == "create" else EmployeeSerializer
@@ -78,7 +99,7 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         return Response(EmployeeSerializer(employee).data, status=201)
 
 
-class ShopSettingsView(generics.RetrieveUpdateAPIView):
+class ShopSettingsView(IdempotencyMixin, generics.RetrieveUpdateAPIView):
     """
         GET  /api/shops/{shop_pk}/settings/  — consultable par tout membre de la boutique
         PATCH /api/shops/{shop_pk}/settings/ — réservé à OWNER/MANAGER
@@ -88,3 +109,97 @@ class ShopSettingsView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         return self.request.shop.settings
+
+
+MERCHANT_WINDOW_PARAMETERS = [
+    OpenApiParameter(name="from", type=str, description="Premier jour inclus (AAAA-MM-JJ)"),
+    OpenApiParameter(name="to", type=str, description="Dernier jour inclus (AAAA-MM-JJ)"),
+]
+
+
+class MerchantReportView(ReplicaReadMixin, APIView):
+    """
+        Base des rapports consolidés /api/merchant/reports/... : une seule
+        vérification (l'utilisateur est un Merchant), puis des requêtes
+        restreintes à shop__owner=request.user.merchant.
+
+        La fenêtre ?from=&to= est en jours locaux de chaque boutique ; par
+        défaut, aujourd'hui dans le fuseau de la première boutique créée.
+    """
+    permission_classes = [IsMerchant]
+    query_serializer_class = SalesReportQuerySerializer
+
+    def get_shops(self):
+        return list(Shop.objects.filter(owner=self.request.user.merchant).only("id", "timezone").order_by("created_at"))
+
+    def get_query(self, request, shops):
+        data = {key: value for key, value in request.query_params.items() if value}
+        data.update({
+            key: value for key, value in {
+                "date_from": request.query_params.get("from"),
+                "date_to": request.query_params.get("to"),
+            }.items() if value
+        })
+        query = self.query_serializer_class(data=data)
+        query.is_valid(raise_exception=True)
+
+        params = dict(query.validated_data)
+        today = timezone.localdate(timezone=shops[0].tzinfo if shops else None)
+        params["date_to"] = params.get("date_to", today)
+        params["date_from"] = params.get("date_from", min(today, params["date_to"]))
+        return params
+
+
+class MerchantSalesReportView(MerchantReportView):
+    """GET /api/merchant/reports/sales/?from=&to= — ventes par boutique et total consolidé."""
+
+    @extend_schema(
+        responses={200: MerchantSalesReportSerializer},
+        summary="Ventes consolidées de toutes les boutiques",
+        parameters=MERCHANT_WINDOW_PARAMETERS,
+    )
+    def get(self, request, *args, **kwargs):
+        query = self.get_query(request, self.get_shops())
+        report = get_merchant_sales(merchant=request.user.merchant, **query)
+        return Response(MerchantSalesReportSerializer(report).data)
+
+
+class MerchantTopItemsReportView(MerchantReportView):
+    """GET /api/merchant/reports/top-items/?from=&to=&limit= — articles les plus vendus, toutes boutiques."""
+    query_serializer_class = MerchantTopItemsQuerySerializer
+
+    @extend_schema(
+        responses={200: MerchantTopItemsReportSerializer},
+        summary="Articles les plus vendus sur l'ensemble des boutiques",
+        parameters=[
+            *MERCHANT_WINDOW_PARAMETERS,
+            OpenApiParameter(name="limit", type=int, description="Nombre d'articles (1 à 100, 10 par défaut)"),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        shops = self.get_shops()
+        report = get_merchant_top_items(merchant=request.user.merchant, shops=shops, **self.get_query(request, shops))
+        return Response(MerchantTopItemsReportSerializer(report).data)
+
+
+class MerchantPurchasesReportView(MerchantReportView):
+    """GET /api/merchant/reports/purchases/?from=&to= — achats par boutique et total consolidé."""
+
+    @extend_schema(
+        responses={200: MerchantPurchasesReportSerializer},
+        summary="Achats consolidés de toutes les boutiques",
+        parameters=MERCHANT_WINDOW_PARAMETERS,
+    )
+    def get(self, request, *args, **kwargs):
+        shops = self.get_shops()
+        report = get_merchant_purchases(merchant=request.user.merchant, shops=shops, **self.get_query(request, shops))
+        return Response(MerchantPurchasesReportSerializer(report).data)
+
+
+class MerchantStockReportView(MerchantReportView):
+    """GET /api/merchant/reports/stock/ — stock et valeur du stock par boutique."""
+
+    @extend_schema(responses={200: MerchantStockReportSerializer}, summary="Stock consolidé de toutes les boutiques")
+    def get(self, request, *args, **kwargs):
+        report = get_merchant_stock(merchant=request.user.merchant)
+        return Response(MerchantStockReportSerializer(report).data)
@@ -83,6 +83,7 @@ export function shopScoped(shopId) {
     customers: `${base}/customers/`,
     sales: `${base}/sales/`,
     employees: `${base}/employees/`,
+    dashboardKpis: `${base}/dashboard/kpis/`,
   };
 }
 
@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react";
 import PageHeader from "../../components/PageHeader";
-import { apiClient, asList } from "../../lib/apiClient";
+import { apiClient, asList, shopScoped } from "../../lib/apiClient";
 import { useShop } from "../../context/ShopContext";
 
 function formatFcfa(amount) {
@@ -9,34 +9,36 @@ function formatFcfa(amount) {
 
 export default function DashboardPage() {
   const { activeShopId, activeShop } = useShop();
-  const [sales, setSales] = useState([]);
+  const [kpiData, setKpiData] = useState(null);
   const [lowStock, setLowStock] = useState([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     if (!activeShopId) return;
     setLoading(true);
+    // Les indicateurs sont agrégés côté serveur (cumul journalier) : une seule
+    // petite réponse, quel que soit le nombre de tickets de la journée.
     Promise.all([
-      apiClient.get(`/shops/${activeShopId}/sales/`, { params: { page_size: 100 } }),
+      apiClient.get(shopScoped(activeShopId).dashboardKpis),
       apiClient.get(`/shops/${activeShopId}/items/`, { params: { ordering: "quantity", page_size: 5 } }),
     ])
-      .then(([salesRes, itemsRes]) => {
-        setSales(asList(salesRes.data));
+      .then(([kpisRes, itemsRes]) => {
+        setKpiData(kpisRes.data);
         setLowStock(asList(itemsRes.data).filter((i) => i.quantity <= 5));
       })
       .finally(() => setLoading(false));
   }, [activeShopId]);
 
-  const totalSales = sales.reduce((sum, s) => sum + Number(s.grand_total), 0);
-  const totalMomo = sales.reduce((sum, s) => sum + Number(s.total_mobile_money), 0);
-  const ticketCount = sales.length;
-  const avgTicket = ticketCount > 0 ? totalSales / ticketCount : 0;
+  const totalSales = Number(kpiData?.grand_total || 0);
+  const ticketCount = kpiData?.sale_count || 0;
+  const avgTicket = Number(kpiData?.average_ticket || 0);
+  const momoShare = kpiData?.mobile_money_share || 0;
 
   const kpis = [
     { label: "Chiffre d'affaires (jour)", value: formatFcfa(totalSales), icon: "trending_up" },
     { label: "Tickets encaissés", value: ticketCount, icon: "receipt_long" },
     { label: "Panier moyen", value: formatFcfa(avgTicket), icon: "shopping_bag" },
-    { label: "Part Mobile Money", value: totalSales > 0 ? `${Math.round((totalMomo / totalSales) * 100)} %` : "0 %", icon: "smartphone" },
+    { label: "Part Mobile Money", value: `${Math.round(momoShare * 100)} %`, icon: "smartphone" },
   ];
 
   return (
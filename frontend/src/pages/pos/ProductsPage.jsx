@@ -11,7 +11,7 @@ function formatFcfa(amount) {
   return new Intl.NumberFormat("fr-FR").format(Math.round(amount || 0)) + " FCFA";
 }
 
-const EMPTY_FORM = { name: "", description: "", category: "", price: "", purchase_price: "", quantity: 0 };
+const EMPTY_FORM = { name: "", barcode: "", sku: "", description: "", category: "", price: "", purchase_price: "", quantity: 0 };
 
 export default function ProductsPage() {
   const { activeShopId } = useShop();
@@ -41,6 +41,8 @@ export default function ProductsPage() {
     setEditing(item);
     setForm({
       name: item.name,
+      barcode: item.barcode || "",
+      sku: item.sku || "",
       description: item.description || "",
       category: item.category,
       price: item.price,
@@ -135,6 +137,16 @@ export default function ProductsPage() {
               <span>Nom</span>
               <input style={inputStyle} value={form.name} onChange={(e) => setForm({ ...form, name: e.target.value })} required />
             </label>
+            <div style={{ display: "grid", gridTemplateColumns: "1fr 1fr", gap: 12 }}>
+              <label style={labelStyle}>
+                <span>Code-barres</span>
+                <input style={inputStyle} value={form.barcode} onChange={(e) => setForm({ ...form, barcode: e.target.value })} />
+              </label>
+              <label style={labelStyle}>
+                <span>SKU</span>
+                <input style={inputStyle} value={form.sku} onChange={(e) => setForm({ ...form, sku: e.target.value })} />
+              </label>
+            </div>
             <label style={labelStyle}>
               <span>Catégorie</span>
               <select style={inputStyle} value={form.category} onChange={(e) => setForm({ ...form, category: e.target.value })} required>
@@ -42,10 +42,10 @@ export default function SalePage() {
     }
     const handle = setTimeout(async () => {
       try {
-        const { data } = await apiClient.get(`/shops/${activeShopId}/items/`, {
-          params: { search: query, page_size: 6 },
+        const { data } = await apiClient.get(`/shops/${activeShopId}/items/suggest/`, {
+          params: { q: query.trim(), limit: 6 },
         });
-        setSuggestions(Array.isArray(data) ? data : data?.results || []);
+        setSuggestions(Array.isArray(data) ? data : []);
       } catch {
         setSuggestions([]);
       }
@@ -73,6 +73,19 @@ export default function SalePage() {
     setShowSuggest(false);
   }
 
+  // Douchette : le code arrive comme une saisie clavier terminée par Entrée.
+  async function handleSearchKeyDown(e) {
+    if (e.key !== "Enter" || !query.trim()) return;
+    e.preventDefault();
+    try {
+      const { data } = await apiClient.get(`/shops/${activeShopId}/items/by-code/${encodeURIComponent(query.trim())}/`);
+      addToCart(data);
+    } catch {
+      // Pas un code connu : on garde la recherche par nom.
+      if (suggestions.length === 1) addToCart(suggestions[0]);
+    }
+  }
+
   function updateLine(itemId, patch) {
     setLines((prev) => prev.map((l) => (l.itemId === itemId ? { ...l, ...patch } : l)));
   }
@@ -212,7 +225,8 @@ export default function SalePage() {
                 value={query}
                 onChange={(e) => setQuery(e.target.value)}
                 onFocus={() => setShowSuggest(true)}
-                placeholder="Rechercher un article par nom…"
+                onKeyDown={handleSearchKeyDown}
+                placeholder="Rechercher un article ou scanner un code…"
                 style={{ width: "100%", height: 50, border: "1px solid var(--color-border)", background: "var(--color-surface-alt)", borderRadius: 12, padding: "0 16px 0 46px", fontSize: 15 }}
               />
             </div>
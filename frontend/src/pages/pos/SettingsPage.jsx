@@ -46,6 +46,7 @@ export default function SettingsPage() {
         email: shop.email,
         phone_number: shop.phone_number,
         currency: shop.currency,
+        timezone: shop.timezone,
       });
       setMessage({ type: "success", text: "Boutique mise à jour." });
     } catch (err) {
@@ -85,6 +86,10 @@ export default function SettingsPage() {
               <span>Devise</span>
               <input style={inputStyle} value={shop.currency} onChange={(e) => setShop({ ...shop, currency: e.target.value })} />
             </label>
+            <label style={labelStyle}>
+              <span>Fuseau horaire</span>
+              <input style={inputStyle} value={shop.timezone || ""} placeholder="Africa/Douala" onChange={(e) => setShop({ ...shop, timezone: e.target.value })} />
+            </label>
           </div>
 
           {message && (
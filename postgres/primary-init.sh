@@ -0,0 +1,11 @@
+#!/bin/sh
+# Exécuté une seule fois, à la création du volume de la base principale :
+# rôle de réplication utilisé par le service db-replica (pg_basebackup puis flux WAL).
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" \
+     -v password="$POSTGRES_REPLICATION_PASSWORD" <<'EOSQL'
+CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD :'password';
+EOSQL
+
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"